@@ -1,29 +1,27 @@
 import os
+import sys
 import requests
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+import github_client
+
 # --- CONFIGURATION ---
 OWNER = "falken10vdl"
 REPO = "bonsaiPR"
-GITHUB_API_URL = f"https://api.github.com/repos/{OWNER}/{REPO}/releases"
-TOKEN = os.getenv("GITHUB_TOKEN")
-
-# --- HEADERS ---
-headers = {}
-if TOKEN:
-    headers["Authorization"] = f"token {TOKEN}"
 
 # --- FETCH RELEASES ---
-response = requests.get(GITHUB_API_URL, headers=headers)
-if response.status_code != 200:
-    print(f"Error fetching releases: {response.status_code} {response.text}")
+try:
+    releases = list(
+        github_client.default_client().paginate(f"repos/{OWNER}/{REPO}/releases")
+    )
+except requests.RequestException as e:
+    print(f"Error fetching releases: {e}")
     exit(1)
 
-releases = response.json()
-
 # --- CALCULATE TOTALS ---
 grand_total = 0
 print(f"\n📦 Download statistics for {OWNER}/{REPO}\n")
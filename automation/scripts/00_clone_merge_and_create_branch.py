@@ -1,3 +1,4 @@
+import fcntl
 import os
 import subprocess
 import requests
@@ -5,6 +6,8 @@ import re
 import sys
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -12,11 +15,25 @@ from dotenv import load_dotenv
 # plain import works, but insert the path explicitly for direct/manual invocation.
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 import pr_state
+import pr_refs
+import merge_probe
+import conflict_graph
+import github_client
+import pr_snapshot
+import pr_files_cache
+import merge_checkpoints
+import order_worktrees
+import bulk_delete
+import bonsai_rewrite
 
 # Committed per-order snapshots (state.asc/desc/upd.json). The report reads them
 # to annotate each PR with how it fared under the other merge orders.
 REPORTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "reports")
 
+# Guards what the concurrent merge orders share besides the failure tracking:
+# the PR head refs, the conflict graph, the probe cache and the PR files cache.
+SHARED_STATE_LOCK = os.path.join(pr_files_cache.LOGS_DIR, "shared_state.lock")
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -61,6 +78,65 @@ else:
 # (SKIP_CPP_PRS=1); default off so we don't drop PRs whose Python is testable.
 SKIP_CPP_PRS = os.getenv("SKIP_CPP_PRS", "").strip().lower() in ("1", "true", "yes")
 
+# Plan each merge order from the pairwise conflict graph (conflict_graph.py):
+# PRs predicted to merge go first, so one pass includes the most PRs it can.
+# On by default; CONFLICT_PLANNER=0 restores the plain sorted order.
+CONFLICT_PLANNER = os.getenv("CONFLICT_PLANNER", "1").strip().lower() not in (
+    "0",
+    "false",
+    "no",
+)
+
+# Record a checkpoint after each merged PR and, on the next run, resume from the
+# longest prefix of PRs whose base and head shas are unchanged
+# (merge_checkpoints.py). On by default; MERGE_CHECKPOINTS=0 always merges
+# every PR from the base.
+MERGE_CHECKPOINTS = os.getenv("MERGE_CHECKPOINTS", "1").strip().lower() not in (
+    "0",
+    "false",
+    "no",
+)
+
+# Merge PRs that share no changed path with an already merged PR in the object
+# database (merge-tree + commit-tree) and move the working tree once per run
+# of such PRs; every other PR is merged with `git merge`. On by default;
+# MERGE_FAST_PATH=0 runs `git merge` for every PR.
+MERGE_FAST_PATH = os.getenv("MERGE_FAST_PATH", "1").strip().lower() not in (
+    "0",
+    "false",
+    "no",
+)
+
+# Opt-in: do not even attempt a PR the pairwise conflict graph predicts to
+# conflict with the base or a merged PR. A pairwise prediction cannot see the
+# state after earlier merges, so such PRs may in fact have merged; they are
+# reported as "predicted" failures, not as real ones.
+MERGE_SKIP_PREDICTED = os.getenv("MERGE_SKIP_PREDICTED", "0").strip().lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Fetch the open PRs (and, on a cold files cache, their changed files) with a
+# few GraphQL queries instead of REST /pulls plus one /pulls/N/files per PR
+# (pr_snapshot.py, pr_files_cache.py). On by default; PR_GRAPHQL=0 uses REST only. A failed
+# GraphQL query falls back to REST either way.
+PR_GRAPHQL = os.getenv("PR_GRAPHQL", "1").strip().lower() not in (
+    "0",
+    "false",
+    "no",
+)
+
+# Failed PRs are re-tested alone against base in parallel: each test is an
+# object-only merge-tree probe plus a few `git log` calls. Defaults to one
+# worker per core; FAILED_PR_TEST_WORKERS=1 tests them one at a time.
+try:
+    FAILED_PR_TEST_WORKERS = int(os.getenv("FAILED_PR_TEST_WORKERS", "") or 0)
+except ValueError:
+    FAILED_PR_TEST_WORKERS = 0
+if FAILED_PR_TEST_WORKERS <= 0:
+    FAILED_PR_TEST_WORKERS = os.cpu_count() or 1
+
 # File extensions that only take effect after a C++ recompile.
 COMPILED_EXTS = {".cpp", ".cxx", ".cc", ".c", ".h", ".hpp", ".hxx", ".i", ".ipp"}
 
@@ -91,9 +167,10 @@ KNOWN_CONFLICT_RESOLUTIONS = {
 
 
 # Generate branch name and report filename with timestamp for on-demand builds
-def get_branch_and_report_names():
-    # Include hour-minute for multiple builds per day
-    current_datetime = datetime.now().strftime("%y%m%d%H%M")
+def get_branch_and_report_names(timestamp=None):
+    # Include hour-minute for multiple builds per day. main.py passes a distinct
+    # --timestamp to each concurrent merge order so branches and tags differ.
+    current_datetime = timestamp or datetime.now().strftime("%y%m%d%H%M")
     version = SOURCE_BASE_BRANCH.removeprefix("v")
 
     pyversion = "py311"
@@ -104,53 +181,33 @@ def get_branch_and_report_names():
     return branch_name, report_path
 
 
-def github_headers():
-    return {"Authorization": f"token {GITHUB_TOKEN}"}
-
-
 def get_pr_files(pr_number):
     """Return the list of file paths changed by a PR (paginated).
 
     Uses the GitHub files API so we can decide to skip a PR before fetching or
     merging it. On error, returns None so the caller can fail open (don't skip).
     """
-    url = f"https://api.github.com/repos/{upstream_repo}/pulls/{pr_number}/files"
-    files = []
-    page = 1
-    while True:
-        try:
-            response = requests.get(
-                url,
-                headers=github_headers(),
-                params={"per_page": 100, "page": page},
-                timeout=30,
-            )
-        except requests.RequestException as e:
-            print(f"⚠️  Could not fetch files for PR #{pr_number}: {e}")
-            return None
-        if response.status_code != 200:
-            print(
-                f"⚠️  Could not fetch files for PR #{pr_number}: "
-                f"HTTP {response.status_code}"
+    try:
+        return [
+            f["filename"]
+            for f in github_client.default_client().paginate(
+                f"repos/{upstream_repo}/pulls/{pr_number}/files"
             )
-            return None
-        batch = response.json()
-        if not batch:
-            break
-        files.extend(f["filename"] for f in batch)
-        if len(batch) < 100:  # Last page
-            break
-        page += 1
-    return files
-
-
-def pr_needs_cpp_recompile(pr_number):
+        ]
+    except requests.RequestException as e:
+        print(f"⚠️  Could not fetch files for PR #{pr_number}: {e}")
+        return None
+
+
+def pr_needs_cpp_recompile(pr_number, files=None):
     """True if the PR changes C++ compiled into the wheel Bonsai loads.
 
-    Fails open (returns False) when the file list can't be fetched, so an API
-    hiccup never silently drops a PR from the build.
+    `files` is the PR's changed paths as attached by attach_pr_files();
+    otherwise they are fetched. Fails open (returns False) when the file
+    list can't be fetched, so an API hiccup never silently drops a PR.
     """
-    files = get_pr_files(pr_number)
+    if files is None:
+        files = get_pr_files(pr_number)
     if files is None:
         return False
     for path in files:
@@ -161,6 +218,60 @@ def pr_needs_cpp_recompile(pr_number):
     return False
 
 
+@contextmanager
+def shared_state_lock():
+    """Hold the exclusive lock on the state the merge orders share.
+
+    Fetching PR heads, pruning their refs and rewriting the conflict graph,
+    probe cache or PR files cache all read, modify and write state that every
+    merge order uses; like save_failure_tracking(), an order takes this lock
+    first so it never overwrites what another order wrote in the meantime or
+    fails on a ref another order is updating. The lock is not reentrant.
+    """
+    os.makedirs(os.path.dirname(SHARED_STATE_LOCK), exist_ok=True)
+    with open(SHARED_STATE_LOCK, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def attach_pr_files(prs):
+    """Set pr["files"] (changed paths, None if unknown) on every PR in `prs`.
+
+    Paths already present (from the GraphQL snapshot) are stored in the files
+    cache; the others come from the cache when the PR's head and base shas are
+    unchanged, and are fetched from GitHub only for new or moved PRs. Entries
+    of PRs no longer open are pruned.
+    """
+    with shared_state_lock():
+        cache = pr_files_cache.load_cache()
+        hits = fetched = 0
+        for pr in prs:
+            files = pr.get("files")
+            if files is None:
+                files = pr_files_cache.lookup(cache, pr)
+                if files is not None:
+                    hits += 1
+                else:
+                    files = get_pr_files(pr["number"])
+                    fetched += 1
+            if files is not None:
+                pr_files_cache.store(cache, pr, files)
+            pr["files"] = files
+        dropped = pr_files_cache.prune(cache, [pr["number"] for pr in prs])
+        pr_files_cache.save_cache(cache)
+    print(
+        f"🗂️  PR files cache: {hits} hit(s), {fetched} fetched, "
+        f"{len(prs) - hits - fetched} from the PR query, {dropped} pruned"
+    )
+
+
+def pr_merge_message(pr):
+    """Merge commit message for a PR merged from its local head ref."""
+    head = pr.get("head") or {}
+    source = head.get("label") or head.get("ref") or "unknown"
+    return f"Merge pull request #{pr['number']} from {source}"
+
+
 def try_resolve_known_conflict(pr_number):
     """Attempt to resolve a known per-file conflict for a specific PR.
     Must be called while a conflicted merge is in progress (before --abort).
@@ -313,46 +424,247 @@ def setup_repository():
 def get_open_prs():
     """Get open pull requests from IfcOpenShell repository"""
     print("Fetching open pull requests...")
-    url = f"https://api.github.com/repos/{upstream_repo}/pulls"
-    params = {"state": "open", "per_page": 100, "sort": "created", "direction": "desc"}
+    client = github_client.default_client()
+    all_prs = None
+    if PR_GRAPHQL:
+        # With an empty files cache (first run), ask for every PR's files in
+        # the same queries; afterwards only new or moved PRs need fetching.
+        cold_cache = not pr_files_cache.load_cache()["entries"]
+        try:
+            all_prs = pr_snapshot.fetch_open_prs(
+                client, SOURCE_REPO_OWNER, SOURCE_REPO_NAME, with_files=cold_cache
+            )
+        except (requests.RequestException, github_client.GraphQLError) as e:
+            print(f"⚠️  GraphQL PR query failed ({e}); falling back to REST")
 
-    all_prs = []
-    page = 1
+    if all_prs is None:
+        params = {"state": "open", "sort": "created", "direction": "desc"}
+        all_prs = []
+        try:
+            for pr in client.paginate(f"repos/{upstream_repo}/pulls", params=params):
+                all_prs.append(pr)
+        except requests.RequestException as e:
+            print(f"Error fetching PRs: {e}")
 
-    while True:
-        params["page"] = page
-        response = requests.get(url, headers=github_headers(), params=params)
-        if response.status_code != 200:
-            print(f"Error fetching PRs: {response.status_code}")
-            break
+    # Filter by users if specified
+    if users and users != [""]:
+        all_prs = [pr for pr in all_prs if pr["user"]["login"] in users]
 
-        prs = response.json()
-        if not prs:
-            break
+    print(f"Found {len(all_prs)} open pull requests")
+    attach_pr_files(all_prs)
+    return all_prs
 
-        # Filter by users if specified
-        if users and users != [""]:
-            prs = [pr for pr in prs if pr["user"]["login"] in users]
 
-        all_prs.extend(prs)
-        page += 1
+def sort_prs(prs, merge_order):
+    """PRs in the priority order of `merge_order` (ascending/descending/by-updated)."""
+    if merge_order == "by-updated":
+        return sorted(prs, key=lambda pr: pr.get("updated_at", ""), reverse=True)
+    return sorted(prs, key=lambda pr: pr["number"], reverse=merge_order == "descending")
 
-        if len(prs) < 100:  # Last page
-            break
 
-    print(f"Found {len(all_prs)} open pull requests")
-    return all_prs
+def plan_merge_order(candidates, merge_order, base_commit, fetch_results):
+    """Reorder `candidates` so the PRs the conflict graph can merge come first.
 
+    The graph is rebuilt only when the base commit, a head sha or the known
+    conflict resolutions changed since it was last written, so the concurrent
+    merge orders reuse the graph the --setup-only pass built; a rebuild
+    only probes the pairs missing from the on-disk probe cache. Plans for
+    all three orders are stored with it for main.py and the report. Callers
+    hold shared_state_lock().
 
-def apply_prs_to_branch(branch_name, prs):
-    """Apply PRs to the new branch"""
+    Returns (ordered candidates, graph); the graph is None without merge-tree.
+    """
+    if not merge_probe.merge_tree_supported(work_dir):
+        print("⚠️  git < 2.38: conflict planner disabled, merging in sorted order")
+        return candidates, None
+    local_heads = pr_refs.local_pr_refs(work_dir)
+    heads = {
+        pr["number"]: local_heads[pr["number"]]
+        for pr in candidates
+        if fetch_results.get(pr["number"], {}).get("ok")
+        and pr["number"] in local_heads
+    }
+    graph = conflict_graph.load_graph(REPORTS_DIR)
+    if conflict_graph.graph_matches(
+        graph, base_commit, heads, KNOWN_CONFLICT_RESOLUTIONS
+    ):
+        print(f"🕸️  Reusing conflict graph for {len(heads)} PR(s)")
+    else:
+        # Pairs whose base commit and head shas are unchanged since an earlier
+        # run come from the on-disk probe cache.
+        cache = conflict_graph.load_pair_cache()
+        graph = conflict_graph.build_graph(
+            work_dir,
+            base_commit,
+            heads,
+            KNOWN_CONFLICT_RESOLUTIONS,
+            cache=cache,
+            changed_files={pr["number"]: pr.get("files") for pr in candidates},
+        )
+        conflict_graph.save_pair_cache(cache)
+    graph["plans"] = {
+        suffix: conflict_graph.plan_order(
+            [pr["number"] for pr in sort_prs(candidates, order)], graph
+        )
+        for order, suffix in pr_state.ORDER_SUFFIX_BY_NAME.items()
+    }
+    conflict_graph.write_graph(graph, REPORTS_DIR)
+
+    plan = graph["plans"][pr_state.ORDER_SUFFIX_BY_NAME.get(merge_order, "asc")]
+    print(
+        f"🧭 Merge plan ({merge_order}): {len(plan['merged'])} PR(s) predicted to "
+        f"merge, {len(plan['blocked'])} predicted to fail"
+    )
+    by_number = {pr["number"]: pr for pr in candidates}
+    return [by_number[n] for n in plan["order"]], graph
+
+
+def partition_prs(prs):
+    """Split `prs` into merge candidates and skipped PRs (with a skip_reason)."""
+    candidates = []
+    skipped = []
+    for pr in prs:
+        pr_number = pr["number"]
+
+        # Skip PRs in EXCLUDED list
+        if pr_number in excluded_prs:
+            print(f"⚠️  Skipping PR #{pr_number}: Excluded by .env EXCLUDED list")
+            pr_with_reason = pr.copy()
+            pr_with_reason["skip_reason"] = "Excluded by .env EXCLUDED list"
+            pr_with_reason["individual_test_merge"] = None
+            skipped.append(pr_with_reason)
+            continue
+
+        # Check if PR is in draft status
+        if pr.get("draft", False):
+            print(f"⚠️  Skipping PR #{pr_number}: PR is in DRAFT status")
+            pr_with_reason = pr.copy()
+            pr_with_reason["skip_reason"] = "DRAFT status"
+            pr_with_reason["individual_test_merge"] = None
+            skipped.append(pr_with_reason)
+            continue
+
+        # Skip PRs that change C++ compiled into the wheel Bonsai loads.
+        # Their Python may depend on C++ that BonsaiPR never recompiles, so
+        # the feature won't work in the build even if the merge succeeds.
+        if SKIP_CPP_PRS and pr_needs_cpp_recompile(pr_number, pr.get("files")):
+            print(
+                f"⚠️  Skipping PR #{pr_number}: "
+                f"changes C++ not recompiled by BonsaiPR"
+            )
+            pr_with_reason = pr.copy()
+            pr_with_reason["skip_reason"] = (
+                "Requires C++ recompile — not built by BonsaiPR (pinned wheel)"
+            )
+            pr_with_reason["individual_test_merge"] = None
+            skipped.append(pr_with_reason)
+            continue
+
+        # Check if PR head repo is accessible
+        if not pr.get("head") or not pr["head"].get("repo"):
+            print(
+                f"⚠️  Skipping PR #{pr_number}: Repository no longer accessible (deleted fork)"
+            )
+            pr_with_reason = pr.copy()
+            pr_with_reason["skip_reason"] = (
+                "Repository no longer accessible (deleted fork)"
+            )
+            pr_with_reason["individual_test_merge"] = None
+            skipped.append(pr_with_reason)
+            continue
+
+        pr_head_ref = pr["head"]["ref"]
+        pr_head_repo = pr["head"]["repo"]["clone_url"]
+
+        # Additional safety check for required fields
+        if not pr_head_ref or not pr_head_repo:
+            print(f"⚠️  Skipping PR #{pr_number}: Missing required PR information")
+            pr_with_reason = pr.copy()
+            pr_with_reason["skip_reason"] = "Missing required PR information"
+            pr_with_reason["individual_test_merge"] = None
+            skipped.append(pr_with_reason)
+            continue
+
+        candidates.append(pr)
+    return candidates, skipped
+
+
+def prefetch_and_plan(prs):
+    """Fetch every candidate's head and plan all merge orders (--setup-only).
+
+    Runs once before main.py starts the concurrent merge orders, so each of
+    them finds its PR heads in the ref store and reuses this conflict graph
+    instead of fetching and probing the same pairs three times at once.
+    """
+    original_dir = os.getcwd()
+    try:
+        os.chdir(work_dir)
+        base_commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True
+        ).stdout.strip()
+        candidates, skipped = partition_prs(prs)
+        with shared_state_lock():
+            fetch_results = pr_refs.fetch_pr_heads(
+                work_dir,
+                {pr["number"]: (pr.get("head") or {}).get("sha") for pr in candidates},
+            )
+            if CONFLICT_PLANNER and base_commit:
+                plan_merge_order(
+                    sort_prs(candidates, "ascending"),
+                    "ascending",
+                    base_commit,
+                    fetch_results,
+                )
+        print(
+            f"📦 Prepared {len(candidates)} PR head(s) for the merge orders "
+            f"({len(skipped)} skipped)"
+        )
+    finally:
+        os.chdir(original_dir)
+
+
+def _predicted_merge_blockers(graph, pr_number, applied):
+    """Why merging `pr_number` now is predicted to fail (empty if it is not).
+
+    A PR that conflicts with the base, or with an already merged PR, in the
+    pairwise conflict graph fails in the sequential merge too, unless a known
+    resolution covers it.
+    """
+    entry = (graph.get("prs") or {}).get(str(pr_number)) or {}
+    if (
+        entry.get("base") == conflict_graph.BASE_CONFLICT
+        and pr_number not in KNOWN_CONFLICT_RESOLUTIONS
+    ):
+        return [f"base {SOURCE_BASE_BRANCH}"]
+    return [
+        f"PR #{n}"
+        for n in conflict_graph.predicted_blockers(
+            graph, pr_number, [pr["number"] for pr in applied]
+        )
+    ]
+
+
+def _move_branch_to(commit):
+    """Point the checked-out branch, index and working tree at `commit`."""
+    subprocess.run(["git", "reset", "-q", "--hard", commit], check=True)
+
+
+def apply_prs_to_branch(branch_name, prs, merge_order="ascending"):
+    """Apply PRs to the new branch.
+
+    Returns (applied, failed, skipped, merge_stats); merge_stats counts the
+    fast-path, `git merge` and predicted-conflict PRs, and lists the latter in
+    "predicted_prs" (None when the fast path is off).
+    """
     original_dir = os.getcwd()
     applied = []
     failed = []
-    skipped = []
 
     try:
         os.chdir(work_dir)
+        base_commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True
+        ).stdout.strip()
 
         # Check if branch already exists, if so delete it and recreate
         result = subprocess.run(
@@ -366,148 +678,309 @@ def apply_prs_to_branch(branch_name, prs):
         subprocess.run(["git", "checkout", "-b", branch_name], check=True)
         print(f"Created new branch: {branch_name}")
 
-        for pr in prs:
-            pr_number = pr["number"]
-            pr_title = pr["title"]
-
-            # Skip PRs in EXCLUDED list
-            if pr_number in excluded_prs:
-                print(f"⚠️  Skipping PR #{pr_number}: Excluded by .env EXCLUDED list")
-                pr_with_reason = pr.copy()
-                pr_with_reason["skip_reason"] = "Excluded by .env EXCLUDED list"
-                pr_with_reason["individual_test_merge"] = None
-                skipped.append(pr_with_reason)
-                continue
-
-            # Check if PR is in draft status
-            if pr.get("draft", False):
-                print(f"⚠️  Skipping PR #{pr_number}: PR is in DRAFT status")
-                pr_with_reason = pr.copy()
-                pr_with_reason["skip_reason"] = "DRAFT status"
-                pr_with_reason["individual_test_merge"] = None
-                skipped.append(pr_with_reason)
-                continue
-
-            # Skip PRs that change C++ compiled into the wheel Bonsai loads.
-            # Their Python may depend on C++ that BonsaiPR never recompiles, so
-            # the feature won't work in the build even if the merge succeeds.
-            if SKIP_CPP_PRS and pr_needs_cpp_recompile(pr_number):
-                print(
-                    f"⚠️  Skipping PR #{pr_number}: "
-                    f"changes C++ not recompiled by BonsaiPR"
+        # Decide up front which PRs are skipped, so every remaining PR head can
+        # be fetched in a few batched fetches before the merge loop starts.
+        candidates, skipped = partition_prs(prs)
+
+        # PRs whose head.sha is already a local commit (previous run, or the
+        # --setup-only pass of this run) are served from the ref store.
+        graph = None
+        with shared_state_lock():
+            fetch_results = pr_refs.fetch_pr_heads(
+                work_dir,
+                {pr["number"]: (pr.get("head") or {}).get("sha") for pr in candidates},
+            )
+            if CONFLICT_PLANNER and base_commit:
+                candidates, graph = plan_merge_order(
+                    candidates, merge_order, base_commit, fetch_results
                 )
-                pr_with_reason = pr.copy()
-                pr_with_reason["skip_reason"] = (
-                    "Requires C++ recompile — not built by BonsaiPR (pinned wheel)"
+            local_heads = pr_refs.local_pr_refs(work_dir)
+
+        # Checkpoint keys cover the prefix of PRs up to the first one that could
+        # not be fetched: a fetch failure is transient, so nothing after it is
+        # a reproducible merge result.
+        sequence = []
+        for pr in candidates:
+            if not fetch_results.get(pr["number"], {}).get("ok"):
+                break
+            sequence.append((pr["number"], local_heads.get(pr["number"])))
+        checkpoint_keys = []
+        checkpoint_index = {}
+        order_suffix = pr_state.ORDER_SUFFIX_BY_NAME.get(merge_order, "asc")
+        resume_at = 0
+        if MERGE_CHECKPOINTS and base_commit:
+            # A skipped prediction is not a merge result: keep the two modes'
+            # checkpoints apart.
+            checkpoint_keys = merge_checkpoints.prefix_keys(
+                base_commit,
+                conflict_graph.resolutions_hash(KNOWN_CONFLICT_RESOLUTIONS)
+                + (":skip-predicted" if MERGE_SKIP_PREDICTED else ""),
+                sequence,
+            )
+            checkpoint_index = merge_checkpoints.load_index(order_suffix)
+            resume_at, resumed = merge_checkpoints.find_resume_point(
+                work_dir, checkpoint_index, checkpoint_keys, order_suffix
+            )
+            if resume_at:
+                subprocess.run(
+                    ["git", "reset", "--hard", resumed[-1]["commit"]],
+                    check=True,
+                    capture_output=True,
                 )
-                pr_with_reason["individual_test_merge"] = None
-                skipped.append(pr_with_reason)
-                continue
-
-            # Check if PR head repo is accessible
-            if not pr.get("head") or not pr["head"].get("repo"):
+                for pr, entry in zip(candidates, resumed):
+                    outcome = entry["outcome"]
+                    (applied if outcome == merge_checkpoints.OUTCOME_APPLIED else failed).append(pr)
                 print(
-                    f"⚠️  Skipping PR #{pr_number}: Repository no longer accessible (deleted fork)"
+                    f"♻️  Resumed from merge checkpoint after {resume_at} PR(s) "
+                    f"({sum(1 for e in resumed if e['outcome'] == merge_checkpoints.OUTCOME_APPLIED)} "
+                    f"merged); merging the remaining {len(candidates) - resume_at}"
                 )
-                pr_with_reason = pr.copy()
-                pr_with_reason["skip_reason"] = (
-                    "Repository no longer accessible (deleted fork)"
-                )
-                pr_with_reason["individual_test_merge"] = None
-                skipped.append(pr_with_reason)
-                continue
 
-            pr_head_ref = pr["head"]["ref"]
-            pr_head_repo = pr["head"]["repo"]["clone_url"]
-
-            # Additional safety check for required fields
-            if not pr_head_ref or not pr_head_repo:
-                print(f"⚠️  Skipping PR #{pr_number}: Missing required PR information")
-                pr_with_reason = pr.copy()
-                pr_with_reason["skip_reason"] = "Missing required PR information"
-                pr_with_reason["individual_test_merge"] = None
-                skipped.append(pr_with_reason)
+        # A PR that shares no changed path with a merged PR is merged in the
+        # object database, and the working tree is only moved once per run of
+        # such PRs (merge_probe.fast_path_commit).
+        fast_path = MERGE_FAST_PATH and merge_probe.merge_tree_supported(work_dir)
+        merged_paths = merge_probe.MergedPaths()
+        for pr in applied:
+            merged_paths.add(pr["number"], pr.get("files"))
+        merge_stats = {
+            "fast_path": 0,
+            "batches": 0,
+            "sequential": 0,
+            "predicted": 0,
+            "predicted_prs": [],
+        }
+        tip = worktree_tip = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True
+        ).stdout.strip()
+
+        for position, pr in enumerate(candidates[resume_at:], resume_at):
+            pr_number = pr["number"]
+            pr_title = pr["title"]
+            fetch = fetch_results.get(pr_number, {})
+            print(
+                f"Applying PR #{pr_number}: {pr_title} "
+                f"(fetch {fetch.get('seconds', 0.0):.2f}s)"
+            )
+            if not fetch.get("ok"):
+                print(f"❌ Failed to fetch PR #{pr_number}: {fetch.get('error')}")
+                failed.append(pr)
                 continue
 
-            print(f"Applying PR #{pr_number}: {pr_title}")
-
-            try:
-                # Add remote for PR if it's from a fork
-                remote_name = f"pr-{pr_number}"
-                subprocess.run(
-                    ["git", "remote", "remove", remote_name], capture_output=True
-                )  # Remove if exists
-                subprocess.run(
-                    ["git", "remote", "add", remote_name, pr_head_repo], check=True
+            outcome = None
+            # The graph only orders the PRs: a predicted conflict is still
+            # merged (sequentially) unless MERGE_SKIP_PREDICTED opts out.
+            blockers = (
+                _predicted_merge_blockers(graph, pr_number, applied)
+                if fast_path and graph
+                else []
+            )
+            fast_commit = None
+            if fast_path:
+                fast_commit = merge_probe.fast_path_commit(
+                    work_dir,
+                    tip,
+                    pr_refs.pr_ref(pr_number),
+                    pr_merge_message(pr),
+                    pr.get("files"),
+                    merged_paths,
+                    blockers,
                 )
 
-                # Fetch the PR branch
-                fetch_result = subprocess.run(
-                    ["git", "fetch", remote_name, pr_head_ref],
-                    capture_output=True,
-                    text=True,
+            if blockers and MERGE_SKIP_PREDICTED:
+                print(
+                    f"⏭️  Not merging PR #{pr_number}: predicted to conflict with "
+                    f"{', '.join(blockers)}"
                 )
-
-                if fetch_result.returncode != 0:
-                    print(f"❌ Failed to fetch PR #{pr_number}: {fetch_result.stderr}")
-                    failed.append(pr)
-                    subprocess.run(
-                        ["git", "remote", "remove", remote_name], capture_output=True
+                failed.append(pr)
+                outcome = merge_checkpoints.OUTCOME_FAILED
+                merge_stats["predicted"] += 1
+                merge_stats["predicted_prs"].append(pr_number)
+            elif fast_commit:
+                print(
+                    f"✅ Successfully applied PR #{pr_number} "
+                    f"(fast path: no files shared with merged PRs)"
+                )
+                tip = fast_commit
+                applied.append(pr)
+                outcome = merge_checkpoints.OUTCOME_APPLIED
+                merge_stats["fast_path"] += 1
+            else:
+                if tip != worktree_tip:
+                    _move_branch_to(tip)
+                    merge_stats["batches"] += 1
+                merge_stats["sequential"] += 1
+                try:
+                    # Merge the locally fetched head; no per-PR remote or network.
+                    merge_result = subprocess.run(
+                        [
+                            "git",
+                            "merge",
+                            "--no-ff",
+                            "--no-edit",
+                            "-m",
+                            pr_merge_message(pr),
+                            pr_refs.pr_ref(pr_number),
+                        ],
+                        capture_output=True,
+                        text=True,
                     )
-                    continue
 
-                # Try to merge the PR
-                merge_result = subprocess.run(
-                    [
-                        "git",
-                        "merge",
-                        "--no-ff",
-                        "--no-edit",
-                        f"{remote_name}/{pr_head_ref}",
-                    ],
-                    capture_output=True,
-                    text=True,
-                )
+                    if merge_result.returncode == 0:
+                        print(f"✅ Successfully applied PR #{pr_number}")
+                        applied.append(pr)
+                        outcome = merge_checkpoints.OUTCOME_APPLIED
+                    elif try_resolve_known_conflict(pr_number):
+                        print(
+                            f"✅ Successfully applied PR #{pr_number} (resolved known conflict)"
+                        )
+                        applied.append(pr)
+                        outcome = merge_checkpoints.OUTCOME_APPLIED
+                    else:
+                        print(f"❌ Failed to apply PR #{pr_number}: {merge_result.stderr}")
+                        subprocess.run(["git", "merge", "--abort"], capture_output=True)
+                        failed.append(pr)
+                        outcome = merge_checkpoints.OUTCOME_FAILED
 
-                if merge_result.returncode == 0:
-                    print(f"✅ Successfully applied PR #{pr_number}")
-                    applied.append(pr)
-                elif try_resolve_known_conflict(pr_number):
-                    print(
-                        f"✅ Successfully applied PR #{pr_number} (resolved known conflict)"
-                    )
-                    applied.append(pr)
-                else:
-                    print(f"❌ Failed to apply PR #{pr_number}: {merge_result.stderr}")
-                    subprocess.run(["git", "merge", "--abort"], capture_output=True)
+                except subprocess.CalledProcessError as e:
+                    print(f"❌ Error applying PR #{pr_number}: {e}")
                     failed.append(pr)
-
-                # Clean up remote
-                subprocess.run(
-                    ["git", "remote", "remove", remote_name], capture_output=True
+                    subprocess.run(["git", "merge", "--abort"], capture_output=True)
+                tip = worktree_tip = subprocess.run(
+                    ["git", "rev-parse", "HEAD"], capture_output=True, text=True
+                ).stdout.strip()
+
+            if outcome == merge_checkpoints.OUTCOME_APPLIED:
+                merged_paths.add(pr_number, pr.get("files"))
+
+            if outcome is None:
+                # An unexpected git error is not a reproducible result.
+                checkpoint_keys = checkpoint_keys[:position]
+            elif position < len(checkpoint_keys):
+                merge_checkpoints.record(
+                    work_dir,
+                    checkpoint_index,
+                    checkpoint_keys[position],
+                    pr_number,
+                    outcome,
+                    order_suffix,
+                    base_commit,
+                    commit=tip,
                 )
 
-            except subprocess.CalledProcessError as e:
-                print(f"❌ Error applying PR #{pr_number}: {e}")
-                failed.append(pr)
-                subprocess.run(["git", "merge", "--abort"], capture_output=True)
-                subprocess.run(
-                    ["git", "remote", "remove", remote_name], capture_output=True
-                )
+        if tip != worktree_tip:
+            _move_branch_to(tip)
+            merge_stats["batches"] += 1
+
+        if MERGE_CHECKPOINTS and base_commit:
+            merge_checkpoints.prune(
+                work_dir, checkpoint_index, checkpoint_keys, order_suffix
+            )
+            merge_checkpoints.save_index(checkpoint_index, order_suffix)
 
         print(f"\nPR Application Summary:")
         print(f"✅ Successfully applied: {len(applied)} PRs")
         print(f"❌ Failed to apply: {len(failed)} PRs")
         print(f"⚠️  Skipped (draft/repo issues): {len(skipped)} PRs")
+        if fast_path:
+            print(
+                f"⚡ Merge paths: {merge_stats['fast_path']} fast path in "
+                f"{merge_stats['batches']} worktree update(s), "
+                f"{merge_stats['sequential']} `git merge`, "
+                f"{merge_stats['predicted']} not attempted as predicted conflicts"
+            )
 
-        return applied, failed, skipped
+        return applied, failed, skipped, merge_stats if fast_path else None
 
     finally:
         os.chdir(original_dir)
 
 
+def _test_merge_in_worktree(pr):
+    """Merge a PR alone on a throwaway branch off base, for git < 2.38.
+
+    Checks out base, merges, lists the unmerged paths and aborts. Must run with
+    cwd=work_dir. Returns (clean, conflicting_files, error_message).
+    """
+    pr_number = pr["number"]
+    test_branch = f"test-merge-pr-{pr_number}"
+    try:
+        # Clean up any existing test branch
+        subprocess.run(["git", "branch", "-D", test_branch], capture_output=True)
+        # Detached: in a merge-order worktree the base branch is checked out
+        # by the main clone and cannot be checked out again.
+        subprocess.run(["git", "checkout", "--detach", SOURCE_BASE_BRANCH], check=True)
+        subprocess.run(["git", "checkout", "-b", test_branch], check=True)
+
+        merge_result = subprocess.run(
+            [
+                "git",
+                "merge",
+                "--no-ff",
+                "--no-edit",
+                "-m",
+                pr_merge_message(pr),
+                pr_refs.pr_ref(pr_number),
+            ],
+            capture_output=True,
+            text=True,
+        )
+        conflicting_files = []
+        if merge_result.returncode != 0:
+            # Capture conflicting files before aborting
+            conflict_result = subprocess.run(
+                ["git", "diff", "--name-only", "--diff-filter=U"],
+                capture_output=True,
+                text=True,
+            )
+            conflicting_files = [
+                f.strip() for f in conflict_result.stdout.strip().split("\n") if f.strip()
+            ]
+            subprocess.run(["git", "merge", "--abort"], capture_output=True)
+
+        # Clean up branch
+        subprocess.run(["git", "checkout", "--detach", SOURCE_BASE_BRANCH], check=True)
+        subprocess.run(["git", "branch", "-D", test_branch], capture_output=True)
+        return merge_result.returncode == 0, conflicting_files, merge_result.stderr
+    except Exception as e:
+        try:
+            subprocess.run(["git", "merge", "--abort"], capture_output=True)
+            subprocess.run(["git", "checkout", "--detach", SOURCE_BASE_BRANCH], check=True)
+            subprocess.run(["git", "branch", "-D", test_branch], capture_output=True)
+        except Exception:
+            pass
+        return None, [], str(e)
+
+
+def _test_failed_pr(pr, since_commit, use_merge_tree):
+    """Test one failed PR alone against base; safe to run in a worker thread.
+
+    The merge-tree probe and find_breaking_commit_hints() only read the object
+    database (cwd=work_dir is passed explicitly), so many can run at once.
+    Returns (clean, conflicting_files, breaking_hints, error).
+    """
+    if use_merge_tree:
+        probe = merge_probe.probe_merge(
+            work_dir, SOURCE_BASE_BRANCH, pr_refs.pr_ref(pr["number"])
+        )
+        clean, conflicting_files, error = probe["clean"], probe["files"], probe["error"]
+    else:
+        clean, conflicting_files, error = _test_merge_in_worktree(pr)
+    breaking_hints = []
+    if clean is False:
+        breaking_hints = find_breaking_commit_hints(
+            conflicting_files, since_commit=since_commit
+        )
+    return clean, conflicting_files, breaking_hints, error
+
+
 def test_failed_prs_individually(failed_prs, failure_tracking=None):
     """Test each failed PR by merging it alone against base.
+
+    Uses `git merge-tree --write-tree` (scripts/merge_probe.py) so the probe
+    never touches the worktree, and runs up to FAILED_PR_TEST_WORKERS probes
+    at once; falls back to a serial checkout/merge/abort cycle on git < 2.38.
+    Results are reported in the order of `failed_prs` either way.
     Returns:
         pr_test_results  : dict pr_number -> True/False/None
         pr_conflict_data : dict pr_number -> {"files": [...], "breaking_commits": [...]}
@@ -516,120 +989,84 @@ def test_failed_prs_individually(failed_prs, failure_tracking=None):
     original_dir = os.getcwd()
     pr_test_results = {}
     pr_conflict_data = {}
+    use_merge_tree = merge_probe.merge_tree_supported(work_dir)
+    if not use_merge_tree:
+        print("⚠️  git < 2.38: testing merges in the worktree (slow)")
     try:
         os.chdir(work_dir)
-        for pr in failed_prs:
-            pr_number = pr["number"]
-            pr_title = pr["title"]
-            pr_head_ref = pr.get("head", {}).get("ref")
-            pr_head_repo = pr.get("head", {}).get("repo", {}).get("clone_url")
-            if not pr_head_ref or not pr_head_repo:
-                pr_test_results[pr_number] = None
-                print(f"[SKIP] PR #{pr_number}: Missing head ref/repo for test merge.")
-                continue
-
-            test_branch = f"test-merge-pr-{pr_number}"
-            print(
-                f"[TEST] PR #{pr_number}: Creating branch '{test_branch}' from {SOURCE_BASE_BRANCH} and testing merge..."
+        # The heads were stored by apply_prs_to_branch, so this is normally all
+        # cache hits; it only touches the network if a ref went missing.
+        testable = [
+            pr
+            for pr in failed_prs
+            if pr.get("head", {}).get("ref")
+            and pr.get("head", {}).get("repo", {}).get("clone_url")
+        ]
+        with shared_state_lock():
+            fetch_results = pr_refs.fetch_pr_heads(
+                work_dir, {pr["number"]: pr["head"].get("sha") for pr in testable}
             )
-            try:
-                # Clean up any existing test branch
-                subprocess.run(
-                    ["git", "branch", "-D", test_branch], capture_output=True
+        to_test = [
+            pr
+            for pr in testable
+            if fetch_results.get(pr["number"], {}).get("ok")
+        ]
+        since_commits = {}
+        for pr in to_test:
+            entry = (failure_tracking or {}).get(str(pr["number"]), {})
+            since_commits[pr["number"]] = entry.get("base_commit") or None
+
+        # The worktree fallback mutates the single checkout, so it stays serial.
+        workers = FAILED_PR_TEST_WORKERS if use_merge_tree else 1
+        probe_start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {
+                pr["number"]: pool.submit(
+                    _test_failed_pr, pr, since_commits[pr["number"]], use_merge_tree
                 )
-                subprocess.run(["git", "checkout", SOURCE_BASE_BRANCH], check=True)
-                subprocess.run(["git", "checkout", "-b", test_branch], check=True)
-
-                # Add remote for PR
-                remote_name = f"prtest-{pr_number}"
-                subprocess.run(
-                    ["git", "remote", "remove", remote_name], capture_output=True
-                )
-                subprocess.run(
-                    ["git", "remote", "add", remote_name, pr_head_repo], check=True
-                )
-                fetch_result = subprocess.run(
-                    ["git", "fetch", remote_name, pr_head_ref],
-                    capture_output=True,
-                    text=True,
-                )
-                if fetch_result.returncode != 0:
-                    print(
-                        f"[FAIL] PR #{pr_number}: Could not fetch PR branch: {fetch_result.stderr}"
-                    )
-                    pr_test_results[pr_number] = False
-                    subprocess.run(
-                        ["git", "remote", "remove", remote_name], capture_output=True
-                    )
-                    subprocess.run(["git", "checkout", SOURCE_BASE_BRANCH], check=True)
+                for pr in to_test
+            }
+            for pr in failed_prs:
+                pr_number = pr["number"]
+                if pr_number not in futures:
+                    if pr not in testable:
+                        pr_test_results[pr_number] = None
+                        print(f"[SKIP] PR #{pr_number}: Missing head ref/repo for test merge.")
+                    else:
+                        fetch = fetch_results.get(pr_number, {})
+                        print(
+                            f"[FAIL] PR #{pr_number}: Could not fetch PR branch: {fetch.get('error')}"
+                        )
+                        pr_test_results[pr_number] = False
                     continue
 
-                # Try to merge PR alone
-                merge_result = subprocess.run(
-                    [
-                        "git",
-                        "merge",
-                        "--no-ff",
-                        "--no-edit",
-                        f"{remote_name}/{pr_head_ref}",
-                    ],
-                    capture_output=True,
-                    text=True,
-                )
-                if merge_result.returncode == 0:
+                print(f"[TEST] PR #{pr_number}: Testing merge against {SOURCE_BASE_BRANCH}...")
+                try:
+                    clean, conflicting_files, breaking_hints, error = futures[
+                        pr_number
+                    ].result()
+                except Exception as e:
+                    clean, conflicting_files, breaking_hints, error = None, [], [], str(e)
+                if clean is None:
+                    print(f"[ERROR] PR #{pr_number}: Exception during test merge: {error}")
+                    pr_test_results[pr_number] = False
+                elif clean:
                     print(f"[PASS] PR #{pr_number}: Merges cleanly against base.")
                     pr_test_results[pr_number] = True
                 else:
                     print(
-                        f"[FAIL] PR #{pr_number}: Merge conflict or error: {merge_result.stderr}"
-                    )
-                    # Capture conflicting files before aborting
-                    conflict_result = subprocess.run(
-                        ["git", "diff", "--name-only", "--diff-filter=U"],
-                        capture_output=True,
-                        text=True,
-                    )
-                    conflicting_files = [
-                        f.strip()
-                        for f in conflict_result.stdout.strip().split("\n")
-                        if f.strip()
-                    ]
-                    since_commit = None
-                    if failure_tracking:
-                        entry = failure_tracking.get(str(pr_number), {})
-                        since_commit = entry.get("base_commit") or None
-                    breaking_hints = find_breaking_commit_hints(
-                        conflicting_files, since_commit=since_commit
+                        f"[FAIL] PR #{pr_number}: Conflicts with base in "
+                        f"{len(conflicting_files)} file(s): {', '.join(conflicting_files[:5])}"
                     )
                     pr_conflict_data[pr_number] = {
                         "files": conflicting_files,
                         "breaking_commits": breaking_hints,
                     }
-                    subprocess.run(["git", "merge", "--abort"], capture_output=True)
                     pr_test_results[pr_number] = False
-
-                # Clean up remote and branch
-                subprocess.run(
-                    ["git", "remote", "remove", remote_name], capture_output=True
-                )
-                subprocess.run(["git", "checkout", SOURCE_BASE_BRANCH], check=True)
-                subprocess.run(
-                    ["git", "branch", "-D", test_branch], capture_output=True
-                )
-            except Exception as e:
-                print(f"[ERROR] PR #{pr_number}: Exception during test merge: {e}")
-                pr_test_results[pr_number] = False
-                try:
-                    subprocess.run(["git", "merge", "--abort"], capture_output=True)
-                    subprocess.run(
-                        ["git", "remote", "remove", remote_name], capture_output=True
-                    )
-                    subprocess.run(["git", "checkout", SOURCE_BASE_BRANCH], check=True)
-                    subprocess.run(
-                        ["git", "branch", "-D", test_branch], capture_output=True
-                    )
-                except Exception:
-                    pass
+        print(
+            f"⏱️  Tested {len(pr_test_results)} failed PR(s) in "
+            f"{time.monotonic() - probe_start:.1f}s ({max(1, workers)} worker(s))"
+        )
     finally:
         os.chdir(original_dir)
     return pr_test_results, pr_conflict_data
@@ -695,12 +1132,19 @@ def apply_bonsai_replacements():
 
         replacement_count = 0
         files_modified = 0
+        files_prefiltered = 0
 
         for file_path in files:
             if not file_path.strip():
                 continue
 
             try:
+                # Byte-level check on a memory map: files without "bonsai"
+                # (most of the tree) are never decoded, searched or written.
+                if bonsai_rewrite.prefilter(file_path) != bonsai_rewrite.MATCH:
+                    files_prefiltered += 1
+                    continue
+
                 with open(file_path, "r", encoding="utf-8") as f:
                     content = f.read()
 
@@ -730,6 +1174,7 @@ def apply_bonsai_replacements():
         print(
             f"Text replacement complete: {replacement_count} replacements in {files_modified} files"
         )
+        print(f"Prefilter skipped {files_prefiltered} files without 'bonsai' or binary")
 
         # Commit the replacements
         subprocess.run(["git", "add", "."], check=True)
@@ -752,28 +1197,19 @@ def cleanup_old_branches():
 
     try:
         # Get all branches from the fork (handle pagination)
-        url = f"https://api.github.com/repos/{fork_owner}/{fork_repo}/branches"
+        client = github_client.default_client()
         all_branches = []
-        page = 1
-
-        while True:
-            params = {"per_page": 100, "page": page}
-            response = requests.get(url, headers=github_headers(), params=params)
-
-            if response.status_code != 200:
-                print(f"⚠️ Could not fetch branches: {response.status_code}")
-                return
-
-            page_branches = response.json()
-            if not page_branches:
-                break
-
-            all_branches.extend(page_branches)
-            page += 1
-
-            # Safety limit: don't fetch more than 500 branches
-            if len(all_branches) >= 500:
-                break
+        try:
+            for branch in client.paginate(
+                f"repos/{fork_owner}/{fork_repo}/branches", max_items=500
+            ):
+                all_branches.append(branch)
+                # Safety limit: don't fetch more than 500 branches
+                if len(all_branches) >= 500:
+                    break
+        except requests.RequestException as e:
+            print(f"⚠️ Could not fetch branches: {e}")
+            return
 
         print(f"📊 Fetched {len(all_branches)} total branches from repository")
 
@@ -801,21 +1237,22 @@ def cleanup_old_branches():
         print(f"📊 Found {len(build_branches)} build branches, keeping last 30")
         print(f"🗑️  Deleting {len(branches_to_delete)} old branches...")
 
-        deleted_count = 0
-        for branch_name in branches_to_delete:
-            delete_url = f"https://api.github.com/repos/{fork_owner}/{fork_repo}/git/refs/heads/{branch_name}"
-            delete_response = requests.delete(delete_url, headers=github_headers())
-
-            if delete_response.status_code == 204:
-                deleted_count += 1
-                print(f"  ✓ Deleted: {branch_name}")
-            else:
-                print(
-                    f"  ✗ Failed to delete {branch_name}: {delete_response.status_code}"
+        start = time.monotonic()
+        results = bulk_delete.delete_all(
+            client,
+            [
+                (
+                    branch_name,
+                    [f"repos/{fork_owner}/{fork_repo}/git/refs/heads/{branch_name}"],
                 )
+                for branch_name in branches_to_delete
+            ],
+        )
+        bulk_delete.print_summary(results, "Branch cleanup", time.monotonic() - start)
 
         print(
-            f"✅ Cleanup complete: {deleted_count}/{len(branches_to_delete)} branches deleted"
+            f"✅ Cleanup complete: {bulk_delete.succeeded(results)}/"
+            f"{len(branches_to_delete)} branches deleted"
         )
 
     except Exception as e:
@@ -851,14 +1288,34 @@ def load_failure_tracking(tracking_path):
     return {}
 
 
-def save_failure_tracking(tracking_path, data):
-    """Persist PR failure tracking data to disk."""
+def save_failure_tracking(tracking_path, data, resolved=()):
+    """Merge this run's PR failure tracking into the file on disk.
+
+    The merge orders run concurrently and share the file, so it is re-read and
+    rewritten under an exclusive lock on a sidecar file: an order never
+    overwrites entries another order saved in the meantime. Entries already on
+    disk keep their first-seen date and commit; `resolved` PR numbers (failing
+    when this run loaded the file, not any more) are dropped. Returns the
+    merged tracking data.
+    """
     try:
         os.makedirs(os.path.dirname(tracking_path), exist_ok=True)
-        with open(tracking_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        with open(f"{tracking_path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            merged = load_failure_tracking(tracking_path)
+            for pr_number in resolved:
+                merged.pop(str(pr_number), None)
+            for key, entry in data.items():
+                merged.setdefault(key, entry)
+            # Written via rename, so a reader never sees a torn file.
+            tmp_path = f"{tracking_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(merged, f, indent=2)
+            os.replace(tmp_path, tracking_path)
+        return merged
     except Exception as e:
         print(f"Warning: Could not save failure tracking file: {e}")
+        return data
 
 
 def update_failure_tracking(
@@ -920,6 +1377,31 @@ def find_breaking_commit_hints(conflicting_files, max_commits=5, since_commit=No
     return list(seen.values())[:max_commits]
 
 
+def get_merged_tree(branch_name):
+    """Tree id of the merged branch, or None."""
+    result = subprocess.run(
+        ["git", "-C", work_dir, "rev-parse", f"{branch_name}^{{tree}}"],
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def merge_paths_line(merge_stats):
+    """The report's "Merge Paths:" line for apply_prs_to_branch()'s merge_stats."""
+    line = (
+        f"Merge Paths: {merge_stats['fast_path']} fast-path "
+        f"(no files shared with merged PRs, {merge_stats['batches']} batch(es)), "
+        f"{merge_stats['sequential']} merged sequentially"
+    )
+    if merge_stats["predicted"]:
+        line += (
+            f", {merge_stats['predicted']} not attempted as predicted conflicts "
+            f"(MERGE_SKIP_PREDICTED, marked \"predicted\" below)"
+        )
+    return line
+
+
 def generate_report(
     applied_prs,
     failed_prs,
@@ -931,6 +1413,8 @@ def generate_report(
     failure_tracking=None,
     pr_conflict_data=None,
     merge_order="ascending",
+    merged_tree=None,
+    merge_stats=None,
 ):
     if skipped_prs is None:
         skipped_prs = []
@@ -938,6 +1422,7 @@ def generate_report(
         failure_tracking = {}
     if pr_conflict_data is None:
         pr_conflict_data = {}
+    predicted_prs = set((merge_stats or {}).get("predicted_prs") or ())
     print(f"Generating report at: {report_path}")
     # --- Count failed PRs by reason ---
     failed_conflict_with_base = 0
@@ -962,8 +1447,14 @@ def generate_report(
     # Purely additive: with fewer than two usable snapshots (first run ever, or a
     # fresh sandbox) the columns and summary bullets are simply omitted.
     order_states = pr_state.load_order_states(REPORTS_DIR)
-    robustness = pr_state.compute_robustness(order_states)
-    robustness_sources = pr_state.robustness_sources(order_states)
+    # The conflict graph predicts every order for THIS run's base; use it only
+    # if it was computed for the commit this branch was built from.
+    graph = conflict_graph.load_graph(REPORTS_DIR)
+    if not graph or graph.get("base_commit") != commit_hash:
+        graph = None
+    robustness = pr_state.compute_robustness(order_states, graph)
+    robustness_sources = pr_state.robustness_sources(order_states, graph)
+    planned_orders = set((graph or {}).get("plans") or {})
     order_releases = pr_state.order_releases(order_states)
     show_stability = len(robustness_sources) >= 2
 
@@ -992,6 +1483,10 @@ def generate_report(
         f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}\n")
         f.write(f"Branch: {branch_name}\n")
         f.write(f"IfcOpenShell source commit: {commit_hash}\n")
+        if merged_tree:
+            # main.py compares this with the tree of the order's last release
+            # to skip rebuilding an identical one.
+            f.write(f"Merged tree: {merged_tree}\n")
         if merge_order == "ascending":
             order_desc = "lowest → highest PR#"
         elif merge_order == "descending":
@@ -999,6 +1494,12 @@ def generate_report(
         else:
             order_desc = "most recently updated PR first"
         f.write(f"Merge Order: {merge_order} ({order_desc})\n")
+        if graph:
+            f.write(
+                "Merge Plan: PRs predicted to merge by the pairwise conflict graph were merged first\n"
+            )
+        if merge_stats:
+            f.write(merge_paths_line(merge_stats) + "\n")
         f.write(
             f"Fork Repository: https://github.com/{fork_owner}/{fork_repo}/tree/{branch_name}\n\n"
         )
@@ -1060,10 +1561,16 @@ def generate_report(
             f.write(
                 f"Cross-order stability compares the most recent snapshot of each order ({compared}).\n"
             )
-            f.write(
-                "      Snapshots are written when an order's build finishes, so companion orders are\n"
-            )
-            f.write("      generally one run behind:\n")
+            if planned_orders:
+                f.write(
+                    "      Orders marked 'predicted' come from this run's pairwise conflict graph\n"
+                )
+                f.write("      (reports/conflict_graph.json); the others are snapshots:\n")
+            else:
+                f.write(
+                    "      Snapshots are written when an order's build finishes, so companion orders are\n"
+                )
+                f.write("      generally one run behind:\n")
             for suffix, generated_at in robustness_sources:
                 release = order_releases.get(suffix, {})
                 # The tag is what the "Merges under" links point at; naming it
@@ -1073,7 +1580,10 @@ def generate_report(
                     if release.get("tag")
                     else ""
                 )
-                f.write(f"      - {suffix}: {generated_at or 'unknown'}{build}\n")
+                predicted = " (predicted)" if suffix in planned_orders else ""
+                f.write(
+                    f"      - {suffix}: {generated_at or 'unknown'}{predicted}{build}\n"
+                )
             f.write(
                 "      'Order-dependent' means the PR lost a conflict race to a PR it overlaps with.\n"
             )
@@ -1101,6 +1611,9 @@ def generate_report(
             def _pr_common_cells(pr):
                 pr_number = pr["number"]
                 pr_link = f"[#{pr_number}]({pr['html_url']})"
+                if pr_number in predicted_prs:
+                    # Not merged: skipped on the pairwise prediction alone.
+                    pr_link += " (predicted)"
                 author = _cell(pr['user']['login'])
                 branch = _cell(pr.get('head', {}).get('ref', 'unknown'))
                 last_sha = pr.get('head', {}).get('sha', '')
@@ -1192,22 +1705,32 @@ def generate_report(
             )
             merges_under_header = " Merges under |" if show_stability else ""
             merges_under_rule = "--------------|" if show_stability else ""
+            partners_header = " Conflicts with |" if graph else ""
+            partners_rule = "----------------|" if graph else ""
             f.write(
                 "| PR | Title | Author | Branch | Last commit | First detected | Base commit |"
-                f"{merges_under_header}\n"
+                f"{merges_under_header}{partners_header}\n"
             )
             f.write(
                 "|----|-------|--------|--------|-------------|----------------|-------------|"
-                f"{merges_under_rule}\n"
+                f"{merges_under_rule}{partners_rule}\n"
             )
             for pr in other_conflicts:
                 pr_link, author, branch, last_commit, first_detected, base_commit_cell = _pr_common_cells(pr)
                 merges_under = (
                     f" {_stability_cell(pr['number'])} |" if show_stability else ""
                 )
+                partners = ""
+                if graph:
+                    entry = robustness.get(str(pr["number"])) or {}
+                    partners = (
+                        " "
+                        + (", ".join(f"#{n}" for n in entry.get("conflicts_with", [])) or "—")
+                        + " |"
+                    )
                 f.write(
                     f"| {pr_link} | {_cell(pr['title'])} | {author} | {branch} | {last_commit} | "
-                    f"{first_detected} | {base_commit_cell} |{merges_under}\n"
+                    f"{first_detected} | {base_commit_cell} |{merges_under}{partners}\n"
                 )
             f.write("\n")
         if skipped_prs:
@@ -1282,6 +1805,7 @@ def generate_report(
 
 
 def main():
+    global work_dir
     print("Starting weekly BonsaiPR branch creation...")
     print("This script creates clean branches with merged PRs for PR authors to test.")
     print(
@@ -1292,7 +1816,29 @@ def main():
         print("❌ Error: GITHUB_TOKEN not found in environment variables")
         print("Please check your .env file and ensure GITHUB_TOKEN is set")
         return
-    branch_name, report_path = get_branch_and_report_names()
+
+    # main.py runs the merge orders concurrently: one --setup-only pass updates
+    # the clone, fetches the PR heads and plans every order, then each order
+    # merges in its own worktree (--worktree) with its own --timestamp.
+    if "--setup-only" in sys.argv:
+        setup_repository()
+        prs = get_open_prs()
+        # The merge orders load this instead of querying GitHub again, so all
+        # of them see the same PRs.
+        pr_snapshot.save_snapshot(prs)
+        if prs:
+            with shared_state_lock():
+                pr_refs.prune_pr_refs(work_dir, [pr["number"] for pr in prs])
+        prefetch_and_plan(prs)
+        cleanup_old_branches()
+        print("\n🎉 Repository ready for the merge orders")
+        return
+    use_worktree = "--worktree" in sys.argv
+    timestamp = None
+    if "--timestamp" in sys.argv:
+        timestamp = sys.argv[sys.argv.index("--timestamp") + 1]
+
+    branch_name, report_path = get_branch_and_report_names(timestamp)
     print(f"Branch name: {branch_name}")
     print(f"Report will be saved as: {os.path.basename(report_path)}")
 
@@ -1319,7 +1865,14 @@ def main():
         merge_order_str = "ascending"
         print("Merging PRs in ascending order (lowest to highest number)")
     # Setup repository
-    setup_repository()
+    if use_worktree:
+        work_dir = order_worktrees.prepare_worktree(
+            work_dir,
+            pr_state.ORDER_SUFFIX_BY_NAME[merge_order_str],
+            SOURCE_BASE_BRANCH,
+        )
+    else:
+        setup_repository()
     # Get the commit hash of the source repository BEFORE merging any PRs
     try:
         source_commit_hash = (
@@ -1329,13 +1882,18 @@ def main():
         )
     except Exception:
         source_commit_hash = "unknown"
-    # Get open PRs
-    prs = get_open_prs()
-    # Sort PRs
-    if by_updated_order:
-        prs = sorted(prs, key=lambda pr: pr.get("updated_at", ""), reverse=True)
+    # Get open PRs (from the --setup-only pass's snapshot in a merge-order worktree)
+    prs = pr_snapshot.load_snapshot() if use_worktree else None
+    if prs is not None:
+        print(f"Loaded {len(prs)} open pull requests from the setup snapshot")
     else:
-        prs = sorted(prs, key=lambda pr: pr["number"], reverse=reverse_order)
+        prs = get_open_prs()
+    if prs and not use_worktree:
+        # Stored heads of PRs closed since the last run are never needed again.
+        with shared_state_lock():
+            pr_refs.prune_pr_refs(work_dir, [pr["number"] for pr in prs])
+    # Sort PRs
+    prs = sort_prs(prs, merge_order_str)
     if not prs:
         print("No open PRs found, creating branch with just main branch updates")
         applied, failed, skipped = [], [], []
@@ -1350,13 +1908,18 @@ def main():
         )
         print(f"[VERIFICATION] Current branch after merge: {result.stdout.strip()}")
         os.chdir(os.path.dirname(__file__))
+        previous_tracking = failure_tracking
         failure_tracking = update_failure_tracking(
             failure_tracking,
             set(),
             datetime.now().strftime("%Y-%m-%d"),
             source_commit_hash,
         )
-        save_failure_tracking(tracking_path, failure_tracking)
+        failure_tracking = save_failure_tracking(
+            tracking_path,
+            failure_tracking,
+            resolved=set(previous_tracking) - set(failure_tracking),
+        )
         generate_report(
             applied,
             failed,
@@ -1368,6 +1931,7 @@ def main():
             failure_tracking,
             pr_conflict_data,
             merge_order=merge_order_str,
+            merged_tree=get_merged_tree(branch_name),
         )
         print(f"\n🎉 Weekly BonsaiPR branch creation completed!")
         print(
@@ -1379,11 +1943,15 @@ def main():
         )
         return
     # Apply PRs to new branch
-    applied, failed, skipped = apply_prs_to_branch(branch_name, prs)
+    applied, failed, skipped, merge_stats = apply_prs_to_branch(
+        branch_name, prs, merge_order=merge_order_str
+    )
     # Push branch to fork BEFORE running individual PR tests
     push_branch_to_fork(branch_name)
-    # Clean up old branches after successfully pushing new one
-    cleanup_old_branches()
+    # Clean up old branches after successfully pushing new one (the
+    # --setup-only pass already did this for the concurrent merge orders)
+    if not use_worktree:
+        cleanup_old_branches()
     # Print current branch for verification
     os.chdir(work_dir)
     result = subprocess.run(
@@ -1399,13 +1967,18 @@ def main():
         for pr in failed
         if failed_pr_test_results.get(pr["number"]) is False
     }
+    previous_tracking = failure_tracking
     failure_tracking = update_failure_tracking(
         failure_tracking,
         currently_failing,
         datetime.now().strftime("%Y-%m-%d"),
         source_commit_hash,
     )
-    save_failure_tracking(tracking_path, failure_tracking)
+    failure_tracking = save_failure_tracking(
+        tracking_path,
+        failure_tracking,
+        resolved=set(previous_tracking) - set(failure_tracking),
+    )
     print(f"💾 Failure tracking saved: {len(failure_tracking)} PR(s) tracked")
     # Ensure we are on the weekly branch before generating the report
     os.chdir(work_dir)
@@ -1423,6 +1996,8 @@ def main():
         failure_tracking,
         pr_conflict_data,
         merge_order=merge_order_str,
+        merged_tree=get_merged_tree(branch_name),
+        merge_stats=merge_stats,
     )
     print(f"\n🎉 Weekly BonsaiPR branch creation completed!")
     print(
@@ -36,11 +36,24 @@ from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 
+import bonsai_rewrite
+import incremental_rewrite
+import pr_state
+import tree_transform
+
 # Load environment variables
 load_dotenv()
 
 # Configuration
 SOURCE_DIR = os.getenv("BASE_CLONE_DIR", "/home/falken10vdl/bonsaiPRDevel/IfcOpenShell")
+# main.py merges each order in its own worktree next to the clone and names the
+# order (asc/desc/upd) and its report when it builds one of them.
+BUILD_ORDER = os.getenv("BONSAIPR_ORDER", "")
+if BUILD_ORDER:
+    import order_worktrees
+
+    SOURCE_DIR = order_worktrees.worktree_dir(SOURCE_DIR, BUILD_ORDER)
+BUILD_REPORT_FILE = os.getenv("BONSAIPR_REPORT_FILE", "")
 BUILD_BASE_DIR = os.getenv("BUILD_BASE_DIR", "/home/falken10vdl/bonsaiPRDevel/bonsaiPR-build")
 REPORT_PATH = os.getenv("REPORT_PATH", "/home/falken10vdl/bonsaiPRDevel")
 GITHUB_OWNER = os.getenv("GITHUB_OWNER", "falken10vdl")
@@ -48,6 +61,24 @@ GITHUB_REPO = os.getenv("GITHUB_REPO", "bonsaiPR")
 SOURCE_REPO_OWNER = os.getenv("SOURCE_REPO_OWNER", "IfcOpenShell")
 SOURCE_REPO_NAME = os.getenv("SOURCE_REPO_NAME", "IfcOpenShell")
 SOURCE_BASE_BRANCH = os.getenv("SOURCE_BASE_BRANCH", "v0.8.0")
+# Update the previous build tree from a git diff instead of copying and
+# rewriting everything (falls back to a full pass when it cannot).
+INCREMENTAL_REWRITE = os.getenv("INCREMENTAL_REWRITE", "1").strip().lower() not in ("0", "false", "no")
+# Build a full pass with git plumbing (ls-tree/cat-file -> new tree ->
+# checkout-index) instead of copying the worktree and walking it three times.
+TREE_BUILD = os.getenv("TREE_BUILD", "1").strip().lower() not in ("0", "false", "no")
+# Content-addressed cache of rewritten files (outside BUILD_BASE_DIR, which a
+# full pass deletes); REWRITE_CACHE_MAX_MB=0 turns it off.
+REWRITE_CACHE_DIR = os.getenv("REWRITE_CACHE_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(BUILD_BASE_DIR)), "bonsaiPR-rewrite-cache"
+)
+try:
+    REWRITE_CACHE_MAX_BYTES = int(float(os.getenv("REWRITE_CACHE_MAX_MB", "") or 512) * 1024 * 1024)
+except ValueError:
+    REWRITE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# The rewrite and fix rules live in these files (the same list the release
+# identity hashes); editing one forces a full pass.
+RULES_FINGERPRINT = incremental_rewrite.rules_fingerprint(pr_state.transform_paths())
 
 # No exclusions - copy all files and directories
 
@@ -63,9 +94,8 @@ def log_message(message, level="INFO"):
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     print(f"[{timestamp}] {level}: {message}")
 
-def copy_source_for_bonsaiPR_build():
-    """Copy source from IfcOpenShell to bonsaiPR-build directory, ensuring correct branch is checked out"""
-    log_message("Starting source copy for bonsaiPR build")
+def check_source_branch():
+    """Warn if the source repository is not on a build branch"""
     if not os.path.exists(SOURCE_DIR):
         raise FileNotFoundError(f"Source directory not found: {SOURCE_DIR}")
     # Verify the source repo is on a valid build branch (build-*-alpha* pattern).
@@ -88,6 +118,11 @@ def copy_source_for_bonsaiPR_build():
             )
     finally:
         os.chdir(original_cwd)
+
+def copy_source_for_bonsaiPR_build():
+    """Copy source from IfcOpenShell to bonsaiPR-build directory, ensuring correct branch is checked out"""
+    log_message("Starting source copy for bonsaiPR build")
+    check_source_branch()
     # Remove existing build directory if it exists
     if os.path.exists(BUILD_BASE_DIR):
         log_message(f"Removing existing build directory: {BUILD_BASE_DIR}")
@@ -123,58 +158,49 @@ def is_binary_file(file_path):
     except Exception:
         return True  # If we can't read it, treat as binary
 
+def rewrite_cache_dir():
+    """Directory of the transformed-file cache, or None when it is turned off"""
+    return REWRITE_CACHE_DIR if REWRITE_CACHE_MAX_BYTES > 0 else None
+
+def log_rewrite_cache(totals):
+    """Report cache hits and keep the cache within REWRITE_CACHE_MAX_MB"""
+    if not rewrite_cache_dir():
+        return
+    matched = totals["processed"] - totals["prefiltered"]
+    log_message(f"Rewrite cache: {totals['cache_hits']}/{matched} files containing 'bonsai' served from {REWRITE_CACHE_DIR}")
+    evicted = bonsai_rewrite.evict_cache(REWRITE_CACHE_DIR, REWRITE_CACHE_MAX_BYTES)
+    if evicted:
+        log_message(f"Rewrite cache: evicted {evicted} entries over the size limit")
+
 def replace_bonsai_with_bonsaiPR():
     """Replace 'bonsai' with 'bonsaiPR' throughout the codebase including filenames and directories"""
     log_message("Starting comprehensive bonsai -> bonsaiPR replacement")
     
-    # Patterns to replace (case-sensitive and case-insensitive)
-    replacements = [
-        (r'\bbonsai\b', 'bonsaiPR'),      # Word boundaries for exact matches
-        (r'\bBonsai\b', 'BonsaiPR'),      # Capitalized version  
-        (r'\bBONSAI\b', 'BONSAIPR'),      # All caps version
-    ]
-    
-    files_processed = 0
-    files_modified = 0
     files_renamed = 0
     dirs_renamed = 0
     
-    # First pass: Process file contents
+    # First pass: Process file contents, sharded across worker processes
     log_message("Processing file contents...")
-    for root, dirs, files in os.walk(BUILD_BASE_DIR):
-        for file in files:
-            file_path = os.path.join(root, file)
-            
-            # Skip binary files only
-            if is_binary_file(file_path):
-                continue
-                
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                
-                original_content = content
-                
-                # Apply replacements
-                for pattern, replacement in replacements:
-                    content = re.sub(pattern, replacement, content)
-                
-                # Write back if changes were made
-                if content != original_content:
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(content)
-                    files_modified += 1
-                
-                files_processed += 1
-                
-                # Log progress every 100 files
-                if files_processed % 100 == 0:
-                    log_message(f"Processed {files_processed} files...")
-                    
-            except Exception as e:
-                log_message(f"Error processing file {file_path}: {e}", "WARNING")
-    
-    log_message(f"File content replacement completed: {files_processed} files processed, {files_modified} files modified")
+    start = time.monotonic()
+
+    def report_progress(done, total):
+        log_message(f"Processed {done}/{total} files...")
+
+    totals = bonsai_rewrite.rewrite_tree(
+        BUILD_BASE_DIR, progress=report_progress, cache_dir=rewrite_cache_dir()
+    )
+    for file_path, error in totals["errors"]:
+        log_message(f"Error processing file {file_path}: {error}", "WARNING")
+    log_rewrite_cache(totals)
+    files_processed = totals["processed"]
+    files_modified = totals["modified"]
+
+    log_message(
+        f"File content replacement completed: {files_processed} files processed, "
+        f"{files_modified} files modified ({totals['prefiltered']} without 'bonsai' "
+        f"skipped undecoded, {totals['binary']} binary skipped) "
+        f"in {time.monotonic() - start:.1f}s"
+    )
     
     # Second pass: Rename files with 'bonsai' in their names
     log_message("Renaming files containing 'bonsai'...")
@@ -182,11 +208,7 @@ def replace_bonsai_with_bonsaiPR():
         for file in files:
             if 'bonsai' in file.lower():
                 old_path = os.path.join(root, file)
-                new_name = file
-                
-                # Apply filename replacements
-                for pattern, replacement in replacements:
-                    new_name = re.sub(pattern, replacement, new_name, flags=re.IGNORECASE)
+                new_name = bonsai_rewrite.rename_component(file)
                 
                 if new_name != file:
                     new_path = os.path.join(root, new_name)
@@ -203,11 +225,7 @@ def replace_bonsai_with_bonsaiPR():
         for dir_name in dirs:
             if 'bonsai' in dir_name.lower():
                 old_path = os.path.join(root, dir_name)
-                new_name = dir_name
-                
-                # Apply directory name replacements
-                for pattern, replacement in replacements:
-                    new_name = re.sub(pattern, replacement, new_name, flags=re.IGNORECASE)
+                new_name = bonsai_rewrite.rename_component(dir_name)
                 
                 if new_name != dir_name:
                     new_path = os.path.join(root, new_name)
@@ -223,6 +241,95 @@ def replace_bonsai_with_bonsaiPR():
     log_message(f"  - {files_renamed} files renamed")
     log_message(f"  - {dirs_renamed} directories renamed")
 
+def update_bonsaiPR_build_incrementally(sync_plan):
+    """Copy and rewrite only the files changed since the last transformed build"""
+    log_message(
+        f"Incremental bonsai -> bonsaiPR update: {len(sync_plan['changed'])} changed "
+        f"path(s) since the last transformed build"
+    )
+    check_source_branch()
+    start = time.monotonic()
+    result = incremental_rewrite.apply(SOURCE_DIR, BUILD_BASE_DIR, sync_plan)
+    totals = bonsai_rewrite.rewrite_paths(result["copied"], cache_dir=rewrite_cache_dir())
+    for file_path, error in totals["errors"]:
+        log_message(f"Error processing file {file_path}: {error}", "WARNING")
+    log_rewrite_cache(totals)
+    log_message(
+        f"Incremental update completed: {len(result['copied'])} files copied, "
+        f"{result['removed']} removed, {totals['modified']} files modified "
+        f"({totals['prefiltered']} without 'bonsai' skipped undecoded, "
+        f"{totals['binary']} binary skipped) in {time.monotonic() - start:.1f}s"
+    )
+
+def build_bonsaiPR_tree():
+    """Steps 1-2 with git plumbing: rewrite the source tree in the object DB and check it out once
+
+    Returns the source tree id, or None when the worktree must be copied instead.
+    """
+    check_source_branch()
+    source_tree = incremental_rewrite.source_tree(SOURCE_DIR)
+    if source_tree is None:
+        log_message("Source worktree has uncommitted changes; copying it instead of building from its tree")
+        return None
+    log_message(f"Building the bonsaiPR tree from source tree {source_tree[:12]}")
+    start = time.monotonic()
+    totals = tree_transform.transform_tree(SOURCE_DIR, source_tree, cache_dir=rewrite_cache_dir())
+    if totals is None:
+        log_message("Source tree has submodules; copying the worktree instead")
+        return None
+    log_rewrite_cache(totals)
+    tree_transform.materialize(SOURCE_DIR, totals["tree"], BUILD_BASE_DIR)
+    log_message(
+        f"BonsaiPR tree {totals['tree'][:12]} checked out to {BUILD_BASE_DIR}: {totals['files']} files, "
+        f"{totals['modified']} modified ({totals['prefiltered']} without 'bonsai' skipped undecoded, "
+        f"{totals['binary']} binary skipped), {totals['renamed']} paths renamed "
+        f"in {time.monotonic() - start:.1f}s"
+    )
+    return source_tree
+
+def prepare_bonsaiPR_build():
+    """Steps 1-2: produce the renamed build tree; returns the source tree id it matches.
+
+    Incremental when the record of the last transformed build allows it,
+    otherwise a full pass: from the source tree with git plumbing
+    (TREE_BUILD), or a copy of the worktree and a rewrite of the copy. The
+    record is removed first so an interrupted run is never built on; save it
+    with record_bonsaiPR_build() once the Makefile fixes are applied too.
+    """
+    sync_plan = None
+    if INCREMENTAL_REWRITE:
+        sync_plan, reason = incremental_rewrite.plan(SOURCE_DIR, BUILD_BASE_DIR, RULES_FINGERPRINT)
+        if sync_plan is None:
+            log_message(f"Full bonsai -> bonsaiPR rewrite: {reason}")
+    if os.path.isdir(BUILD_BASE_DIR):
+        incremental_rewrite.clear_record(BUILD_BASE_DIR)
+    if sync_plan is not None:
+        try:
+            update_bonsaiPR_build_incrementally(sync_plan)
+            return sync_plan["tree"]
+        except (OSError, subprocess.SubprocessError) as e:
+            log_message(f"Incremental update failed ({e}), falling back to a full rewrite", "WARNING")
+    if TREE_BUILD:
+        try:
+            source_tree = build_bonsaiPR_tree()
+            if source_tree:
+                return source_tree
+        except (OSError, subprocess.SubprocessError) as e:
+            log_message(f"Building the bonsaiPR tree with git failed ({e}), copying the worktree instead", "WARNING")
+    # Step 1: Copy source for bonsaiPR build
+    copy_source_for_bonsaiPR_build()
+    # Step 2: Replace bonsai with bonsaiPR throughout codebase (files, filenames, directories)
+    replace_bonsai_with_bonsaiPR()
+    return incremental_rewrite.source_tree(SOURCE_DIR)
+
+def record_bonsaiPR_build(source_tree):
+    """Remember which source tree the build directory now holds, for the next incremental run"""
+    if source_tree:
+        incremental_rewrite.save_record(BUILD_BASE_DIR, source_tree, RULES_FINGERPRINT)
+        log_message(f"Recorded transformed source tree {source_tree[:12]}")
+    else:
+        log_message("Source tree has uncommitted changes; next build will do a full rewrite", "WARNING")
+
 def fix_makefile_paths():
     """Fix Makefile paths that reference the old bonsai directory name"""
     log_message("Fixing Makefile paths after directory rename")
@@ -630,6 +737,8 @@ def build_addons(target_platforms=None):
 
 def find_existing_report():
     """Find the most recent README report file created within the last hour"""
+    if BUILD_REPORT_FILE and os.path.exists(BUILD_REPORT_FILE):
+        return BUILD_REPORT_FILE
     # Search for README files from clone script
     version, pyversion, _ = get_version_info()
     pattern = os.path.join(REPORT_PATH, f"README-bonsaiPR_{pyversion}-{version}-alpha*.txt")
@@ -758,11 +867,8 @@ def test_makefile_fixes_only():
     log_message("Running in test mode: Makefile fixes only")
     
     try:
-        # Step 1: Copy source for bonsaiPR build
-        copy_source_for_bonsaiPR_build()
-        
-        # Step 2: Replace bonsai with bonsaiPR throughout codebase
-        replace_bonsai_with_bonsaiPR()
+        # Steps 1-2: Copy source and replace bonsai with bonsaiPR (incrementally when possible)
+        source_tree = prepare_bonsaiPR_build()
         
         # Step 3: Apply Makefile fixes
         fix_makefile_paths()
@@ -775,6 +881,7 @@ def test_makefile_fixes_only():
 
         # Step 6: Fix host-platform leakage for non-Linux dependency downloads
         fix_platform_specific_dependency_downloads()
+        record_bonsaiPR_build(source_tree)
         
         log_message("Test mode completed successfully - Makefile fixes applied")
         
@@ -842,11 +949,9 @@ def main():
         log_message("Building for all platforms")
     
     try:
-        # Step 1: Copy source for bonsaiPR build
-        copy_source_for_bonsaiPR_build()
-
-        # Step 2: Replace bonsai with bonsaiPR throughout codebase (files, filenames, directories)
-        replace_bonsai_with_bonsaiPR()
+        # Steps 1-2: Copy source and replace bonsai with bonsaiPR throughout codebase
+        # (files, filenames, directories), incrementally when the last build allows it
+        source_tree = prepare_bonsaiPR_build()
 
         # Step 2.5: Fix Makefile paths after directory rename
         fix_makefile_paths()
@@ -859,6 +964,7 @@ def main():
 
         # Step 2.8: Fix host-platform leakage for non-Linux dependency downloads
         fix_platform_specific_dependency_downloads()
+        record_bonsaiPR_build(source_tree)
 
         # Step 3: Build addons for specified platforms
         build_ok = build_addons(target_platforms)
@@ -5,7 +5,9 @@ import requests
 import json
 import glob
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from urllib.parse import quote
 from dotenv import load_dotenv
@@ -39,6 +41,9 @@ VERSIONED_TAG_PATTERN = re.compile(
 # pr_state lives alongside this script; runs with cwd=scripts_dir so a plain
 # import resolves.
 import pr_state
+import github_client
+import bulk_delete
+import asset_stream
 
 # Committed snapshots/event logs live in automation/reports (this file is in
 # automation/scripts).
@@ -180,21 +185,14 @@ def cleanup_local_tag(tag_name):
         print(f"ℹ️ Note: Could not clean up tag {tag_name}: {e}")
 
 
-def github_headers():
-    return {
-        "Authorization": f"token {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github+json",
-        "X-GitHub-Api-Version": "2022-11-28",
-    }
+def tag_ref_path(tag_name):
+    """API path of a tag reference in the release repository."""
+    return f"repos/{GITHUB_OWNER}/{GITHUB_REPO}/git/refs/tags/{quote(tag_name, safe='')}"
 
 
 def delete_remote_tag_ref(tag_name):
     """Delete a remote Git tag reference by name."""
-    encoded_tag = quote(tag_name, safe="")
-    tag_url = (
-        f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/git/refs/tags/{encoded_tag}"
-    )
-    tag_response = requests.delete(tag_url, headers=github_headers())
+    tag_response = github_client.default_client().delete(tag_ref_path(tag_name))
     return tag_response.status_code == 204
 
 
@@ -209,28 +207,18 @@ def cleanup_old_tags():
     print("\n🧹 Checking for old tags to clean up...")
 
     try:
-        url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/tags"
         all_tags = []
-        page = 1
-
-        while True:
-            params = {"per_page": 100, "page": page}
-            response = requests.get(url, headers=github_headers(), params=params)
-
-            if response.status_code != 200:
-                print(f"⚠️ Could not fetch tags: {response.status_code}")
-                return
-
-            page_tags = response.json()
-            if not page_tags:
-                break
-
-            all_tags.extend(page_tags)
-            page += 1
-
-            # Safety limit
-            if len(all_tags) >= 500:
-                break
+        try:
+            for tag in github_client.default_client().paginate(
+                f"repos/{GITHUB_OWNER}/{GITHUB_REPO}/tags", max_items=500
+            ):
+                all_tags.append(tag)
+                # Safety limit
+                if len(all_tags) >= 500:
+                    break
+        except requests.RequestException as e:
+            print(f"⚠️ Could not fetch tags: {e}")
+            return
 
         versioned_tags = [
             tag["name"]
@@ -248,15 +236,17 @@ def cleanup_old_tags():
         print(f"📊 Found {len(versioned_tags)} tags, keeping last 30")
         print(f"🗑️  Deleting {len(tags_to_delete)} old tags...")
 
-        deleted_count = 0
-        for tag_name in tags_to_delete:
-            if delete_remote_tag_ref(tag_name):
-                deleted_count += 1
-                print(f"  ✓ Deleted tag: {tag_name}")
-            else:
-                print(f"  ✗ Failed to delete tag: {tag_name}")
+        start = time.monotonic()
+        results = bulk_delete.delete_all(
+            github_client.default_client(),
+            [(tag_name, [tag_ref_path(tag_name)]) for tag_name in tags_to_delete],
+        )
+        bulk_delete.print_summary(results, "Tag cleanup", time.monotonic() - start)
 
-        print(f"✅ Tag cleanup complete: {deleted_count}/{len(tags_to_delete)} tags deleted")
+        print(
+            f"✅ Tag cleanup complete: {bulk_delete.succeeded(results)}/"
+            f"{len(tags_to_delete)} tags deleted"
+        )
 
     except Exception as e:
         print(f"⚠️ Error during tag cleanup: {e}")
@@ -293,6 +283,11 @@ def normalize_asset_name(original_filename, timestamp_10=None, target_version=No
 
 def find_report_file():
     """Find the latest README report file - searches for most recent file within last hour"""
+    # main.py names the report of the merge order being released; the newest
+    # file may belong to another order merged concurrently.
+    report_file = os.getenv("BONSAIPR_REPORT_FILE", "")
+    if report_file and os.path.exists(report_file):
+        return report_file
     version, pyversion, _ = get_version_info()
     reports_path = get_reports_path()
     # Search for all README files (not just exact minute match)
@@ -315,9 +310,9 @@ def find_report_file():
 
 def update_release_body(release_id, release_name, release_body):
     """Patch the body (and name) of an existing GitHub release."""
-    url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/{release_id}"
-    response = requests.patch(
-        url, headers=github_headers(), json={"name": release_name, "body": release_body}
+    response = github_client.default_client().patch(
+        f"repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/{release_id}",
+        json={"name": release_name, "body": release_body},
     )
     if response.status_code == 200:
         print(f"✅ Release body updated: {response.json()['html_url']}")
@@ -332,8 +327,10 @@ def update_release_body(release_id, release_name, release_body):
 def create_github_release(tag_name, release_name, release_body):
     """Create a new GitHub release, or update the body if it already exists."""
     # First check if release already exists
-    existing_url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/tags/{tag_name}"
-    existing_response = requests.get(existing_url, headers=github_headers())
+    client = github_client.default_client()
+    existing_response = client.get(
+        f"repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/tags/{tag_name}"
+    )
 
     if existing_response.status_code == 200:
         release_data = existing_response.json()
@@ -344,8 +341,6 @@ def create_github_release(tag_name, release_name, release_body):
         return updated if updated else None
 
     # Create new release if it doesn't exist
-    url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases"
-
     data = {
         "tag_name": tag_name,
         "target_commitish": "main",  # or "master" depending on your default branch
@@ -355,7 +350,7 @@ def create_github_release(tag_name, release_name, release_body):
         "prerelease": True,  # Set to True since these are alpha releases
     }
 
-    response = requests.post(url, headers=github_headers(), json=data)
+    response = client.post(f"repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases", json=data)
 
     if response.status_code == 201:
         return response.json()
@@ -365,53 +360,166 @@ def create_github_release(tag_name, release_name, release_body):
         return None
 
 
-def check_asset_exists(release_id, asset_name):
-    """Check if an asset already exists in the release"""
-    url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/{release_id}/assets"
-    response = requests.get(url, headers=github_headers())
+# Asset inventory per release, {release_id: {asset name: asset}}: filled once
+# from the release object (or one listing) and kept current from each upload
+# response, so uploading N assets does not list the release N more times.
+# Uploads run concurrently, so every access holds _release_assets_lock.
+_release_assets = {}
+_release_assets_lock = threading.Lock()
 
-    if response.status_code == 200:
-        assets = response.json()
-        for asset in assets:
-            if asset["name"] == asset_name:
-                return True
-    return False
+# A failed upload is restarted from the first byte this many times in total.
+UPLOAD_ATTEMPTS = 3
 
+# {asset name: {"size", "sha256"}} of the bytes uploaded in this run, digested
+# while streaming (asset_stream.HashingReader) for index.json.
+_uploaded_digests = {}
 
-def upload_asset_to_release(release_id, file_path, asset_name):
-    """Upload an asset to a GitHub release (skip if already exists)"""
-    # Check if asset already exists
-    if check_asset_exists(release_id, asset_name):
-        print(f"ℹ️ Asset {asset_name} already exists, skipping upload")
-        return True
 
-    url = f"https://uploads.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/{release_id}/assets"
+def remember_release_assets(release):
+    """Seed the inventory from a release object (create/get/patch response)."""
+    if release and "assets" in release:
+        with _release_assets_lock:
+            _release_assets[release["id"]] = {
+                a["name"]: a for a in release["assets"]
+            }
 
-    params = {"name": asset_name}
 
-    try:
-        with open(file_path, "rb") as f:
-            headers = github_headers()
-            headers["Content-Type"] = "application/octet-stream"
+def get_release_assets(release_id, refresh=False):
+    """{asset name: asset} of a release (a copy), listed from GitHub at most once."""
+    with _release_assets_lock:
+        if refresh or release_id not in _release_assets:
+            try:
+                assets = list(
+                    github_client.default_client().paginate(
+                        f"repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/{release_id}/assets"
+                    )
+                )
+            except requests.RequestException as e:
+                print(f"⚠️ Could not list release assets: {e}")
+                return dict(_release_assets.get(release_id, {}))
+            _release_assets[release_id] = {a["name"]: a for a in assets}
+        return dict(_release_assets[release_id])
 
-            response = requests.post(
-                url, headers=headers, params=params, data=f, timeout=300
-            )
 
-        if response.status_code == 201:
-            print(f"✅ Successfully uploaded {asset_name}")
+def check_asset_exists(release_id, asset_name, size=None, refresh=False):
+    """True if the release has a fully uploaded asset of that name (and size)."""
+    asset = get_release_assets(release_id, refresh=refresh).get(asset_name)
+    if not asset or asset.get("state", "uploaded") != "uploaded":
+        return False
+    return size is None or asset.get("size") == size
+
+
+def delete_release_asset(release_id, asset):
+    """Delete one asset (e.g. a half-uploaded one); True if it is gone."""
+    response = github_client.default_client().delete(
+        f"repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/assets/{asset['id']}"
+    )
+    if response.status_code in (204, 404):
+        with _release_assets_lock:
+            _release_assets.get(release_id, {}).pop(asset["name"], None)
+        return True
+    print(f"❌ Could not delete asset {asset['name']}: {response.status_code}")
+    return False
+
+
+def upload_asset_to_release(release_id, file_path, asset_name):
+    """Upload an asset to a GitHub release (skip if already uploaded in full).
+
+    An asset of the same name that is incomplete or of another size (an
+    interrupted upload, or an earlier build) is deleted and uploaded again.
+    """
+    size = os.path.getsize(file_path)
+    existing = get_release_assets(release_id).get(asset_name)
+    if existing:
+        if check_asset_exists(release_id, asset_name, size):
+            print(f"ℹ️ Asset {asset_name} already exists, skipping upload")
             return True
+        print(
+            f"♻️ Asset {asset_name} is {existing.get('state')} with "
+            f"{existing.get('size')} of {size} bytes, replacing it"
+        )
+        if not delete_release_asset(release_id, existing):
+            return False
+
+    for attempt in range(1, UPLOAD_ATTEMPTS + 1):
+        start = time.monotonic()
+        try:
+            # The file is streamed from disk in chunks that also feed its
+            # SHA-256. It cannot be re-sent, so the client does not retry; a
+            # failed attempt starts over from the first byte below.
+            with asset_stream.HashingReader(file_path) as f:
+                response = github_client.default_client().post(
+                    f"repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/{release_id}/assets",
+                    uploads=True,
+                    retry=False,
+                    headers={
+                        "Content-Type": "application/octet-stream",
+                        "Content-Length": str(size),
+                    },
+                    params={"name": asset_name},
+                    data=f,
+                    timeout=300,
+                )
+                digest = f.digest()
+        except (requests.RequestException, OSError) as e:
+            print(f"❌ Network error uploading {asset_name} (attempt {attempt}): {e}")
         else:
+            if response.status_code == 201:
+                seconds = max(time.monotonic() - start, 1e-6)
+                print(
+                    f"✅ Successfully uploaded {asset_name} ({size / 1e6:.1f} MB "
+                    f"in {seconds:.1f}s, {size / 1e6 / seconds:.1f} MB/s)"
+                )
+                with _release_assets_lock:
+                    _release_assets.setdefault(release_id, {})[asset_name] = (
+                        response.json()
+                    )
+                    if digest:
+                        _uploaded_digests[asset_name] = digest
+                return True
             print(f"❌ Error uploading {asset_name}: {response.status_code}")
             print(f"Response: {response.text}")
-            return False
-    except Exception as e:
-        print(f"❌ Network error uploading {asset_name}: {e}")
-        # If it's a network error but the asset might have been uploaded, check again
-        if check_asset_exists(release_id, asset_name):
+            if response.status_code < 500:
+                return False
+
+        # The asset may have been stored despite the error, or left behind
+        # half-uploaded; one listing tells which.
+        if check_asset_exists(release_id, asset_name, size, refresh=True):
             print(f"ℹ️ Asset {asset_name} appears to have been uploaded despite error")
             return True
-        return False
+        partial = get_release_assets(release_id).get(asset_name)
+        if partial and not delete_release_asset(release_id, partial):
+            return False
+    return False
+
+
+def upload_assets(release_id, uploads):
+    """Upload [(file_path, asset_name)] concurrently; returns how many succeeded.
+
+    UPLOAD_WORKERS (default 3) assets are in flight at once, so the total time
+    approaches that of the largest asset when the uplink allows it.
+    """
+    if not uploads:
+        return 0
+    try:
+        workers = int(os.getenv("UPLOAD_WORKERS", "") or 3)
+    except ValueError:
+        workers = 3
+    workers = max(1, min(workers, len(uploads)))
+    start = time.monotonic()
+    total = sum(os.path.getsize(path) for path, _ in uploads)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(
+            pool.map(
+                lambda upload: upload_asset_to_release(release_id, *upload), uploads
+            )
+        )
+    seconds = max(time.monotonic() - start, 1e-6)
+    print(
+        f"📤 Uploaded {sum(results)}/{len(uploads)} asset(s), {total / 1e6:.1f} MB "
+        f"in {seconds:.1f}s on {workers} worker(s) ({total / 1e6 / seconds:.1f} MB/s)"
+    )
+    return sum(results)
 
 
 def append_upload_info_to_readme(report_file, release_url, tag_name, addon_files):
@@ -719,12 +827,15 @@ def generate_release_body(
         merge_order = (
             "ascending"  # default; overridden if report contains "Merge Order:"
         )
+        merged_tree = None  # "Merged tree:" header, absent in older reports
 
         for idx, line in enumerate(lines):
             line = line.strip()
             if line.startswith("Merge Order:"):
                 # e.g. "Merge Order: ascending (lowest → highest PR#)"
                 merge_order = line.split(":", 1)[1].strip().split("(")[0].strip()
+            elif line.startswith("Merged tree:"):
+                merged_tree = line.split(":", 1)[1].strip() or None
             elif line.startswith("- Total PRs processed:"):
                 total_prs = int(line.split(":")[1].strip())
             elif line.startswith("- Successfully merged:"):
@@ -1096,6 +1207,9 @@ def generate_release_body(
                     if tag_name
                     else None
                 ),
+                # What this release was built from; an identical merged tree
+                # next time lets main.py skip the rebuild.
+                tree=pr_state.build_identity(merged_tree),
             )
 
             # Previous run's committed snapshot for THIS order (working-tree copy;
@@ -1316,28 +1430,19 @@ def cleanup_old_releases():
 
     try:
         # Get all releases from the repository (handle pagination)
-        url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases"
+        client = github_client.default_client()
         all_releases = []
-        page = 1
-
-        while True:
-            params = {"per_page": 100, "page": page}
-            response = requests.get(url, headers=github_headers(), params=params)
-
-            if response.status_code != 200:
-                print(f"⚠️ Could not fetch releases: {response.status_code}")
-                return
-
-            page_releases = response.json()
-            if not page_releases:
-                break
-
-            all_releases.extend(page_releases)
-            page += 1
-
-            # Safety limit: don't fetch more than 200 releases
-            if len(all_releases) >= 200:
-                break
+        try:
+            for release in client.paginate(
+                f"repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases", max_items=200
+            ):
+                all_releases.append(release)
+                # Safety limit: don't fetch more than 200 releases
+                if len(all_releases) >= 200:
+                    break
+        except requests.RequestException as e:
+            print(f"⚠️ Could not fetch releases: {e}")
+            return
 
         # Filter for versioned releases (matching pattern vX.X.X-alphaYYMMDDHHMM)
         # Example tag: v0.8.5-alpha2601071435
@@ -1363,30 +1468,26 @@ def cleanup_old_releases():
         print(f"📊 Found {len(versioned_releases)} releases, keeping last 30")
         print(f"🗑️  Deleting {len(releases_to_delete)} old releases...")
 
-        deleted_count = 0
-        for release in releases_to_delete:
-            release_id = release["id"]
-            tag_name = release["tag_name"]
-
-            # Delete the release
-            delete_url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/{release_id}"
-            delete_response = requests.delete(delete_url, headers=github_headers())
-
-            if delete_response.status_code == 204:
-                # Also delete the associated tag
-                tag_deleted = delete_remote_tag_ref(tag_name)
-
-                deleted_count += 1
-                print(
-                    f"  ✓ Deleted release: {tag_name} (tag: {'✓' if tag_deleted else '✗'})"
-                )
-            else:
-                print(
-                    f"  ✗ Failed to delete release {tag_name}: {delete_response.status_code}"
+        # Each release is deleted before its tag ref, on a worker pool.
+        start = time.monotonic()
+        results = bulk_delete.delete_all(
+            client,
+            [
+                (
+                    release["tag_name"],
+                    [
+                        f"repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/{release['id']}",
+                        tag_ref_path(release["tag_name"]),
+                    ],
                 )
+                for release in releases_to_delete
+            ],
+        )
+        bulk_delete.print_summary(results, "Release cleanup", time.monotonic() - start)
 
         print(
-            f"✅ Cleanup complete: {deleted_count}/{len(releases_to_delete)} releases deleted"
+            f"✅ Cleanup complete: {bulk_delete.succeeded(results)}/"
+            f"{len(releases_to_delete)} releases deleted"
         )
 
     except Exception as e:
@@ -1502,9 +1603,10 @@ def upload_to_falken10vdl():
     # Fetch the latest commit hash from the branch using the GitHub API
     branch_short_hash = "unknown"
     if branch_name != "unknown":
-        api_url = f"https://api.github.com/repos/{FORK_OWNER}/{FORK_REPO}/commits/{branch_name}"
         try:
-            resp = requests.get(api_url, headers=github_headers(), timeout=10)
+            resp = github_client.default_client().get(
+                f"repos/{FORK_OWNER}/{FORK_REPO}/commits/{branch_name}", timeout=10
+            )
             if resp.ok:
                 data = resp.json()
                 branch_commit_hash = data.get("sha", "unknown")
@@ -1571,12 +1673,14 @@ def upload_to_falken10vdl():
     release_id = release["id"]
     release_url = release["html_url"]
     print(f"✅ Successfully created release: {release_url}")
+    remember_release_assets(release)
 
     # Upload addon files with updated timestamp (YYMMDD -> YYMMDDHHMM from README)
     success_count = 0
 
     tag_version = parse_version_from_tag(tag_name)
 
+    planned_uploads = []
     for addon_file in addon_files:
         original_name = os.path.basename(addon_file)
         asset_name = normalize_asset_name(
@@ -1591,8 +1695,9 @@ def upload_to_falken10vdl():
         else:
             print(f"⚠️ Could not normalize filename, using original: {asset_name}")
 
-        if upload_asset_to_release(release_id, addon_file, asset_name):
-            success_count += 1
+        planned_uploads.append((addon_file, asset_name))
+
+    success_count += upload_assets(release_id, planned_uploads)
 
     # REMOVED: Upload of original report file (redundant)
     # The complete README contains all the information
@@ -1636,7 +1741,7 @@ def upload_to_falken10vdl():
     # Patch update_index_json to accept (local_path, asset_name) tuples
 
     def update_index_json_with_asset_names(index_path, release_tag, uploaded_files):
-        import json, hashlib, os, re
+        import json, os, re
 
         if not os.path.exists(index_path):
             print(f"index.json not found at {index_path}")
@@ -1666,9 +1771,12 @@ def upload_to_falken10vdl():
             pyver = get_pyversion(asset_name)
             if not plat:
                 continue
-            size = os.path.getsize(local_path)
-            with open(local_path, "rb") as f:
-                hashval = hashlib.sha256(f.read()).hexdigest()
+            # Digested during the upload; an asset that was already on the
+            # release is hashed here, in one chunked read.
+            digest = _uploaded_digests.get(asset_name) or asset_stream.file_digest(
+                local_path
+            )
+            size, hashval = digest["size"], digest["sha256"]
             # Extract version from filename: bonsaiPR_pyXXX-0.8.5-alpha260116-platform.zip
             m = re.match(r"bonsaiPR_py\d+-([\d.]+-alpha\d{6})", asset_name)
             if m:
@@ -1801,8 +1909,8 @@ def patch_existing_release(tag_name):
     print(f"📄 Using report: {os.path.basename(report_file)}")
 
     # Get existing release
-    url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/tags/{tag_name}"
-    resp = requests.get(url, headers=github_headers())
+    client = github_client.default_client()
+    resp = client.get(f"repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/tags/{tag_name}")
     if resp.status_code != 200:
         print(f"❌ Release not found for tag '{tag_name}': {resp.status_code}")
         return False
@@ -1812,13 +1920,10 @@ def patch_existing_release(tag_name):
     release_name = release_data["name"]
 
     # Collect addon files from the release assets for the downloads section
-    assets_url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/{release_id}/assets"
-    assets_resp = requests.get(assets_url, headers=github_headers())
-    addon_files = []
-    if assets_resp.status_code == 200:
-        addon_files = [
-            a["name"] for a in assets_resp.json() if a["name"].endswith(".zip")
-        ]
+    remember_release_assets(release_data)
+    addon_files = [
+        name for name in get_release_assets(release_id) if name.endswith(".zip")
+    ]
 
     new_body = generate_release_body(
         report_file, addon_files, timestamp_from_readme=timestamp, tag_name=tag_name
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+asset_stream.py - Hash a release asset while it is being uploaded.
+
+Why this exists
+---------------
+02_upload_to_falken10vdl.py uploaded each ~150 MB platform zip, then
+update_index_json computed its SHA-256 with `f.read()`: a second full read of
+the file and the whole zip in memory at once.
+
+`HashingReader` wraps the file for the upload body. requests/http.client pull
+the body in fixed-size blocks via `read()`, and every block also feeds a
+SHA-256 digest and a byte count. When the upload succeeds, the digest and
+size of exactly the bytes GitHub received are known without reading the file
+again; peak memory stays at one block.
+
+`file_digest()` is the fallback for assets that were not uploaded in this run
+(already present on the release): one chunked pass, same result.
+"""
+
+import hashlib
+import os
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class HashingReader:
+    """Read-only file wrapper that digests every byte handed out."""
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self._file = open(path, "rb")
+        self._chunk_size = chunk_size
+        self._total = os.fstat(self._file.fileno()).st_size
+        self._sha256 = hashlib.sha256()
+        self.bytes_read = 0
+
+    def __len__(self):
+        # requests uses this for Content-Length.
+        return self._total
+
+    def read(self, size=-1):
+        # An unbounded read would load the whole file; hand out one chunk.
+        if size is None or size < 0:
+            size = self._chunk_size
+        chunk = self._file.read(size)
+        self._sha256.update(chunk)
+        self.bytes_read += len(chunk)
+        return chunk
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self._chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def digest(self):
+        """{"size", "sha256"} of the whole file, or None if not fully read."""
+        if self.bytes_read != self._total:
+            return None
+        return {"size": self.bytes_read, "sha256": self._sha256.hexdigest()}
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def file_digest(path, chunk_size=CHUNK_SIZE):
+    """{"size", "sha256"} of a file, read once in chunks."""
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+            size += len(chunk)
+    return {"size": size, "sha256": sha256.hexdigest()}
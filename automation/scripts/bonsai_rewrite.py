@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+bonsai_rewrite.py - The bonsai -> bonsaiPR content rewrite, on a process pool.
+
+Why this exists
+---------------
+replace_bonsai_with_bonsaiPR() in 01_build_bonsaiPR_addons.py rewrote the
+whole IfcOpenShell copy (tens of thousands of files) in one thread: per file
+one open for is_binary_file(), another to read, three `re.sub` passes
+(bonsai, Bonsai, BONSAI) and a write. The work is CPU-bound regex over
+independent files, so it is split across processes instead.
+
+`rewrite_tree()` lists the files once and shards the list across a
+ProcessPoolExecutor (REWRITE_WORKERS, default: one per CPU). Each worker:
+
+- memory-maps a file once; a NUL byte in its first 1024 bytes marks it
+  binary (the same test as is_binary_file()) and it is left alone,
+- prefilters it with a case-insensitive byte search for "bonsai" on the
+  mapping: most of the tree (C++ sources, IFC schemas, test data) never
+  contains the token and is skipped without any decode, regex or write,
+- rewrites all three spellings in one pass of a single precompiled
+  alternation regex, with a callback picking the replacement,
+- writes the file back only if it changed,
+
+and returns its counts, which are summed into the totals 01 logs. The output
+is byte-for-byte what the three sequential passes produced, including the
+text-mode newline translation of a rewritten file (CRLF and CR become "\n").
+
+`prefilter()` is also used on its own by apply_bonsai_replacements() in 00.
+
+The rewrite is a pure function of a file's bytes, so results are also kept
+in a content-addressed cache directory (REWRITE_CACHE_DIR): an entry is named
+after the git blob id of the source bytes, under a key of this module's own
+source (RULES_KEY), and holds the rewritten bytes, or is an empty ".same"
+marker when nothing changed. On a hit the worker writes the cached bytes
+without decoding or running the regex. `evict_cache()` drops entries of
+other rules and then the least recently used ones beyond a size budget.
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+REPLACEMENTS = {
+    "bonsai": "bonsaiPR",
+    "Bonsai": "BonsaiPR",
+    "BONSAI": "BONSAIPR",
+}
+
+_PATTERN = re.compile(r"\b(%s)\b" % "|".join(REPLACEMENTS))
+_TOKEN = re.compile(rb"bonsai", re.IGNORECASE)
+
+BINARY = "binary"
+NO_MATCH = "no match"
+MATCH = "match"
+
+# Entries are keyed by the rules too: editing this file invalidates them all.
+with open(__file__, "rb") as _source:
+    RULES_KEY = hashlib.sha256(_source.read()).hexdigest()[:16]
+
+# Counted per cache entry on top of its size, so ".same" markers are bounded too.
+ENTRY_OVERHEAD = 4096
+
+# Several shards per worker, so one slow shard does not leave the rest idle.
+SHARDS_PER_WORKER = 4
+
+
+def _replace(match):
+    return REPLACEMENTS[match.group(1)]
+
+
+def rewrite_text(text):
+    """`text` with every whole-word bonsai/Bonsai/BONSAI suffixed with PR."""
+    return _PATTERN.sub(_replace, text)
+
+
+def rename_component(name):
+    """A file or directory name as 01's rename passes leave it.
+
+    Names are matched case-insensitively, so "Bonsai" becomes "bonsaiPR".
+    """
+    if "bonsai" not in name.lower():
+        return name
+    for spelling, replacement in REPLACEMENTS.items():
+        name = re.sub(r"\b%s\b" % spelling, replacement, name, flags=re.IGNORECASE)
+    return name
+
+
+def build_path(rel_path):
+    """Where a source-relative path ends up in the renamed build tree."""
+    return "/".join(rename_component(part) for part in rel_path.split("/"))
+
+
+def classify(data):
+    """BINARY, NO_MATCH or MATCH for file bytes (or a memory map of them)."""
+    if data.find(b"\x00", 0, 1024) != -1:
+        return BINARY
+    if not _TOKEN.search(data):
+        return NO_MATCH
+    return MATCH
+
+
+def _scan(f):
+    """(BINARY | NO_MATCH | MATCH, bytes or None) for an open binary file."""
+    if os.fstat(f.fileno()).st_size == 0:
+        return NO_MATCH, None
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        verdict = classify(mapped)
+        return verdict, mapped[:] if verdict == MATCH else None
+
+
+def prefilter(path):
+    """BINARY, NO_MATCH (no "bonsai" in any case) or MATCH, without decoding."""
+    with open(path, "rb") as f:
+        return _scan(f)[0]
+
+
+def rewrite_bytes(data):
+    """The rewritten bytes of a MATCH file, or None if the rewrite changes nothing.
+
+    Like the text-mode read and write it replaces, a rewritten file comes out
+    with "\n" line endings (CRLF and CR are translated); a file the rewrite
+    leaves alone keeps its bytes.
+    """
+    content = data.decode("utf-8", errors="ignore")
+    content = content.replace("\r\n", "\n").replace("\r", "\n")
+    new_content = rewrite_text(content)
+    if new_content == content:
+        return None
+    return new_content.encode("utf-8")
+
+
+def blob_id(data):
+    """The git blob id (SHA-1) of `data`, as `git hash-object` computes it."""
+    digest = hashlib.sha1(b"blob %d\0" % len(data))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def _cache_path(cache_dir, blob):
+    return os.path.join(cache_dir, RULES_KEY, blob[:2], blob)
+
+
+def cache_lookup(cache_dir, blob):
+    """("unchanged", None), ("modified", path of the rewritten bytes) or None.
+
+    A hit refreshes the entry's mtime, which evict_cache() treats as last use.
+    """
+    entry = _cache_path(cache_dir, blob)
+    if os.path.exists(entry + ".same"):
+        os.utime(entry + ".same")
+        return "unchanged", None
+    if os.path.exists(entry):
+        os.utime(entry)
+        return "modified", entry
+    return None
+
+
+def cache_store(cache_dir, blob, new_data):
+    """Remember the rewrite of `blob` (None: unchanged).
+
+    Best effort: a cache that cannot be written is just a miss next time.
+    """
+    entry = _cache_path(cache_dir, blob)
+    target = entry if new_data is not None else entry + ".same"
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(new_data or b"")
+        os.replace(tmp_path, target)
+    except OSError:
+        pass
+
+
+def _rewrite_file(path, cache_dir=None):
+    """(result, cache hit) for one file; see rewrite_file()."""
+    with open(path, "rb") as f:
+        verdict, data = _scan(f)
+    if verdict == BINARY:
+        return "binary", False
+    if verdict == NO_MATCH:
+        return "prefiltered", False
+
+    blob = blob_id(data) if cache_dir else None
+    if blob:
+        hit = cache_lookup(cache_dir, blob)
+        if hit:
+            result, entry = hit
+            if entry:
+                shutil.copyfile(entry, path)
+            return result, True
+
+    new_data = rewrite_bytes(data)
+    if blob:
+        cache_store(cache_dir, blob, new_data)
+    if new_data is None:
+        return "unchanged", False
+    with open(path, "wb") as f:
+        f.write(new_data)
+    return "modified", False
+
+
+def rewrite_file(path, cache_dir=None):
+    """Rewrite one file in place, through the cache in `cache_dir` if given.
+
+    Returns "binary", "prefiltered" (no "bonsai" at all), "modified" or
+    "unchanged".
+    """
+    return _rewrite_file(path, cache_dir)[0]
+
+
+def empty_counts():
+    return {
+        "processed": 0,
+        "modified": 0,
+        "prefiltered": 0,
+        "binary": 0,
+        "cache_hits": 0,
+        "errors": [],
+    }
+
+
+def _rewrite_shard(paths, cache_dir=None):
+    counts = empty_counts()
+    for path in paths:
+        try:
+            result, hit = _rewrite_file(path, cache_dir)
+        except Exception as e:
+            counts["errors"].append((path, str(e)))
+            continue
+        counts["cache_hits"] += hit
+        if result == "binary":
+            counts["binary"] += 1
+            continue
+        counts["processed"] += 1
+        if result == "prefiltered":
+            counts["prefiltered"] += 1
+        elif result == "modified":
+            counts["modified"] += 1
+    return counts
+
+
+def default_workers():
+    try:
+        return int(os.getenv("REWRITE_WORKERS", "") or os.cpu_count() or 1)
+    except ValueError:
+        return os.cpu_count() or 1
+
+
+def list_files(root):
+    paths = []
+    for dirpath, _dirs, files in os.walk(root):
+        paths.extend(os.path.join(dirpath, name) for name in files)
+    return paths
+
+
+def rewrite_tree(root, workers=None, progress=None, cache_dir=None):
+    """Rewrite every file under `root`; returns the summed counts.
+
+    Counts: "processed" (text files), "modified", "prefiltered" (text files
+    without "bonsai", not decoded), "binary" (skipped), "cache_hits" (rewritten
+    from `cache_dir` without the regex) and "errors", a list of (path,
+    message). `progress(files_done, files_total)` is called as shards finish.
+    """
+    return rewrite_paths(
+        list_files(root), workers=workers, progress=progress, cache_dir=cache_dir
+    )
+
+
+def rewrite_paths(paths, workers=None, progress=None, cache_dir=None):
+    """rewrite_tree() over an explicit list of files."""
+    paths = list(paths)
+    if workers is None:
+        workers = default_workers()
+    workers = max(1, min(workers, len(paths) or 1))
+    totals = empty_counts()
+
+    def merge(counts, done):
+        for key in ("processed", "modified", "prefiltered", "binary", "cache_hits"):
+            totals[key] += counts[key]
+        totals["errors"].extend(counts["errors"])
+        if progress:
+            progress(done, len(paths))
+
+    if workers == 1:
+        merge(_rewrite_shard(paths, cache_dir), len(paths))
+        return totals
+
+    shard_count = workers * SHARDS_PER_WORKER
+    size = -(-len(paths) // shard_count)
+    shards = [paths[i : i + size] for i in range(0, len(paths), size)]
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_rewrite_shard, shard, cache_dir): len(shard) for shard in shards
+        }
+        for future in as_completed(futures):
+            done += futures[future]
+            merge(future.result(), done)
+    return totals
+
+
+def evict_cache(cache_dir, max_bytes):
+    """Drop entries of other rules, then the least recently used over max_bytes.
+
+    Returns how many entries were removed.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+    removed = 0
+    for name in os.listdir(cache_dir):
+        if name != RULES_KEY:
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+            removed += 1
+    entries = []
+    for dirpath, _dirs, files in os.walk(os.path.join(cache_dir, RULES_KEY)):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size + ENTRY_OVERHEAD, path))
+    total = sum(size for _mtime, size, _path in entries)
+    for _mtime, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+bulk_delete.py - Delete many GitHub releases, tags or branches at once.
+
+Why this exists
+---------------
+cleanup_old_releases() deleted each release and then its tag ref, and
+cleanup_old_branches() / cleanup_old_tags() each ref, one request after the
+other with a log line per item. After an outage the backlog is dozens of items
+and two sequential round trips each.
+
+`delete_all()` runs the deletions on a small worker pool. An item is a name
+plus the API paths to DELETE in order (a release, then its tag ref), so a tag
+is never removed before its release. Per item:
+
+- 204 is deleted; 404 or 422 ("Reference does not exist") means it is
+  already gone, which counts as done, so re-running a cleanup is harmless,
+- other statuses and connection errors are retried (MAX_ATTEMPTS) before the
+  item counts as failed; rate limits are paced and retried by github_client,
+- with dry_run, nothing is sent and every item is reported as "would delete".
+
+`print_summary()` prints one table of counts and latencies, and a line per
+failed item only.
+
+CLEANUP_WORKERS sets the pool size (default 8), CLEANUP_DRY_RUN=1 the dry run.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+MAX_ATTEMPTS = 3
+DEFAULT_WORKERS = 8
+
+DELETED = "deleted"
+GONE = "already gone"
+FAILED = "failed"
+WOULD_DELETE = "would delete"
+
+
+def _delete_path(client, path):
+    """DELETE one path with per-item retries; returns (result, detail)."""
+    detail = None
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            response = client.delete(path)
+        except requests.RequestException as e:
+            detail = str(e)
+        else:
+            if response.status_code == 204:
+                return DELETED, None
+            if response.status_code in (404, 422):
+                return GONE, None
+            detail = f"HTTP {response.status_code}"
+        if attempt < MAX_ATTEMPTS:
+            time.sleep(attempt)
+    return FAILED, detail
+
+
+def _delete_item(client, name, paths, dry_run):
+    start = time.monotonic()
+    result, detail = (WOULD_DELETE, None) if dry_run else (GONE, None)
+    if not dry_run:
+        for path in paths:
+            step, detail = _delete_path(client, path)
+            if step == FAILED:
+                result = FAILED
+                break
+            if step == DELETED:
+                result = DELETED
+    return {
+        "name": name,
+        "result": result,
+        "detail": detail,
+        "seconds": time.monotonic() - start,
+    }
+
+
+def delete_all(client, items, workers=None, dry_run=None):
+    """Delete every (name, [paths]) in `items`; returns one result dict per item.
+
+    Results keep the order of `items`. An item is "deleted" if any of its
+    paths was deleted and the rest were already gone.
+    """
+    # Read at call time: the scripts load .env after importing this module.
+    if dry_run is None:
+        dry_run = os.getenv("CLEANUP_DRY_RUN", "").strip().lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+    if workers is None:
+        try:
+            workers = int(os.getenv("CLEANUP_WORKERS", "") or DEFAULT_WORKERS)
+        except ValueError:
+            workers = DEFAULT_WORKERS
+    items = list(items)
+    if not items:
+        return []
+    workers = max(1, min(workers, len(items)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(
+            pool.map(
+                lambda item: _delete_item(client, item[0], item[1], dry_run), items
+            )
+        )
+
+
+def print_summary(results, label, seconds=None):
+    """One table of counts and latencies per result, plus each failure."""
+    if not results:
+        return
+    header = f"🗑️  {label}: {len(results)} item(s)"
+    if seconds is not None:
+        header += f" in {seconds:.1f}s"
+    print(header)
+    print(f"   {'result':<13} {'count':>5} {'avg s':>7} {'max s':>7}")
+    for result in (DELETED, GONE, WOULD_DELETE, FAILED):
+        rows = [r for r in results if r["result"] == result]
+        if not rows:
+            continue
+        latencies = [r["seconds"] for r in rows]
+        print(
+            f"   {result:<13} {len(rows):>5} "
+            f"{sum(latencies) / len(rows):>7.2f} {max(latencies):>7.2f}"
+        )
+    for r in results:
+        if r["result"] == FAILED:
+            print(f"   ✗ {r['name']}: {r['detail']}")
+
+
+def succeeded(results):
+    """How many items are gone now (deleted or already gone)."""
+    return sum(1 for r in results if r["result"] in (DELETED, GONE))
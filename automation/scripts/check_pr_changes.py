@@ -12,6 +12,7 @@ Returns exit code 0 if changes detected (should build), 1 if no changes (skip bu
 """
 
 import os
+import sys
 import json
 import requests
 import hashlib
@@ -19,6 +20,9 @@ from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import github_client
+
 # Load environment variables
 load_dotenv()
 
@@ -28,6 +32,11 @@ SOURCE_REPO_OWNER = os.getenv("SOURCE_REPO_OWNER", "IfcOpenShell")
 SOURCE_REPO_NAME = os.getenv("SOURCE_REPO_NAME", "IfcOpenShell")
 upstream_repo = f'{SOURCE_REPO_OWNER}/{SOURCE_REPO_NAME}'
 state_file = os.path.join(os.path.dirname(__file__), '..', 'logs', 'pr_state.json')
+# ETag / Last-Modified and the hashed fields of every /pulls page, so an
+# unchanged page is answered with a bodiless 304 that isn't parsed and doesn't
+# count against the primary rate limit.
+page_cache_file = os.path.join(os.path.dirname(__file__), '..', 'logs', 'pr_pages.json')
+PER_PAGE = 100
 
 # Parse excluded PRs
 raw_excluded = os.getenv("EXCLUDED", "")
@@ -43,64 +52,100 @@ if raw_usernames:
 else:
     users = ['']
 
-def github_headers():
-    return {"Authorization": f"token {GITHUB_TOKEN}"}
+def pr_state_info(pr):
+    """The fields of a PR that would trigger a rebuild when they change"""
+    return {
+        'number': pr['number'],
+        'updated_at': pr['updated_at'],
+        'draft': pr.get('draft', False),
+        'head_sha': pr['head']['sha'] if pr.get('head') else None,
+        'state': pr['state'],
+        'mergeable': pr.get('mergeable'),  # Can change over time
+    }
+
+def is_relevant(pr):
+    """Skip excluded PRs, other users' PRs and PRs whose repo is gone"""
+    if pr['number'] in excluded_prs:
+        return False
+    if users and users != [''] and pr['user']['login'] not in users:
+        return False
+    return bool(pr.get('head') and pr['head'].get('repo'))  # Exclude inaccessible repos
+
+def load_page_cache():
+    try:
+        with open(page_cache_file, 'r') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def save_page_cache(cache):
+    os.makedirs(os.path.dirname(page_cache_file), exist_ok=True)
+    with open(page_cache_file, 'w') as f:
+        json.dump(cache, f, indent=1)
+
+def get_open_pr_infos(page_cache):
+    """State info of every relevant open PR, polling /pulls conditionally.
+
+    Each page is requested with the ETag / Last-Modified it had last time; a
+    304 reuses the page's cached entry. Returns (infos, new_page_cache,
+    unchanged_pages).
 
-def get_open_prs():
-    """Fetch all open PRs from IfcOpenShell repository"""
+    If a page cannot be fetched, the PRs of the pages before it are returned
+    with the old page cache. As before conditional polling, a short list then
+    hashes differently and lets a build through, so a persistent API failure
+    does not silently suppress every build.
+    """
     print("Fetching current open pull requests...")
-    url = f"https://api.github.com/repos/{upstream_repo}/pulls"
-    params = {"state": "open", "per_page": 100}
-    
-    all_prs = []
+    client = github_client.default_client()
+    new_cache = {}
+    infos = []
+    unchanged = 0
     page = 1
-    
     while True:
-        params["page"] = page
-        response = requests.get(url, headers=github_headers(), params=params)
-        if response.status_code != 200:
-            print(f"Error fetching PRs: {response.status_code}")
-            break
-        
-        prs = response.json()
-        if not prs:
+        cached = page_cache.get(str(page))
+        headers = {}
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        try:
+            response = client.get(
+                f"repos/{upstream_repo}/pulls",
+                params={"state": "open", "per_page": PER_PAGE, "page": page},
+                headers=headers,
+            )
+        except requests.RequestException as e:
+            print(f"⚠️ Error fetching PRs: {e}; continuing with {len(infos)} PR(s) fetched so far")
+            return infos, page_cache, unchanged
+        if response.status_code == 304 and cached:
+            entry = cached
+            unchanged += 1
+        elif response.status_code == 200:
+            prs = response.json()
+            entry = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'count': len(prs),
+                'prs': [pr_state_info(pr) for pr in prs if is_relevant(pr)],
+            }
+        else:
+            print(
+                f"⚠️ Error fetching PRs: {response.status_code}; "
+                f"continuing with {len(infos)} PR(s) fetched so far"
+            )
+            return infos, page_cache, unchanged
+        new_cache[str(page)] = entry
+        infos.extend(entry['prs'])
+        if entry['count'] < PER_PAGE:  # Last page
             break
-            
-        # Filter by users if specified
-        if users and users != ['']:
-            prs = [pr for pr in prs if pr['user']['login'] in users]
-        
-        all_prs.extend(prs)
         page += 1
-        
-        if len(prs) < 100:  # Last page
-            break
-    
-    return all_prs
+    return infos, new_cache, unchanged
 
-def calculate_pr_state_hash(prs):
+def calculate_pr_state_hash(pr_infos):
     """Calculate a hash representing the current state of PRs"""
-    # Create a normalized representation of PR state
-    pr_data = []
-    
-    for pr in prs:
-        # Skip excluded PRs
-        if pr['number'] in excluded_prs:
-            continue
-            
-        # Include key information that would trigger a rebuild
-        pr_info = {
-            'number': pr['number'],
-            'updated_at': pr['updated_at'],
-            'draft': pr.get('draft', False),
-            'head_sha': pr['head']['sha'] if pr.get('head') else None,
-            'state': pr['state'],
-            'mergeable': pr.get('mergeable'),  # Can change over time
-        }
-        pr_data.append(pr_info)
-    
     # Sort by PR number for consistent hashing
-    pr_data.sort(key=lambda x: x['number'])
+    pr_data = sorted(pr_infos, key=lambda x: x['number'])
     
     # Create hash
     state_str = json.dumps(pr_data, sort_keys=True)
@@ -144,15 +189,13 @@ def main():
         print("❌ Error: GITHUB_TOKEN not found in environment")
         return 1
     
-    # Get current PRs
-    current_prs = get_open_prs()
-    
-    # Filter out excluded and draft PRs for state comparison
-    relevant_prs = [
-        pr for pr in current_prs 
-        if pr['number'] not in excluded_prs
-        and pr.get('head') and pr['head'].get('repo')  # Exclude inaccessible repos
-    ]
+    # Get current PRs (excluded PRs and inaccessible repos already filtered out)
+    page_cache = load_page_cache()
+    relevant_prs, page_cache, unchanged_pages = get_open_pr_infos(page_cache)
+    save_page_cache(page_cache)
+    print(
+        f"🗂️  {unchanged_pages}/{len(page_cache)} PR page(s) unchanged since last check (304)"
+    )
     
     print(f"📊 Current state: {len(relevant_prs)} relevant PRs found")
     
@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+conflict_graph.py - Pairwise PR conflict graph and merge-order planner.
+
+Why this exists
+---------------
+main.py used to discover order-dependent conflicts by running the whole
+clone -> merge -> build -> upload pipeline up to three times (ascending, then
+`--reverse`, then `--by-updated`) and comparing which PRs each order merged.
+Which PRs textually conflict with which is a property of the base commit and
+the PR heads alone, so it can be computed once, in the object database:
+
+  1. every PR is merged alone onto the base with `git merge-tree`
+     (merge_probe.py); a PR that conflicts there conflicts in every order;
+  2. for every PR that merged cleanly, the merged tree is wrapped in a
+     synthetic commit and each other clean PR is merged on top of it. A
+     conflict there is an edge of the graph. Two PRs that change no common
+     path (per pr_files_cache.py) cannot conflict textually and are not
+     probed.
+
+The planner then picks, per merge order, the largest set of PRs with no edge
+between them (exact per connected component when components are small, the
+plain first-come-first-served walk otherwise), breaking ties in favour of the
+PRs the order reaches first, and puts those PRs first. The real sequential
+merge in apply_prs_to_branch() stays the ground truth: pairwise-clean PRs can
+still collide three ways, and they simply fail there as before.
+
+An edge whose conflicting files are all covered by a KNOWN_CONFLICT_RESOLUTIONS
+entry of one of the two PRs is not a real conflict as long as that PR is merged
+second; the planner keeps both and moves the resolving PR after the other.
+
+The graph, including the predicted merged/blocked sets of every order, is
+written to reports/conflict_graph.json next to state.<order>.json. main.py
+reads the predictions to decide which companion orders are worth building,
+and pr_state.compute_robustness() reads them instead of inferring the same
+information from three full builds.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import merge_probe
+import pr_refs
+
+SCHEMA_VERSION = 1
+
+GRAPH_FILENAME = "conflict_graph.json"
+
+# Probe results outlive a run (see load_pair_cache); like the change-detection
+# state they are machine-local, so they live in logs/, not in reports/.
+PAIR_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "logs", "conflict_pairs.json"
+)
+
+# Components up to this size get an exact maximum independent set (branch and
+# bound); larger ones fall back to the first-come-first-served walk. The search
+# is exponential in the worst case, so it also stops after MAX_EXACT_VISITS
+# search nodes and keeps the best set found by then, which is never smaller
+# than the first-come-first-served one.
+MAX_EXACT_COMPONENT = 24
+MAX_EXACT_VISITS = 50000
+
+BASE_CLEAN = "clean"
+BASE_CONFLICT = "conflict"
+BASE_ERROR = "error"
+
+
+def graph_path(reports_dir):
+    return os.path.join(reports_dir, GRAPH_FILENAME)
+
+
+def load_graph(reports_dir, since=None):
+    """Load the persisted graph, or None if absent/unreadable.
+
+    With `since` (a POSIX timestamp), a graph written before then is ignored,
+    so a caller can insist on one produced during the current run.
+    """
+    path = graph_path(reports_dir)
+    try:
+        if since is not None and os.path.getmtime(path) < since:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read().strip()
+        return json.loads(text) if text else None
+    except (OSError, ValueError):
+        return None
+
+
+def write_graph(graph, reports_dir):
+    """Write the graph deterministically (sorted keys, trailing newline).
+
+    The merge orders run concurrently and each may rewrite the graph, so it is
+    written to a temp file and renamed: readers never see a half-written file.
+    """
+    path = graph_path(reports_dir)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(graph, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def resolutions_hash(known_resolutions):
+    """Stable digest of KNOWN_CONFLICT_RESOLUTIONS; part of the graph's identity."""
+    canonical = json.dumps(
+        {str(k): sorted(map(list, v)) for k, v in (known_resolutions or {}).items()},
+        sort_keys=True,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def _resolved_by(a, b, files, known_resolutions):
+    """The PR (a or b) whose known resolution covers every conflicting file."""
+    for pr_number in (a, b):
+        covered = {path for path, _ in (known_resolutions or {}).get(pr_number, [])}
+        if files and set(files) <= covered:
+            return pr_number
+    return None
+
+
+def _git_out(args, repo_dir):
+    result = subprocess.run(
+        ["git"] + args, cwd=repo_dir, capture_output=True, text=True
+    )
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+# --------------------------------------------------------------------------- #
+# Persistent probe cache
+# --------------------------------------------------------------------------- #
+#
+# A merge outcome depends on the base commit and the heads involved: their
+# trees and, through the merge base, their history. Two bases with the same
+# tree but different ancestry can merge the same PR differently, so results
+# are cached on disk under (base commit, head sha) for the single-PR probes and
+# (base commit, head sha A, head sha B) for the pairs. An hourly run where one
+# PR moved re-probes that PR against the base and against the other N-1, and
+# serves every other pair from the cache. Entries are evicted as soon as their
+# base commit is no longer current or one of their PRs closed or moved on.
+
+
+def load_pair_cache(path=PAIR_CACHE_PATH, since=None):
+    """The on-disk probe cache, or an empty one if absent/unreadable.
+
+    With `since` (a POSIX timestamp), a cache last written before then counts
+    as absent, as in load_graph().
+    """
+    try:
+        if since is not None and os.path.getmtime(path) < since:
+            raise OSError("stale")
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("schema") == SCHEMA_VERSION:
+            cache.setdefault("bases", {})
+            cache.setdefault("pairs", {})
+            return cache
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {"schema": SCHEMA_VERSION, "bases": {}, "pairs": {}}
+
+
+def save_pair_cache(cache, path=PAIR_CACHE_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def _base_key(base_commit, sha):
+    return f"{base_commit}:{sha}"
+
+
+def _pair_key(base_commit, sha_a, sha_b):
+    return ":".join([base_commit] + sorted([sha_a, sha_b]))
+
+
+def evict_pair_cache(cache, base_commit, heads):
+    """Drop entries for another base commit, or for PRs closed or updated since.
+
+    `heads` maps PR number -> current head sha. Returns how many were dropped.
+    """
+    def _current(key, entry):
+        if not key.startswith(base_commit + ":"):
+            return False
+        return all(
+            heads.get(pr_number) == sha
+            for pr_number, sha in zip(entry.get("prs", []), entry.get("shas", []))
+        )
+
+    dropped = 0
+    for section in ("bases", "pairs"):
+        entries = cache.setdefault(section, {})
+        for key in [k for k, v in entries.items() if not _current(k, v)]:
+            del entries[key]
+            dropped += 1
+    return dropped
+
+
+def cached_partners(cache, pr_numbers):
+    """{pr: [partners]} for `pr_numbers`, from the conflicting pairs in the cache."""
+    wanted = set(pr_numbers)
+    partners = {}
+    for entry in (cache or {}).get("pairs", {}).values():
+        if entry.get("clean"):
+            continue
+        a, b = entry["prs"]
+        if a in wanted:
+            partners.setdefault(a, set()).add(b)
+        if b in wanted:
+            partners.setdefault(b, set()).add(a)
+    return {pr: sorted(found) for pr, found in partners.items()}
+
+
+def build_graph(
+    repo_dir, base_commit, heads, known_resolutions=None, cache=None, changed_files=None
+):
+    """Probe every PR against the base and every clean pair against each other.
+
+    `heads` maps PR number -> head sha; each PR must already be in the local
+    ref store (pr_refs.fetch_pr_heads). Probes found in `cache` (see
+    load_pair_cache) are not re-run; new results are added to it and stale
+    entries evicted, so the caller only has to save it. `changed_files` maps
+    PR number -> changed paths (None if unknown); a pair with disjoint paths
+    counts as clean without a probe. Returns the graph dict (without plans).
+    """
+    start = time.monotonic()
+    if cache is None:
+        cache = {"schema": SCHEMA_VERSION, "bases": {}, "pairs": {}}
+    base_tree = _git_out(["rev-parse", f"{base_commit}^{{tree}}"], repo_dir) or base_commit
+    evicted = evict_pair_cache(cache, base_commit, heads)
+    probes = hits = disjoint = 0
+    changed_files = {
+        pr_number: set(files)
+        for pr_number, files in (changed_files or {}).items()
+        if files is not None
+    }
+
+    prs = {}
+    merged_trees = {}
+    for pr_number in sorted(heads):
+        sha = heads[pr_number]
+        key = _base_key(base_commit, sha)
+        entry = cache["bases"].get(key)
+        if entry:
+            hits += 1
+        else:
+            probes += 1
+            probe = merge_probe.probe_merge(repo_dir, base_commit, pr_refs.pr_ref(pr_number))
+            if probe["clean"] is None:
+                entry = {"base": BASE_ERROR, "files": [], "tree": None}
+            else:
+                entry = {
+                    "prs": [pr_number],
+                    "shas": [sha],
+                    "base": BASE_CLEAN if probe["clean"] else BASE_CONFLICT,
+                    "files": probe["files"],
+                    "tree": probe["tree"],
+                }
+                cache["bases"][key] = entry
+        if entry["base"] == BASE_CLEAN:
+            merged_trees[pr_number] = entry["tree"]
+        prs[str(pr_number)] = {
+            "head_sha": sha,
+            "base": entry["base"],
+            "files": entry["files"],
+        }
+
+    merged_commits = {}
+
+    def _merged_commit(pr_number):
+        """base + PR as a commit, created only when a pair actually needs probing."""
+        if pr_number not in merged_commits:
+            parents = [base_commit, heads[pr_number]]
+            commit = merge_probe.synthetic_merge_commit(
+                repo_dir, merged_trees[pr_number], parents
+            )
+            if not commit:
+                # The cached tree was pruned by gc; merging again rewrites it.
+                probe = merge_probe.probe_merge(
+                    repo_dir, base_commit, pr_refs.pr_ref(pr_number)
+                )
+                if probe["clean"]:
+                    commit = merge_probe.synthetic_merge_commit(
+                        repo_dir, probe["tree"], parents
+                    )
+            merged_commits[pr_number] = commit
+        return merged_commits[pr_number]
+
+    clean = sorted(merged_trees)
+    conflicts = []
+    for i, a in enumerate(clean):
+        for b in clean[i + 1 :]:
+            if (
+                a in changed_files
+                and b in changed_files
+                and changed_files[a].isdisjoint(changed_files[b])
+            ):
+                disjoint += 1
+                continue
+            key = _pair_key(base_commit, heads[a], heads[b])
+            entry = cache["pairs"].get(key)
+            if entry:
+                hits += 1
+            else:
+                commit = _merged_commit(a)
+                if not commit:
+                    continue
+                probes += 1
+                probe = merge_probe.probe_merge(repo_dir, commit, pr_refs.pr_ref(b))
+                if probe["clean"] is None:
+                    continue
+                entry = {
+                    "prs": [a, b],
+                    "shas": [heads[a], heads[b]],
+                    "clean": probe["clean"],
+                    "files": probe["files"],
+                }
+                cache["pairs"][key] = entry
+            if entry["clean"]:
+                continue
+            conflicts.append(
+                {
+                    "prs": [a, b],
+                    "files": entry["files"],
+                    "resolved_by": _resolved_by(a, b, entry["files"], known_resolutions),
+                }
+            )
+
+    pairs = len(clean) * (len(clean) - 1) // 2
+    print(
+        f"🕸️  Conflict graph: {len(heads)} PR(s), {len(heads) - len(clean)} "
+        f"conflicting with base, {len(conflicts)}/{pairs} conflicting pair(s) "
+        f"in {time.monotonic() - start:.1f}s"
+    )
+    print(
+        f"🗃️  Probe cache: {hits} hit(s), {probes} probe(s) run, "
+        f"{disjoint} pair(s) skipped (no common path), "
+        f"{evicted} stale entr{'y' if evicted == 1 else 'ies'} evicted"
+    )
+    return {
+        "schema": SCHEMA_VERSION,
+        "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "base_commit": base_commit,
+        "base_tree": base_tree,
+        "resolutions": resolutions_hash(known_resolutions),
+        "prs": prs,
+        "conflicts": conflicts,
+        "plans": {},
+    }
+
+
+def graph_matches(graph, base_commit, heads, known_resolutions=None):
+    """True if `graph` was computed for exactly this base, heads and resolutions."""
+    if not graph or graph.get("schema") != SCHEMA_VERSION:
+        return False
+    if graph.get("base_commit") != base_commit:
+        return False
+    if graph.get("resolutions") != resolutions_hash(known_resolutions):
+        return False
+    recorded = {int(k): v.get("head_sha") for k, v in graph.get("prs", {}).items()}
+    return recorded == dict(heads)
+
+
+def _hard_edges(graph):
+    """{pr: {neighbours}} for conflicts no known resolution can absorb."""
+    adjacency = {}
+    for edge in (graph or {}).get("conflicts", []):
+        if edge.get("resolved_by") is not None:
+            continue
+        a, b = edge["prs"]
+        adjacency.setdefault(a, set()).add(b)
+        adjacency.setdefault(b, set()).add(a)
+    return adjacency
+
+
+def predicted_blockers(graph, pr_number, merged):
+    """PRs in `merged` that `pr_number` conflicts with, per the graph.
+
+    Only conflicts no known resolution absorbs count. Returns a sorted list.
+    """
+    return sorted(_hard_edges(graph).get(pr_number, set()) & set(merged))
+
+
+def _components(nodes, adjacency):
+    allowed = set(nodes)
+    seen = set()
+    for node in nodes:
+        if node in seen:
+            continue
+        component, stack = [], [node]
+        seen.add(node)
+        while stack:
+            current = stack.pop()
+            component.append(current)
+            for neighbour in adjacency.get(current, ()):
+                if neighbour in allowed and neighbour not in seen:
+                    seen.add(neighbour)
+                    stack.append(neighbour)
+        yield component
+
+
+def _first_come(nodes, adjacency):
+    chosen = set()
+    for node in nodes:
+        if not adjacency.get(node, set()) & chosen:
+            chosen.add(node)
+    return chosen
+
+
+def _max_independent(nodes, adjacency, max_visits=MAX_EXACT_VISITS):
+    """Largest independent set of `nodes` (given in priority order).
+
+    Include-first depth-first search: among sets of the maximum size, the first
+    one found is the one that keeps the highest-priority PRs. That first set is
+    the first-come-first-served one, so the search starts from it and only
+    looks for larger sets; after `max_visits` search nodes it gives up and
+    returns the best set so far.
+    """
+    position = {node: i for i, node in enumerate(nodes)}
+    best = [_first_come(nodes, adjacency)]
+    visits = [0]
+
+    def visit(i, chosen, banned, remaining):
+        # `remaining`: nodes[i:] not in `banned`, an upper bound on what is left.
+        if len(chosen) + remaining <= len(best[0]) or visits[0] >= max_visits:
+            return
+        visits[0] += 1
+        if i == len(nodes):
+            best[0] = set(chosen)
+            return
+        node = nodes[i]
+        if node in banned:
+            visit(i + 1, chosen, banned, remaining)
+            return
+        newly_banned = {
+            n
+            for n in adjacency.get(node, set()) - banned
+            if position.get(n, -1) > i
+        }
+        chosen.add(node)
+        visit(
+            i + 1, chosen, banned | newly_banned, remaining - 1 - len(newly_banned)
+        )
+        chosen.discard(node)
+        visit(i + 1, chosen, banned, remaining - 1)
+
+    visit(0, set(), set(), len(nodes))
+    return best[0]
+
+
+def plan_order(pr_numbers, graph):
+    """Plan a merge order for `pr_numbers` (given in the order's priority).
+
+    Returns {"order": [...], "merged": [...], "blocked": [...]}: `order` lists
+    the predicted-mergeable PRs first, then the rest, both in priority order;
+    `merged` / `blocked` are the predicted outcomes for PRs in the graph.
+    PRs missing from the graph keep their place among the mergeable ones and
+    appear in neither list.
+    """
+    graph_prs = (graph or {}).get("prs", {})
+    adjacency = _hard_edges(graph)
+    known = [n for n in pr_numbers if str(n) in graph_prs]
+    clean = [n for n in known if graph_prs[str(n)]["base"] == BASE_CLEAN]
+
+    chosen = set()
+    for component in _components(clean, adjacency):
+        component.sort(key=clean.index)
+        if len(component) <= MAX_EXACT_COMPONENT:
+            chosen |= _max_independent(component, adjacency)
+        else:
+            chosen |= _first_come(component, adjacency)
+
+    head = [n for n in pr_numbers if n in chosen or str(n) not in graph_prs]
+    tail = [n for n in pr_numbers if n not in head]
+
+    # A resolvable pair merges only if the resolving PR comes second.
+    for _ in range(len(head)):
+        moved = False
+        for edge in (graph or {}).get("conflicts", []):
+            resolver = edge.get("resolved_by")
+            if resolver is None:
+                continue
+            other = next(n for n in edge["prs"] if n != resolver)
+            if resolver in head and other in head:
+                if head.index(resolver) < head.index(other):
+                    head.remove(resolver)
+                    head.insert(head.index(other) + 1, resolver)
+                    moved = True
+        if not moved:
+            break
+
+    return {
+        "order": head + tail,
+        "merged": sorted(chosen),
+        "blocked": sorted(n for n in known if n not in chosen),
+    }
+
+
+def predicted_merged(graph, order_suffix):
+    """Set of PRs the graph predicts `order_suffix` merges, or None if unplanned."""
+    plan = ((graph or {}).get("plans") or {}).get(order_suffix)
+    return set(plan["merged"]) if plan else None
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+github_client.py - One pooled GitHub REST client for the automation scripts.
+
+Why this exists
+---------------
+00_clone_merge_and_create_branch.py, 02_upload_to_falken10vdl.py,
+check_pr_changes.py and github_downloads.py each built their own
+`github_headers()` and called bare `requests.get/post/patch/delete`, so every
+call opened a new TLS connection, several had no timeout, and each script
+paged through list endpoints with its own loop.
+
+GitHubClient wraps one keep-alive `requests.Session` and gives every call:
+
+- a default timeout (GITHUB_API_TIMEOUT, 30s),
+- retries with backoff on 5xx, connection errors and (secondary) rate limits,
+  honouring Retry-After / X-RateLimit-Reset; POSTs are only retried when
+  GitHub refused them for rate limiting, since a 5xx may have created it,
+- pacing: every request takes a token from the bucket of its quota (core,
+  search, graphql, uploads), and mutating requests also from a "writes"
+  bucket sized to GitHub's secondary limit on content creation. When a
+  response's X-RateLimit-Remaining shows the quota running low, its bucket
+  slows to what is left until X-RateLimit-Reset, so back-to-back cleanup,
+  listing and upload phases do not run into the limit,
+- transparent pagination (`paginate()` fans out over the pages up to Link
+  rel="last" on a few threads, yielding items in page order),
+- per-endpoint call counts and latencies, and per-quota budget usage,
+  printed when the script exits.
+
+`graphql()` posts a query to the GraphQL endpoint through the same session.
+The base URLs come from GITHUB_API_URL / GITHUB_UPLOADS_URL /
+GITHUB_GRAPHQL_URL, so a local stand-in can replace api.github.com in tests.
+"""
+
+import atexit
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+
+import requests
+
+DEFAULT_API_URL = "https://api.github.com"
+DEFAULT_UPLOADS_URL = "https://uploads.github.com"
+
+# Backoff between retries: 1s, 2s, 4s, ... capped; a rate-limit reset further
+# away than MAX_RATE_LIMIT_WAIT is not waited for (the response is returned).
+MAX_RETRIES = 3
+MAX_BACKOFF = 30
+MAX_RATE_LIMIT_WAIT = 120
+
+# Token bucket per quota: (requests per second, burst). GitHub allows 5000
+# core requests/hour per token, 30 searches/minute and about 80 content-creating
+# requests/minute (secondary limit); the core rate is a ceiling that the
+# X-RateLimit feedback lowers when the hourly budget runs short.
+# GITHUB_API_RATE overrides the core rate; 0 turns pacing off.
+RATE_LIMITS = {
+    "core": (10.0, 20),
+    "search": (0.5, 5),
+    "graphql": (5.0, 10),
+    "uploads": (2.0, 4),
+    "writes": (80 / 60, 10),
+}
+# Below this share of a quota (and at least LOW_BUDGET_MIN requests) a bucket
+# slows to spread what is left until the reset.
+LOW_BUDGET_FRACTION = 0.1
+LOW_BUDGET_MIN = 100
+
+# Pages fetched at once when a list endpoint reports its last page.
+PAGE_WORKERS = 4
+
+# Numeric path segments and tag/branch names after known collections are
+# folded so counters aggregate per endpoint, not per release or PR.
+_ID_SEGMENT_RE = re.compile(r"/\d+(?=/|$)")
+_NAMED_SEGMENT_RE = re.compile(r"/(tags|heads|commits|branches)/[^?]+$")
+
+
+class GraphQLError(Exception):
+    """A GraphQL response that carried errors and no usable data."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket; `acquire()` blocks until a token is free."""
+
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Take one token, sleeping as long as needed; returns seconds slept."""
+        with self._lock:
+            self._refill(time.monotonic())
+            # Reserve the token now (possibly going negative) so concurrent
+            # callers queue up behind each other instead of all waking at once.
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited += wait
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def throttle(self, remaining, reset_in, limit=None):
+        """Re-pace from the quota a response reported.
+
+        While more than LOW_BUDGET_FRACTION of the quota is left the bucket
+        runs at its full rate; below that, at what `remaining` requests over
+        `reset_in` seconds sustain.
+        """
+        low = max(LOW_BUDGET_MIN, (limit or 0) * LOW_BUDGET_FRACTION)
+        if remaining > low:
+            rate = self.max_rate
+        else:
+            # Never stall completely: a 403/429 is still handled by the retry.
+            rate = max(min(self.max_rate, remaining / max(reset_in, 1.0)), 0.05)
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+
+def _page_number(url):
+    values = parse_qs(urlparse(url).query).get("page")
+    return int(values[0]) if values and values[0].isdigit() else None
+
+
+def _with_page(url, page):
+    parts = urlparse(url)
+    query = parse_qs(parts.query)
+    query["page"] = [str(page)]
+    return urlunparse(parts._replace(query=urlencode(query, doseq=True)))
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+class GitHubClient:
+    def __init__(
+        self, token=None, api_url=None, uploads_url=None, graphql_url=None, timeout=None
+    ):
+        self.api_url = (
+            api_url or os.getenv("GITHUB_API_URL") or DEFAULT_API_URL
+        ).rstrip("/")
+        # api.github.com/graphql; GitHub Enterprise serves REST under /api/v3
+        # and GraphQL under /api/graphql.
+        self.graphql_url = (
+            graphql_url
+            or os.getenv("GITHUB_GRAPHQL_URL")
+            or (
+                self.api_url[: -len("/v3")] + "/graphql"
+                if self.api_url.endswith("/api/v3")
+                else self.api_url + "/graphql"
+            )
+        )
+        self.uploads_url = (
+            uploads_url or os.getenv("GITHUB_UPLOADS_URL") or DEFAULT_UPLOADS_URL
+        ).rstrip("/")
+        self.timeout = timeout or _env_float("GITHUB_API_TIMEOUT", 30)
+        self.session = requests.Session()
+        self.session.headers.update(
+            {
+                "Accept": "application/vnd.github+json",
+                "X-GitHub-Api-Version": "2022-11-28",
+            }
+        )
+        if token:
+            self.session.headers["Authorization"] = f"token {token}"
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        core_rate = _env_float("GITHUB_API_RATE", RATE_LIMITS["core"][0])
+        self._buckets = {}
+        if core_rate > 0:
+            for resource, (rate, burst) in RATE_LIMITS.items():
+                if resource == "core":
+                    rate = core_rate
+                self._buckets[resource] = TokenBucket(rate, burst)
+        self._budget = {}
+
+    def url(self, path, uploads=False):
+        """Absolute URL for an API path ("repos/o/r/pulls"); URLs pass through."""
+        if path.startswith(("http://", "https://")):
+            return path
+        base = self.uploads_url if uploads else self.api_url
+        return f"{base}/{path.lstrip('/')}"
+
+    def _endpoint(self, method, url):
+        path = url.split("?", 1)[0]
+        for base in (self.api_url, self.uploads_url):
+            if path.startswith(base):
+                path = path[len(base) :]
+                break
+        path = _NAMED_SEGMENT_RE.sub(r"/\1/{name}", path)
+        return f"{method} {_ID_SEGMENT_RE.sub('/{id}', path)}"
+
+    def _record(self, endpoint, seconds):
+        with self._stats_lock:
+            entry = self._stats.setdefault(
+                endpoint, {"calls": 0, "seconds": 0.0, "max": 0.0}
+            )
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+
+    def _resource(self, url, uploads):
+        """The quota a request counts against, as GitHub names it."""
+        if uploads or url.startswith(self.uploads_url):
+            return "uploads"
+        if url.startswith(self.graphql_url):
+            return "graphql"
+        if url.startswith(f"{self.api_url}/search/"):
+            return "search"
+        return "core"
+
+    def _pace(self, method, resource):
+        """Block until the request's buckets allow it."""
+        waited = 0.0
+        bucket = self._buckets.get(resource)
+        if bucket:
+            waited += bucket.acquire()
+        if method in ("POST", "PUT", "PATCH", "DELETE") and resource != "graphql":
+            writes = self._buckets.get("writes")
+            if writes:
+                waited += writes.acquire()
+        return waited
+
+    def _observe(self, response, resource):
+        """Record the quota headers of a response and re-pace its bucket."""
+        headers = response.headers
+        remaining = headers.get("X-RateLimit-Remaining", "")
+        reset = headers.get("X-RateLimit-Reset", "")
+        if not (remaining.isdigit() and reset.isdigit()):
+            return
+        resource = headers.get("X-RateLimit-Resource") or resource
+        limit = headers.get("X-RateLimit-Limit", "")
+        with self._stats_lock:
+            self._budget[resource] = {
+                "limit": int(limit) if limit.isdigit() else None,
+                "remaining": int(remaining),
+                "reset": int(reset),
+            }
+        bucket = self._buckets.get(resource)
+        if bucket:
+            bucket.throttle(
+                int(remaining),
+                int(reset) - time.time(),
+                int(limit) if limit.isdigit() else None,
+            )
+
+    @staticmethod
+    def _rate_limit_wait(response):
+        """Seconds to wait before retrying a rate-limited response, else None."""
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return int(retry_after)
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            reset = response.headers.get("X-RateLimit-Reset", "")
+            if reset.isdigit():
+                return max(0, int(reset) - int(time.time())) + 1
+        if response.status_code == 429 or "rate limit" in response.text.lower():
+            return 60
+        return None
+
+    def request(
+        self, method, path, uploads=False, retry=True, idempotent=None, **kwargs
+    ):
+        """Send one request with the pooled session; returns the Response.
+
+        Status codes are left to the caller, as with bare `requests`. Pass
+        retry=False for bodies that cannot be re-sent (e.g. an open file), and
+        idempotent=True for a POST that may safely be repeated after a 5xx.
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method != "POST"
+        url = self.url(path, uploads=uploads)
+        kwargs.setdefault("timeout", self.timeout)
+        endpoint = self._endpoint(method, url)
+        resource = self._resource(url, uploads)
+        attempts = MAX_RETRIES + 1 if retry else 1
+        for attempt in range(1, attempts + 1):
+            self._pace(method, resource)
+            start = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(endpoint, time.monotonic() - start)
+                if attempt >= attempts or not idempotent:
+                    raise
+                time.sleep(min(MAX_BACKOFF, 2 ** (attempt - 1)))
+                continue
+            self._record(endpoint, time.monotonic() - start)
+            self._observe(response, resource)
+            if attempt >= attempts:
+                return response
+            wait = self._rate_limit_wait(response)
+            if wait is not None:
+                if wait > MAX_RATE_LIMIT_WAIT:
+                    return response
+                print(f"⏳ GitHub rate limit on {endpoint}; retrying in {wait}s")
+                time.sleep(wait)
+                continue
+            if response.status_code >= 500 and idempotent:
+                time.sleep(min(MAX_BACKOFF, 2 ** (attempt - 1)))
+                continue
+            return response
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request("PATCH", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def graphql(self, query, variables=None):
+        """Run a GraphQL query and return its "data".
+
+        Raises requests.HTTPError on a non-2xx response and GraphQLError when
+        the response has errors and no data. Queries are reads, so they are
+        retried like GETs.
+        """
+        response = self.request(
+            "POST",
+            self.graphql_url,
+            idempotent=True,
+            json={"query": query, "variables": variables or {}},
+        )
+        response.raise_for_status()
+        payload = response.json()
+        if payload.get("errors") and not payload.get("data"):
+            raise GraphQLError(
+                "; ".join(e.get("message", str(e)) for e in payload["errors"])
+            )
+        return payload.get("data") or {}
+
+    def paginate(self, path, params=None, per_page=100, max_items=None, workers=None):
+        """Yield every item of a list endpoint, in page order.
+
+        When the first page's Link header has rel="last", the remaining pages
+        are fetched concurrently (`workers`, default PAGE_WORKERS) and yielded
+        in order; otherwise it follows rel="next" page by page. A server that
+        sends no Link header (a simple stand-in) is paged with ?page= until a
+        short page. `max_items` bounds how many pages are requested; callers
+        still stop consuming at their own limit. Raises requests.HTTPError on
+        a non-2xx page, after yielding the earlier ones.
+        """
+        params = dict(params or {})
+        params.setdefault("per_page", per_page)
+        page = int(params.pop("page", 1))
+        max_pages = (
+            page - 1 + -(-max_items // int(params["per_page"])) if max_items else None
+        )
+        workers = workers or PAGE_WORKERS
+        url = self.url(path)
+        while url:
+            response = self.get(
+                url, params={**params, "page": page} if params is not None else None
+            )
+            response.raise_for_status()
+            items = response.json()
+            yield from items
+            next_url = response.links.get("next", {}).get("url")
+            last_url = response.links.get("last", {}).get("url")
+            if (
+                workers > 1
+                and next_url
+                and last_url
+                and _page_number(next_url) is not None
+                and _page_number(last_url) is not None
+            ):
+                yield from self._fan_out(next_url, last_url, max_pages, workers)
+                return
+            if max_pages is not None and page >= max_pages:
+                url = None
+            elif "next" in response.links:
+                url, params = response.links["next"]["url"], None
+                page += 1
+            elif params is not None and "Link" not in response.headers and len(
+                items
+            ) >= int(params["per_page"]):
+                page += 1
+            else:
+                url = None
+
+    def _fan_out(self, next_url, last_url, max_pages, workers):
+        """Fetch pages next..last (capped at max_pages) concurrently, in order."""
+        first = _page_number(next_url)
+        last = _page_number(last_url)
+        if max_pages is not None:
+            last = min(last, max_pages)
+        urls = [_with_page(next_url, n) for n in range(first, last + 1)]
+        if not urls:
+            return
+        with ThreadPoolExecutor(max_workers=min(workers, len(urls))) as pool:
+            # map() yields in submission order, i.e. page order.
+            for response in pool.map(self.get, urls):
+                response.raise_for_status()
+                yield from response.json()
+
+    def stats(self):
+        """{endpoint: {"calls", "seconds", "max"}} for this client so far."""
+        with self._stats_lock:
+            return {k: dict(v) for k, v in self._stats.items()}
+
+    def budget(self):
+        """{quota: {"limit", "remaining", "reset", "paced"}} as last reported.
+
+        "paced" is the seconds requests of that quota waited for its bucket.
+        """
+        with self._stats_lock:
+            budget = {k: dict(v) for k, v in self._budget.items()}
+        for resource, bucket in self._buckets.items():
+            if bucket.waited:
+                budget.setdefault(resource, {})["paced"] = bucket.waited
+        return budget
+
+    def print_stats(self):
+        stats = self.stats()
+        if not stats:
+            return
+        calls = sum(s["calls"] for s in stats.values())
+        seconds = sum(s["seconds"] for s in stats.values())
+        print(f"\n📡 GitHub API: {calls} call(s), {seconds:.1f}s total")
+        for endpoint, s in sorted(stats.items(), key=lambda kv: -kv[1]["seconds"]):
+            print(
+                f"   {endpoint}: {s['calls']} call(s), "
+                f"avg {s['seconds'] / s['calls']:.2f}s, max {s['max']:.2f}s"
+            )
+        for resource, b in sorted(self.budget().items()):
+            line = f"   budget {resource}:"
+            if b.get("remaining") is not None:
+                line += f" {b['remaining']}/{b.get('limit') or '?'} left"
+                line += f", resets in {max(0, b['reset'] - int(time.time())) // 60}m"
+            if b.get("paced"):
+                line += f", paced {b['paced']:.1f}s"
+            print(line)
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def default_client():
+    """The process-wide client, created on first use from GITHUB_TOKEN.
+
+    Created lazily so scripts can load .env first. Its counters are printed
+    when the process exits.
+    """
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = GitHubClient(token=os.getenv("GITHUB_TOKEN"))
+            atexit.register(_default_client.print_stats)
+        return _default_client
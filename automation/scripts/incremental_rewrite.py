@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+incremental_rewrite.py - Bring the renamed build tree up to date from a git diff.
+
+Why this exists
+---------------
+Between two hourly builds the source tree only differs in the files touched by
+newly merged PRs or by the base moving, yet 01_build_bonsaiPR_addons.py wiped
+bonsaiPR-build, copied the whole IfcOpenShell tree again and rewrote every
+file.
+
+After a successful transform, 01 records the source tree id it was built from
+and a fingerprint of the rules (the sources of the rewrite scripts) in
+BUILD_BASE_DIR/.bonsaiPR_transform.json. The next run, `plan()` asks git for
+the paths changed between the recorded tree and the current one, and
+`apply()`:
+
+- copies only those files into the build tree, under their renamed paths
+  (bonsai_rewrite.build_path), and returns them for the content rewrite,
+- re-copies FIXED_PATHS, which 01's fix_* steps edit after the rewrite, so
+  every fix starts from the rewritten original again,
+- deletes everything in the build tree that the source tree no longer has,
+  including the previous run's build outputs (dist/, build/, node_modules/).
+
+`plan()` returns None, and 01 does the full copy and rewrite, when there is
+no record, the rules changed, the source worktree has uncommitted changes,
+the recorded tree is gone, or the tree contains submodules.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+
+import bonsai_rewrite
+
+RECORD_NAME = ".bonsaiPR_transform.json"
+SCHEMA_VERSION = 1
+
+# Build-tree paths that fix_*() in 01 edit or delete after the rewrite.
+FIXED_PATHS = (
+    "src/bonsaiPR/Makefile",
+    "src/ifctester/Makefile",
+    "src/ifctester/webapp/package-lock.json",
+)
+
+# Top-level build-tree entries that are not part of the source tree but stay.
+KEEP = (".git", RECORD_NAME)
+
+
+def rules_fingerprint(paths):
+    """SHA-256 of the given rule sources; a change forces a full pass."""
+    digest = hashlib.sha256(str(SCHEMA_VERSION).encode())
+    for path in sorted(paths):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _git(source_dir, *args):
+    return subprocess.run(
+        ["git", *args], cwd=source_dir, capture_output=True, text=True
+    )
+
+
+def source_tree(source_dir):
+    """Tree id of HEAD in `source_dir`, or None if it has uncommitted changes."""
+    status = _git(source_dir, "status", "--porcelain")
+    if status.returncode != 0 or status.stdout.strip():
+        return None
+    tree = _git(source_dir, "rev-parse", "HEAD^{tree}")
+    return tree.stdout.strip() if tree.returncode == 0 else None
+
+
+def _record_path(build_dir):
+    return os.path.join(build_dir, RECORD_NAME)
+
+
+def load_record(build_dir):
+    try:
+        with open(_record_path(build_dir), "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(record, dict) or record.get("schema") != SCHEMA_VERSION:
+        return None
+    return record
+
+
+def save_record(build_dir, tree, fingerprint):
+    with open(_record_path(build_dir), "w", encoding="utf-8") as f:
+        json.dump({"schema": SCHEMA_VERSION, "tree": tree, "rules": fingerprint}, f)
+        f.write("\n")
+
+
+def clear_record(build_dir):
+    """Forget the last transform, so an interrupted run is never built on."""
+    try:
+        os.remove(_record_path(build_dir))
+    except FileNotFoundError:
+        pass
+
+
+def _tree_paths(source_dir, tree):
+    """Every file path in `tree`, or None if it has submodules or git fails."""
+    result = _git(source_dir, "ls-tree", "-r", "-z", "--full-tree", tree)
+    if result.returncode != 0:
+        return None
+    paths = []
+    for entry in filter(None, result.stdout.split("\0")):
+        meta, path = entry.split("\t", 1)
+        if meta.split()[1] == "commit":
+            return None
+        paths.append(path)
+    return paths
+
+
+def _changed_paths(source_dir, old_tree, new_tree):
+    """Paths added, modified or retyped between two trees, or None on failure.
+
+    Deleted paths are not listed; apply() removes whatever the new tree lacks.
+    """
+    result = _git(
+        source_dir, "diff", "--raw", "-z", "--no-renames", "--no-abbrev", old_tree, new_tree
+    )
+    if result.returncode != 0:
+        return None
+    fields = result.stdout.split("\0")
+    changed = []
+    for meta, path in zip(fields[0::2], fields[1::2]):
+        old_mode, new_mode, _old, _new, status = meta.lstrip(":").split()
+        if "160000" in (old_mode, new_mode):
+            return None
+        if status != "D":
+            changed.append(path)
+    return changed
+
+
+def plan(source_dir, build_dir, fingerprint):
+    """(plan, None) for an incremental update, or (None, reason) for a full pass.
+
+    A plan holds the current "tree", the "changed" source paths and every
+    source path of the tree ("paths").
+    """
+    record = load_record(build_dir)
+    if record is None:
+        return None, "no record of a previous transformed build"
+    if record.get("rules") != fingerprint:
+        return None, "the replacement rules changed"
+    tree = source_tree(source_dir)
+    if tree is None:
+        return None, "the source tree has uncommitted changes"
+    paths = _tree_paths(source_dir, tree)
+    if paths is None:
+        return None, "the source tree could not be listed (or has submodules)"
+    changed = _changed_paths(source_dir, record.get("tree") or "", tree)
+    if changed is None:
+        return None, f"cannot diff against the recorded tree {record.get('tree')}"
+    return {"tree": tree, "changed": changed, "paths": paths}, None
+
+
+def _prune(build_dir, expected):
+    """Remove files under build_dir not in `expected`, then empty dirs.
+
+    KEEP entries at the top are never descended into.
+    """
+    removed = 0
+    for dirpath, dirs, files in os.walk(build_dir):
+        rel_dir = os.path.relpath(dirpath, build_dir).replace(os.sep, "/")
+        prefix = "" if rel_dir == "." else rel_dir + "/"
+        if rel_dir == ".":
+            dirs[:] = [d for d in dirs if d not in KEEP]
+            files = [f for f in files if f not in KEEP]
+        # Symlinks to directories are listed in dirs but not walked into.
+        links = [d for d in dirs if os.path.islink(os.path.join(dirpath, d))]
+        for name in files + links:
+            if prefix + name not in expected:
+                os.remove(os.path.join(dirpath, name))
+                removed += 1
+    for name in os.listdir(build_dir):
+        top = os.path.join(build_dir, name)
+        if name in KEEP or os.path.islink(top) or not os.path.isdir(top):
+            continue
+        for dirpath, _dirs, _files in os.walk(top, topdown=False):
+            if not os.listdir(dirpath):
+                os.rmdir(dirpath)
+    return removed
+
+
+def apply(source_dir, build_dir, sync_plan):
+    """Copy the changed files into build_dir and drop what the tree lost.
+
+    Returns {"copied": [absolute build paths to rewrite], "removed": n}.
+    Symlinks are recreated as links and not returned for the rewrite.
+    """
+    targets = {}
+    for path in sync_plan["paths"]:
+        target = bonsai_rewrite.build_path(path)
+        targets[target] = path
+    refresh = {bonsai_rewrite.build_path(p) for p in sync_plan["changed"]}
+    refresh.update(p for p in FIXED_PATHS if p in targets)
+
+    removed = _prune(build_dir, set(targets))
+    # Anything else missing from the build tree is copied as well.
+    refresh.update(
+        t for t in targets if not os.path.lexists(os.path.join(build_dir, t))
+    )
+
+    copied = []
+    for target in sorted(refresh):
+        source = os.path.join(source_dir, targets[target])
+        destination = os.path.join(build_dir, target)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        # Never write through whatever is at the destination (a symlink may
+        # point outside the build tree).
+        if os.path.isdir(destination) and not os.path.islink(destination):
+            shutil.rmtree(destination)
+        elif os.path.lexists(destination):
+            os.remove(destination)
+        if os.path.islink(source):
+            # As in tree_transform: a link, with its target path renamed.
+            os.symlink(bonsai_rewrite.build_path(os.readlink(source)), destination)
+            continue
+        shutil.copy2(source, destination, follow_symlinks=False)
+        copied.append(destination)
+    return {"copied": copied, "removed": removed}
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+merge_checkpoints.py - Resume the merge loop from the last unchanged PR.
+
+Why this exists
+---------------
+apply_prs_to_branch() merges every PR onto a fresh branch off the base, one
+`git merge` at a time. When the base commit and the first K PRs of the merge
+order have the same head shas as in an earlier run, merging those K PRs gives
+the same tree again, so the work can be skipped: after each PR the loop records
+a checkpoint (the branch commit at that point and the PR's outcome), and the
+next run resets the branch to the longest matching checkpoint and carries on
+from PR K+1.
+
+Checkpoint keys are chained hashes:
+
+    key_0 = sha256(base commit, known-conflict-resolutions digest)
+    key_i = sha256(key_{i-1}, "<pr number>:<head sha>")
+
+so key_i identifies the base plus the exact ordered prefix of i PRs. Each
+checkpoint commit is held by a ref, refs/bonsaipr/checkpoint/<order>/<key>, so
+gc keeps it; outcomes live in a small JSON index per order,
+logs/merge_checkpoints.<order>.json. Every merge order keeps its own refs and
+index, so the orders never prune each other's chains. At the end of a run,
+everything not on the chain that run just merged is pruned.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+
+CHECKPOINT_NAMESPACE = "refs/bonsaipr/checkpoint"
+
+LOGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logs")
+
+OUTCOME_APPLIED = "applied"
+OUTCOME_FAILED = "failed"
+
+
+def checkpoint_ref(order_suffix, key):
+    return f"{CHECKPOINT_NAMESPACE}/{order_suffix}/{key}"
+
+
+def index_path(order_suffix):
+    return os.path.join(LOGS_DIR, f"merge_checkpoints.{order_suffix}.json")
+
+
+def prefix_keys(base_commit, salt, sequence):
+    """Chained keys for every prefix of `sequence` ([(pr_number, head_sha)])."""
+    key = hashlib.sha256(f"{base_commit}\n{salt}".encode("utf-8")).hexdigest()
+    keys = []
+    for pr_number, sha in sequence:
+        key = hashlib.sha256(f"{key}\n{pr_number}:{sha}".encode("utf-8")).hexdigest()
+        keys.append(key)
+    return keys
+
+
+def load_index(order_suffix):
+    """{key: entry}, or {} if absent/unreadable."""
+    try:
+        with open(index_path(order_suffix), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        return index if isinstance(index, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_index(index, order_suffix):
+    path = index_path(order_suffix)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Written via rename: a run killed mid-write leaves the previous index.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def _stored_refs(repo_dir, order_suffix):
+    """{key: commit} for every checkpoint ref of one order in the clone."""
+    namespace = f"{CHECKPOINT_NAMESPACE}/{order_suffix}"
+    result = subprocess.run(
+        ["git", "for-each-ref", "--format=%(objectname) %(refname)", namespace],
+        cwd=repo_dir,
+        capture_output=True,
+        text=True,
+    )
+    refs = {}
+    for line in result.stdout.splitlines():
+        sha, _, ref = line.partition(" ")
+        refs[ref[len(namespace) + 1 :]] = sha
+    return refs
+
+
+def find_resume_point(repo_dir, index, keys, order_suffix):
+    """Longest prefix of `keys` with a usable checkpoint at every step.
+
+    Returns (length, [entry, ...]) with one index entry per PR of the prefix;
+    (0, []) when nothing matches.
+    """
+    refs = _stored_refs(repo_dir, order_suffix)
+    entries = []
+    for key in keys:
+        entry = index.get(key)
+        if not entry or refs.get(key) != entry.get("commit"):
+            break
+        entries.append(entry)
+    return len(entries), entries
+
+
+def record(
+    repo_dir, index, key, pr_number, outcome, order_suffix, base_commit, commit=None
+):
+    """Checkpoint `commit` (default HEAD) as the result of the prefix ending in `pr_number`."""
+    head = commit or subprocess.run(
+        ["git", "rev-parse", "HEAD"], cwd=repo_dir, capture_output=True, text=True
+    ).stdout.strip()
+    if not head:
+        return False
+    result = subprocess.run(
+        ["git", "update-ref", checkpoint_ref(order_suffix, key), head],
+        cwd=repo_dir,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(f"⚠️  Could not record merge checkpoint: {result.stderr.strip()}")
+        return False
+    index[key] = {
+        "commit": head,
+        "pr": pr_number,
+        "outcome": outcome,
+        "base": base_commit,
+    }
+    return True
+
+
+def prune(repo_dir, index, keep_keys, order_suffix):
+    """Drop every checkpoint of this order that is not in `keep_keys`.
+
+    `keep_keys` is the chain the current run merged, so checkpoints for an
+    older base or for PRs that moved on go away. Refs with no index entry (e.g.
+    an index lost with logs/) are removed too. Returns how many were dropped.
+    """
+    keep_keys = set(keep_keys)
+    stale = [key for key in index if key not in keep_keys]
+    for key in stale:
+        del index[key]
+    orphans = [key for key in _stored_refs(repo_dir, order_suffix) if key not in index]
+    if orphans:
+        subprocess.run(
+            ["git", "update-ref", "--stdin"],
+            cwd=repo_dir,
+            input="".join(
+                f"delete {checkpoint_ref(order_suffix, key)}\n" for key in orphans
+            ),
+            capture_output=True,
+            text=True,
+        )
+    return len(set(stale) | set(orphans))
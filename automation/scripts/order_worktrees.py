@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+order_worktrees.py - One linked worktree per merge order.
+
+Why this exists
+---------------
+main.py used to run the ascending merge to completion, then the descending and
+by-updated ones, each starting with setup_repository() (`reset --hard`,
+`clean -fd`, fetch, force-push) in the same BASE_CLONE_DIR, so the merge phase
+took three passes back to back.
+
+Each merge order now gets its own `git worktree` next to the clone:
+
+    <BASE_CLONE_DIR>-asc, <BASE_CLONE_DIR>-desc, <BASE_CLONE_DIR>-upd
+
+The worktrees share the clone's object store and refs (PR heads, checkpoints,
+probe commits), so the three merges run at the same time without cloning or
+fetching anything twice. Only the working tree, index and HEAD are per order.
+The clone itself stays on SOURCE_BASE_BRANCH; every worktree starts from a
+detached HEAD at the base so the base branch is never checked out twice.
+"""
+
+import os
+import subprocess
+
+
+def worktree_dir(base_clone_dir, order_suffix):
+    """Path of the worktree for one merge order (asc/desc/upd)."""
+    return f"{os.path.normpath(base_clone_dir)}-{order_suffix}"
+
+
+def _git(args, cwd):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    )
+
+
+def prepare_worktree(base_clone_dir, order_suffix, base_ref):
+    """Create or reset the order's worktree, detached at `base_ref`.
+
+    A worktree left mid-merge or on an old build branch by an earlier run is
+    reset and cleaned first. Returns the worktree path.
+    """
+    path = worktree_dir(base_clone_dir, order_suffix)
+    if not os.path.exists(os.path.join(path, ".git")):
+        # Forget worktrees whose directory was deleted by hand, so the path
+        # can be registered again.
+        _git(["worktree", "prune"], base_clone_dir)
+        _git(["worktree", "add", "--force", "--detach", path, base_ref], base_clone_dir)
+        print(f"🌳 Created {order_suffix} worktree: {path}")
+        return path
+    subprocess.run(["git", "merge", "--abort"], cwd=path, capture_output=True)
+    _git(["reset", "--hard", "HEAD"], path)
+    _git(["clean", "-fd"], path)
+    _git(["checkout", "--detach", base_ref], path)
+    print(f"🌳 Reset {order_suffix} worktree to {base_ref}: {path}")
+    return path
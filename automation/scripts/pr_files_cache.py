@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+pr_files_cache.py - Changed paths of each PR, cached by head and base sha.
+
+Why this exists
+---------------
+The paths a PR changes can only differ when its head or base commit moves, yet
+00_clone_merge_and_create_branch.py asked GitHub for them again on every
+hourly run (`/pulls/N/files`, one paginated call per PR), and nothing else in
+the pipeline could see them without asking again.
+
+Entries are keyed by (PR number, head sha, base sha) and stored in
+logs/pr_files_cache.json. A run only fetches the files of PRs that are new or
+moved; everything else is a cache hit. Readers:
+
+- pr_needs_cpp_recompile() (SKIP_CPP_PRS),
+- the conflict graph, which skips probing PR pairs that touch no common path.
+
+Each entry records when it was last used. Entries of PRs that are no longer
+open are pruned, and beyond MAX_ENTRIES the least recently used ones go.
+"""
+
+import json
+import os
+import time
+
+LOGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logs")
+CACHE_PATH = os.path.join(LOGS_DIR, "pr_files_cache.json")
+
+SCHEMA_VERSION = 1
+
+# Open PRs number a few hundred; the slack keeps the previous head of each
+# PR for a while (an order merging the last snapshot can still find it).
+MAX_ENTRIES = 2000
+
+
+def cache_key(pr):
+    """(number, head sha, base sha) of a REST-shaped PR dict, as a string."""
+    head = (pr.get("head") or {}).get("sha") or ""
+    base = (pr.get("base") or {}).get("sha") or ""
+    return f"{pr['number']}:{head}:{base}"
+
+
+def load_cache(path=CACHE_PATH):
+    """The on-disk cache, or an empty one if absent/unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("schema") == SCHEMA_VERSION and isinstance(
+            cache.get("entries"), dict
+        ):
+            return cache
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {"schema": SCHEMA_VERSION, "entries": {}}
+
+
+def save_cache(cache, path=CACHE_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def lookup(cache, pr):
+    """The cached paths of `pr` at its current head and base, or None."""
+    entry = cache["entries"].get(cache_key(pr))
+    if entry is None:
+        return None
+    entry["used"] = time.time()
+    return list(entry["files"])
+
+
+def store(cache, pr, files):
+    cache["entries"][cache_key(pr)] = {
+        "pr": pr["number"],
+        "files": list(files),
+        "used": time.time(),
+    }
+
+
+def prune(cache, open_numbers, max_entries=MAX_ENTRIES):
+    """Drop entries of closed PRs, then the least recently used over max_entries.
+
+    Returns how many entries were dropped.
+    """
+    entries = cache["entries"]
+    open_numbers = set(open_numbers)
+    dropped = [k for k, e in entries.items() if e.get("pr") not in open_numbers]
+    for key in dropped:
+        del entries[key]
+    excess = len(entries) - max_entries
+    if excess > 0:
+        oldest = sorted(entries, key=lambda k: entries[k].get("used", 0))[:excess]
+        for key in oldest:
+            del entries[key]
+        return len(dropped) + len(oldest)
+    return len(dropped)
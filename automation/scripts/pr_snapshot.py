@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+pr_snapshot.py - Every open PR, with its changed files, from a few GraphQL queries.
+
+Why this exists
+---------------
+get_open_prs() paged through REST `/pulls`, and with SKIP_CPP_PRS=1
+pr_needs_cpp_recompile() then paged through `/pulls/N/files` once per PR: N+1
+round trips, repeated by every merge order.
+
+`fetch_open_prs()` asks GraphQL for the open PRs 50 at a time, including the
+draft flag, base and head ref/sha, head repo, author, timestamps and
+(optionally) the first 100 changed paths of each PR; only PRs with more files
+need a follow-up query. Each node is converted to the REST `/pulls` dict shape
+the merge stage already consumes (`number`, `title`, `html_url`, `draft`,
+`user.login`, `base.sha`, `head.ref/sha/label/repo.clone_url`, ...), plus a
+`files` list when files were asked for.
+
+The --setup-only pass saves the snapshot to logs/pr_snapshot.json and the
+concurrent merge orders load it, so all of them merge exactly the same PR set
+without asking GitHub again.
+"""
+
+import json
+import os
+import time
+
+LOGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logs")
+SNAPSHOT_PATH = os.path.join(LOGS_DIR, "pr_snapshot.json")
+
+# A snapshot older than this is not reused (it belongs to an earlier run).
+SNAPSHOT_MAX_AGE = 3600
+
+PAGE_SIZE = 50
+FILES_PAGE_SIZE = 100
+
+_PULLS_QUERY = """
+query($owner: String!, $name: String!, $cursor: String, $withFiles: Boolean!) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(states: OPEN, first: %d, after: $cursor,
+                 orderBy: {field: CREATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number title url isDraft createdAt updatedAt
+        author { login }
+        baseRefName baseRefOid
+        headRefName headRefOid
+        headRepositoryOwner { login }
+        headRepository { nameWithOwner url }
+        files(first: %d) @include(if: $withFiles) {
+          pageInfo { hasNextPage endCursor }
+          nodes { path }
+        }
+      }
+    }
+  }
+}
+""" % (PAGE_SIZE, FILES_PAGE_SIZE)
+
+_FILES_QUERY = """
+query($owner: String!, $name: String!, $number: Int!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      files(first: %d, after: $cursor) {
+        pageInfo { hasNextPage endCursor }
+        nodes { path }
+      }
+    }
+  }
+}
+""" % FILES_PAGE_SIZE
+
+
+def _rest_shape(node):
+    """A GraphQL PR node as the REST /pulls dict the merge stage reads."""
+    repo = node.get("headRepository")
+    owner = (node.get("headRepositoryOwner") or {}).get("login")
+    ref = node.get("headRefName")
+    return {
+        "number": node["number"],
+        "title": node.get("title") or "",
+        "html_url": node.get("url"),
+        "draft": bool(node.get("isDraft")),
+        "state": "open",
+        "created_at": node.get("createdAt") or "",
+        "updated_at": node.get("updatedAt") or "",
+        # A deleted account shows up as a null author ("ghost" in the web UI).
+        "user": {"login": (node.get("author") or {}).get("login") or "ghost"},
+        "base": {"ref": node.get("baseRefName"), "sha": node.get("baseRefOid")},
+        "head": {
+            "ref": ref,
+            "sha": node.get("headRefOid"),
+            "label": f"{owner}:{ref}" if owner else ref,
+            # None for a deleted fork, like REST's "repo": null.
+            "repo": (
+                {"full_name": repo["nameWithOwner"], "clone_url": f"{repo['url']}.git"}
+                if repo
+                else None
+            ),
+        },
+    }
+
+
+def _remaining_files(client, owner, name, number, cursor):
+    paths = []
+    while cursor:
+        data = client.graphql(
+            _FILES_QUERY,
+            {"owner": owner, "name": name, "number": number, "cursor": cursor},
+        )
+        files = data["repository"]["pullRequest"]["files"]
+        paths.extend(f["path"] for f in files["nodes"])
+        cursor = files["pageInfo"]["endCursor"] if files["pageInfo"]["hasNextPage"] else None
+    return paths
+
+
+def fetch_open_prs(client, owner, name, with_files=False):
+    """Every open PR of owner/name in REST shape, newest first.
+
+    With `with_files`, each PR also carries "files": its changed paths.
+    Raises requests.RequestException / github_client.GraphQLError on failure.
+    """
+    prs = []
+    cursor = None
+    while True:
+        data = client.graphql(
+            _PULLS_QUERY,
+            {"owner": owner, "name": name, "cursor": cursor, "withFiles": with_files},
+        )
+        pulls = data["repository"]["pullRequests"]
+        for node in pulls["nodes"]:
+            pr = _rest_shape(node)
+            if with_files:
+                files = node.get("files") or {"nodes": [], "pageInfo": {}}
+                pr["files"] = [f["path"] for f in files["nodes"]]
+                if files["pageInfo"].get("hasNextPage"):
+                    pr["files"] += _remaining_files(
+                        client, owner, name, node["number"], files["pageInfo"]["endCursor"]
+                    )
+            prs.append(pr)
+        if not pulls["pageInfo"]["hasNextPage"]:
+            return prs
+        cursor = pulls["pageInfo"]["endCursor"]
+
+
+def save_snapshot(prs, path=SNAPSHOT_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"generated_at": time.time(), "prs": prs}, f)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path=SNAPSHOT_PATH, max_age=SNAPSHOT_MAX_AGE):
+    """The saved PR list, or None if absent, unreadable or older than max_age."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(snapshot, dict) or not isinstance(snapshot.get("prs"), list):
+        return None
+    if time.time() - float(snapshot.get("generated_at") or 0) > max_age:
+        return None
+    return snapshot["prs"]
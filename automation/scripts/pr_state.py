@@ -37,6 +37,7 @@ import os
 import re
 import sys
 import json
+import hashlib
 import subprocess
 import datetime
 
@@ -115,6 +116,7 @@ def build_state(
     total_prs=None,
     release_tag=None,
     release_url=None,
+    tree=None,
 ):
     """Assemble a normalized, sorted snapshot from the parsed PR lists.
 
@@ -126,6 +128,10 @@ def build_state(
     later report can link "merges under desc" straight at the desc release that
     actually contains the PR. Both are optional: snapshots written before this
     field existed simply render as plain text.
+
+    `tree` is {"merged": <tree id of the merged branch>, "transform": <digest
+    of the build step>} (see build_identity()); it lets the next run recognise
+    that it would rebuild a byte-identical release.
     """
     prs = {}
 
@@ -168,6 +174,7 @@ def build_state(
         "merge_order": (merge_order or "").strip() or "unknown",
         "base": base,
         "release": {"tag": release_tag, "url": release_url},
+        "tree": tree,
         "counts": counts,
         # Sorted numerically now so the committed file is diff-stable.
         "prs": {k: prs[k] for k in sorted(prs, key=int)},
@@ -191,6 +198,73 @@ def load_state(path):
     return json.loads(text) if text else None
 
 
+# --------------------------------------------------------------------------- #
+# Release identity: skip rebuilding a byte-identical release
+# --------------------------------------------------------------------------- #
+#
+# The add-on is a pure function of the merged tree and of the build step that
+# copies it and applies the bonsai -> bonsaiPR replacements. If both match what
+# the last release of an order was built from, a rebuild would produce the same
+# files, so the build and upload are skipped and the snapshot only re-stamped.
+
+# The build step that turns the merged tree into the add-on sources: 01 and the
+# modules holding its rewrite rules. 01 also fingerprints these for its
+# incremental rewrite, so both notice the same edits.
+BUILD_TRANSFORM_SCRIPTS = (
+    "01_build_bonsaiPR_addons.py",
+    "bonsai_rewrite.py",
+    "incremental_rewrite.py",
+    "tree_transform.py",
+)
+
+
+def transform_paths(scripts_dir=None):
+    """Absolute paths of BUILD_TRANSFORM_SCRIPTS."""
+    scripts_dir = scripts_dir or os.path.dirname(os.path.abspath(__file__))
+    return [os.path.join(scripts_dir, name) for name in BUILD_TRANSFORM_SCRIPTS]
+
+
+def build_identity(merged_tree, scripts_dir=None):
+    """{"merged": tree id, "transform": digest of the build step}, or None."""
+    if not merged_tree:
+        return None
+    digest = hashlib.sha256()
+    try:
+        for path in transform_paths(scripts_dir):
+            with open(path, "rb") as f:
+                digest.update(os.path.basename(path).encode() + b"\0")
+                digest.update(f.read())
+    except OSError:
+        return None
+    return {"merged": merged_tree, "transform": digest.hexdigest()[:16]}
+
+
+def release_is_current(state, identity):
+    """True if `state` describes a release built from exactly `identity`."""
+    if not state or not identity:
+        return False
+    release = state.get("release") or {}
+    return bool(release.get("tag")) and state.get("tree") == identity
+
+
+def restamp_state(path, generated_at=None):
+    """Bump a snapshot's generated_at without touching anything else.
+
+    Used when a run reproduced the last release exactly: the snapshot is still
+    accurate, it is just newer. Returns False if there is no snapshot.
+    """
+    state = load_state(path)
+    if not state:
+        return False
+    if generated_at is None:
+        generated_at = datetime.datetime.now(datetime.timezone.utc).strftime(
+            "%Y-%m-%dT%H:%M:%SZ"
+        )
+    state["generated_at"] = generated_at
+    write_state(state, path)
+    return True
+
+
 # --------------------------------------------------------------------------- #
 # Cross-order robustness (asc / desc / upd)
 # --------------------------------------------------------------------------- #
@@ -229,19 +303,24 @@ def load_order_states(reports_dir, suffixes=ORDER_SUFFIXES):
     return states
 
 
-def robustness_sources(states):
+def robustness_sources(states, graph=None):
     """[(suffix, generated_at)] for the orders that actually have a snapshot.
 
     The caller needs this for provenance: the snapshots are written at the END of
     each order's build, so within a run the companion orders' files are still from
     the PREVIOUS run. Any report quoting robustness has to say which vintage it
-    compared against.
+    compared against. Orders planned in `graph` (conflict_graph.py) are reported
+    with the graph's own timestamp instead, since that is what they come from.
     """
-    return [
-        (suffix, (state or {}).get("generated_at"))
-        for suffix, state in states.items()
-        if state and state.get("prs")
-    ]
+    plans = (graph or {}).get("plans") or {}
+    sources = []
+    for suffix in ORDER_SUFFIXES:
+        state = (states or {}).get(suffix)
+        if suffix in plans:
+            sources.append((suffix, graph.get("generated_at")))
+        elif state and state.get("prs"):
+            sources.append((suffix, state.get("generated_at")))
+    return sources
 
 
 def order_releases(states):
@@ -267,32 +346,63 @@ def order_link(suffix, releases, label=None):
     return f"[{label}]({url})" if url else label
 
 
-def compute_robustness(states):
+def compute_robustness(states, graph=None):
     """Per-PR cross-order merge outcome, keyed by stringified PR number.
 
     `states` is the {suffix: state|None} mapping from load_order_states(). Only
     orders with a usable snapshot participate. Each record is:
 
-        merged_in   [suffix, ...]  orders whose snapshot merged this PR
-        blocked_in  [suffix, ...]  orders that saw it but did not merge it
-        stable      bool           merged in EVERY order that saw it, having been
-                                   seen by at least two
+        merged_in       [suffix, ...]  orders whose snapshot merged this PR
+        blocked_in      [suffix, ...]  orders that saw it but did not merge it
+        stable          bool           merged in EVERY order that saw it, having
+                                       been seen by at least two
+        conflicts_with  [pr, ...]      PRs it textually conflicts with (only
+                                       when `graph` is given)
+
+    `graph` is the conflict graph written by conflict_graph.py for the current
+    run. For every order it has a plan for, the plan's predicted outcome
+    replaces that order's snapshot, which is usually a run behind; PRs the graph
+    never saw (drafts, excluded, unfetchable) still come from the snapshot.
 
     A PR absent from every snapshot (first seen this run) has no record at all.
     """
+    plans = (graph or {}).get("plans") or {}
     robustness = {}
+
+    def _add(num, suffix, merged):
+        entry = robustness.setdefault(num, {"merged_in": [], "blocked_in": []})
+        entry["merged_in" if merged else "blocked_in"].append(suffix)
+
     for suffix in ORDER_SUFFIXES:
+        plan = plans.get(suffix)
+        planned = set()
+        if plan:
+            for num in plan.get("merged", []):
+                _add(str(num), suffix, True)
+            for num in plan.get("blocked", []):
+                _add(str(num), suffix, False)
+            planned = {str(n) for n in plan.get("merged", []) + plan.get("blocked", [])}
         state = (states or {}).get(suffix)
         if not state or not state.get("prs"):
             continue
         for num, rec in state["prs"].items():
-            entry = robustness.setdefault(num, {"merged_in": [], "blocked_in": []})
-            bucket = "merged_in" if rec.get("status") == STATUS_MERGED else "blocked_in"
-            entry[bucket].append(suffix)
+            if num not in planned:
+                _add(num, suffix, rec.get("status") == STATUS_MERGED)
 
     for entry in robustness.values():
         seen = len(entry["merged_in"]) + len(entry["blocked_in"])
         entry["stable"] = seen >= 2 and not entry["blocked_in"]
+
+    if graph:
+        partners = {}
+        for edge in graph.get("conflicts", []):
+            if edge.get("resolved_by") is not None:
+                continue
+            a, b = edge["prs"]
+            partners.setdefault(str(a), set()).add(b)
+            partners.setdefault(str(b), set()).add(a)
+        for num, entry in robustness.items():
+            entry["conflicts_with"] = sorted(partners.get(num, ()))
     return robustness
 
 
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+tree_transform.py - Build the renamed bonsaiPR tree with git plumbing.
+
+Why this exists
+---------------
+A full build used to rmtree BUILD_BASE_DIR, copy the whole source worktree
+into it with shutil.copy2 (its .git included), then walk the copy three times:
+file contents, file names, directory names.
+
+`transform_tree()` works on the source commit's tree instead:
+
+1. `git ls-tree -r` lists every blob with its mode and id,
+2. blobs with a cached rewrite (bonsai_rewrite.cache_lookup, keyed by the
+   very same blob id) are not read at all; the rest stream through one
+   `git cat-file --batch`, and only those that pass the byte prefilter are
+   rewritten (on a process pool, REWRITE_WORKERS),
+3. paths are renamed in memory (bonsai_rewrite.build_path), symlink targets
+   included, so links keep pointing at the renamed files,
+4. the rewritten blobs are written with one `git hash-object -w
+   --stdin-paths`, the entries go into a temporary index with one
+   `git update-index --index-info`, and `git write-tree` turns it into the
+   transformed tree.
+
+Symlinks differ from the copy fallback: copy_source_for_bonsaiPR_build()
+follows them (shutil.copy2) and writes the target's content as a regular
+file, while here they stay symlinks (mode 120000) and their target path gets
+the same rename as every other path. A link to a file under src/bonsai/ would
+otherwise dangle once that directory is src/bonsaiPR/. The target path is
+only renamed, never content-rewritten.
+
+`materialize()` then checks that tree out into an empty BUILD_BASE_DIR with
+one `git checkout-index -a`: one pass, no .git copy, and the same input
+commit always yields the same tree id.
+
+01 falls back to the copy + walks when the source worktree has uncommitted
+changes (they are not in any tree) or the tree contains submodules.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bonsai_rewrite
+
+SYMLINK_MODE = "120000"
+GITLINK_MODE = "160000"
+
+
+def _git(source_dir, args, env=None, input=None):
+    return subprocess.run(
+        ["git", *args],
+        cwd=source_dir,
+        env=env,
+        input=input,
+        capture_output=True,
+        check=True,
+    ).stdout
+
+
+def _index_env(index_path):
+    return dict(os.environ, GIT_INDEX_FILE=index_path)
+
+
+def _list_tree(source_dir, tree):
+    """[(mode, blob id, path)], or None if the tree has submodules."""
+    entries = []
+    output = _git(source_dir, ["ls-tree", "-r", "-z", "--full-tree", tree])
+    for record in filter(None, output.decode("utf-8", "surrogateescape").split("\0")):
+        meta, path = record.split("\t", 1)
+        mode, _kind, blob = meta.split()
+        if mode == GITLINK_MODE:
+            return None
+        entries.append((mode, blob, path))
+    return entries
+
+
+def _read_blobs(source_dir, blobs):
+    """Yield (blob id, bytes) for each id, through one `git cat-file --batch`."""
+    process = subprocess.Popen(
+        ["git", "cat-file", "--batch"],
+        cwd=source_dir,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+
+    def feed():
+        try:
+            for blob in blobs:
+                process.stdin.write(blob.encode() + b"\n")
+            process.stdin.close()
+        except OSError:
+            # The reader stopped early and killed git (broken pipe).
+            pass
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    finished = False
+    try:
+        for blob in blobs:
+            header = process.stdout.readline().split()
+            if len(header) != 3:
+                raise subprocess.CalledProcessError(1, "git cat-file --batch")
+            data = process.stdout.read(int(header[2]))
+            process.stdout.read(1)  # trailing newline
+            yield blob, data
+        finished = True
+    finally:
+        # Stopped early (error, or the generator was closed): git may be
+        # blocked writing to a full stdout pipe and the feeder on stdin, so
+        # stop git before waiting for the feeder.
+        process.stdout.close()
+        if not finished and process.poll() is None:
+            process.kill()
+        writer.join()
+        process.wait()
+
+
+def transform_tree(source_dir, tree, cache_dir=None, workers=None):
+    """Write the bonsaiPR version of `tree` to the object DB of source_dir.
+
+    Returns None if the tree has submodules, otherwise per-file counts like
+    bonsai_rewrite.rewrite_tree()'s ("processed", "modified", "prefiltered",
+    "binary", "cache_hits", "errors") plus "files", "renamed" and "tree", the
+    transformed tree id. Raises subprocess.CalledProcessError if git fails.
+    """
+    entries = _list_tree(source_dir, tree)
+    if entries is None:
+        return None
+    symlinks = {blob for mode, blob, _path in entries if mode == SYMLINK_MODE}
+
+    # Per distinct blob: its outcome, and its replacement (bytes to write or
+    # the path of a cached rewrite; None keeps the blob as it is).
+    outcome = {}
+    replacement = {}
+    cached = set()
+    to_read = []
+    for _mode, blob, _path in entries:
+        if blob in outcome:
+            continue
+        hit = None
+        if cache_dir and blob not in symlinks:
+            hit = bonsai_rewrite.cache_lookup(cache_dir, blob)
+        if hit:
+            outcome[blob], replacement[blob] = hit
+            cached.add(blob)
+        else:
+            outcome[blob] = None
+            to_read.append(blob)
+
+    matched = {}
+    for blob, data in _read_blobs(source_dir, to_read):
+        if blob in symlinks:
+            # Keep links pointing at the renamed paths.
+            target = os.fsdecode(data)
+            renamed = bonsai_rewrite.build_path(target)
+            outcome[blob] = "symlink"
+            replacement[blob] = os.fsencode(renamed) if renamed != target else None
+            continue
+        verdict = bonsai_rewrite.classify(data)
+        if verdict == bonsai_rewrite.BINARY:
+            outcome[blob] = "binary"
+        elif verdict == bonsai_rewrite.NO_MATCH:
+            outcome[blob] = "prefiltered"
+        else:
+            matched[blob] = data
+
+    if matched:
+        if workers is None:
+            workers = bonsai_rewrite.default_workers()
+        blobs = list(matched)
+        datas = [matched[blob] for blob in blobs]
+        if workers > 1 and len(blobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(blobs))) as pool:
+                results = list(pool.map(bonsai_rewrite.rewrite_bytes, datas, chunksize=16))
+        else:
+            results = [bonsai_rewrite.rewrite_bytes(data) for data in datas]
+        for blob, new_data in zip(blobs, results):
+            if cache_dir:
+                bonsai_rewrite.cache_store(cache_dir, blob, new_data)
+            outcome[blob] = "unchanged" if new_data is None else "modified"
+            replacement[blob] = new_data
+
+    counts = bonsai_rewrite.empty_counts()
+    counts.update(files=len(entries), renamed=0)
+    for _mode, blob, _path in entries:
+        kind = outcome[blob]
+        if kind == "symlink":
+            continue
+        if kind == "binary":
+            counts["binary"] += 1
+            continue
+        counts["processed"] += 1
+        if kind in ("prefiltered", "modified"):
+            counts[kind] += 1
+        counts["cache_hits"] += blob in cached
+
+    with tempfile.TemporaryDirectory(prefix="bonsaiPR-tree-") as tmp:
+        new_ids = _write_blobs(source_dir, replacement, tmp)
+        index_lines = []
+        for mode, blob, path in entries:
+            new_path = bonsai_rewrite.build_path(path)
+            counts["renamed"] += new_path != path
+            index_lines.append(f"{mode} {new_ids.get(blob, blob)}\t{new_path}")
+        env = _index_env(os.path.join(tmp, "index"))
+        _git(
+            source_dir,
+            ["update-index", "-z", "--index-info"],
+            env=env,
+            input="\0".join(index_lines).encode("utf-8", "surrogateescape") + b"\0",
+        )
+        counts["tree"] = _git(source_dir, ["write-tree"], env=env).decode().strip()
+    return counts
+
+
+def _write_blobs(source_dir, replacements, tmp):
+    """{old blob id: new blob id} for every replacement, via one hash-object."""
+    blobs, paths = [], []
+    for blob, replacement in replacements.items():
+        if replacement is None:
+            continue
+        if isinstance(replacement, bytes):
+            path = os.path.join(tmp, blob)
+            with open(path, "wb") as f:
+                f.write(replacement)
+        else:
+            path = replacement
+        blobs.append(blob)
+        paths.append(path)
+    if not paths:
+        return {}
+    output = _git(
+        source_dir,
+        ["hash-object", "-w", "--no-filters", "--stdin-paths"],
+        input="\n".join(paths).encode() + b"\n",
+    )
+    return dict(zip(blobs, output.decode().split()))
+
+
+def materialize(source_dir, tree, build_dir):
+    """Replace build_dir with a checkout of `tree` (no .git)."""
+    if os.path.exists(build_dir):
+        shutil.rmtree(build_dir)
+    os.makedirs(build_dir)
+    with tempfile.TemporaryDirectory(prefix="bonsaiPR-tree-") as tmp:
+        env = _index_env(os.path.join(tmp, "index"))
+        _git(source_dir, ["read-tree", tree], env=env)
+        prefix = os.path.join(os.path.abspath(build_dir), "")
+        _git(source_dir, ["checkout-index", "-a", "-f", f"--prefix={prefix}"], env=env)
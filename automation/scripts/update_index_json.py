@@ -1,6 +1,7 @@
 import os
 import json
-import hashlib
+
+import asset_stream
 
 def update_index_json(index_path, release_tag, addon_files):
     """
@@ -36,9 +37,8 @@ def update_index_json(index_path, release_tag, addon_files):
         plat = get_platform(fname)
         if not plat:
             continue
-        size = os.path.getsize(path)
-        with open(path, 'rb') as f:
-            hashval = hashlib.sha256(f.read()).hexdigest()
+        digest = asset_stream.file_digest(path)
+        size, hashval = digest['size'], digest['sha256']
         file_info[plat] = {
             'filename': fname,
             'size': size,
@@ -16,6 +16,7 @@ import subprocess
 import datetime
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add the config directory to the Python path
@@ -33,11 +34,24 @@ except ImportError:
 # Make sibling automation scripts importable (pr_state lives in ../scripts).
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
 import pr_state
+import conflict_graph
 
 # Committed per-order snapshots + event logs live here.
 REPORTS_DIR = os.path.join(os.path.dirname(__file__), "..", "reports")
 CHANGE_STATE_PATH = os.path.join(os.path.dirname(__file__), "..", "logs", "pr_state.json")
 
+# Steps that only turn a merged branch into a release. Skipped when the merged
+# tree is identical to the one the order's last release was built from.
+BUILD_SCRIPTS = ("01_build_bonsaiPR_addons.py", "02_upload_to_falken10vdl.py")
+
+# The merge orders run concurrently, each in its own worktree of the clone
+# (scripts/order_worktrees.py): (order suffix, 00 flags, label).
+MERGE_ORDERS = (
+    ("asc", [], "ASCENDING ORDER"),
+    ("desc", ["--reverse"], "REVERSED ORDER"),
+    ("upd", ["--by-updated"], "BY-UPDATED ORDER"),
+)
+
 
 def _events_path(order_suffix):
     """Path to the append-only event log for a merge order (asc/desc/upd)."""
@@ -201,7 +215,113 @@ def get_successfully_merged_prs(report_path):
     return extract_pr_numbers_from_section(report_path, "## ✅ Successfully Merged PRs")
 
 
-def run_script(script_name, description, args=None):
+def get_merged_tree(report_path):
+    """Tree id from the report's "Merged tree:" header line, or None"""
+    if not report_path or not os.path.exists(report_path):
+        return None
+    with open(report_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("Merged tree:"):
+                return line.split(":", 1)[1].strip() or None
+            if line.startswith("## "):
+                break
+    return None
+
+
+def release_is_current(report_path, order_suffix):
+    """True if the order's last release was built from this report's merged tree.
+
+    The build and upload would then reproduce that release byte for byte (for
+    example after a label edit or a comment bumped updated_at), so the caller
+    skips them; the order's snapshot is re-stamped to record the check.
+    """
+    identity = pr_state.build_identity(get_merged_tree(report_path))
+    state_path = pr_state.order_state_path(REPORTS_DIR, order_suffix)
+    state = pr_state.load_state(state_path)
+    if not pr_state.release_is_current(state, identity):
+        return False
+    pr_state.restamp_state(state_path)
+    logging.info(
+        f"♻️  Merged tree {identity['merged'][:12]} is identical to the last {order_suffix} "
+        f"release ({state['release']['tag']}); skipping build and upload"
+    )
+    return True
+
+
+def order_timestamps(start_time):
+    """Report/branch/tag timestamp per merge order, one minute apart.
+
+    The orders are merged at the same time, but each release needs its own
+    build-*-alphaYYMMDDHHMM branch and tag, as when they ran one after another.
+    """
+    return {
+        suffix: (start_time + datetime.timedelta(minutes=i)).strftime("%y%m%d%H%M")
+        for i, (suffix, _, _) in enumerate(MERGE_ORDERS)
+    }
+
+
+def get_order_report_path(timestamp):
+    """Path to the report a merge order wrote with --timestamp, or None"""
+    report_dir = os.getenv("REPORT_PATH", "/home/falken10vdl/bonsaiPRDevel")
+    import glob
+
+    report_files = sorted(
+        glob.glob(os.path.join(report_dir, f"README-bonsaiPR_*-alpha{timestamp}.txt")),
+        key=os.path.getmtime,
+        reverse=True,
+    )
+    return report_files[0] if report_files else None
+
+
+def select_merge_orders(graph):
+    """Merge orders worth running, from the conflict graph's predictions.
+
+    The ascending order always runs. A companion order is left out when its
+    plan merges no PR that the orders before it already merge: its release
+    could not rescue anything. Without a graph every order runs.
+    """
+    orders = []
+    predicted_so_far = set()
+    for suffix, _, label in MERGE_ORDERS:
+        predicted = conflict_graph.predicted_merged(graph, suffix)
+        if orders and predicted is not None and not (predicted - predicted_so_far):
+            logging.info(
+                f"⏭️  {label} SKIPPED: The conflict graph predicts it merges no PR the other orders miss."
+            )
+            continue
+        orders.append(suffix)
+        predicted_so_far |= predicted or set()
+    return orders
+
+
+def run_merge_orders(orders, timestamps):
+    """Run 00 for every order in `orders` at once, each in its own worktree.
+
+    Returns {order suffix: report path}, with None for an order whose merge
+    step failed or wrote no report.
+    """
+    labels = {suffix: label for suffix, _, label in MERGE_ORDERS}
+    flags = {suffix: args for suffix, args, _ in MERGE_ORDERS}
+
+    def run_order(suffix):
+        if not run_script(
+            "00_clone_merge_and_create_branch.py",
+            f"Clone repository and merge PRs ({labels[suffix]})",
+            flags[suffix] + ["--worktree", "--timestamp", timestamps[suffix]],
+        ):
+            return None
+        return get_order_report_path(timestamps[suffix])
+
+    with ThreadPoolExecutor(max_workers=len(orders)) as pool:
+        return dict(zip(orders, pool.map(run_order, orders)))
+
+
+def order_env(order_suffix, report_path):
+    """Environment for 01/02 to build and release one merge order"""
+    return {"BONSAIPR_ORDER": order_suffix, "BONSAIPR_REPORT_FILE": report_path or ""}
+
+
+def run_script(script_name, description, args=None, env=None):
     """Run an automation script with error handling"""
     scripts_dir = os.path.join(os.path.dirname(__file__), "..", "scripts")
     script_path = os.path.join(scripts_dir, script_name)
@@ -227,6 +347,7 @@ def run_script(script_name, description, args=None):
                 capture_output=True,
                 text=True,
                 timeout=3600,  # 1 hour timeout
+                env={**os.environ, **env} if env else None,
             )
 
             if result.returncode == 0:
@@ -321,7 +442,14 @@ def main():
         },
         {
             "script": "00_clone_merge_and_create_branch.py",
-            "description": "Clone repository and merge PRs with draft detection",
+            "description": "Update repository, fetch PR heads and plan merge orders",
+            "args": ["--setup-only"],
+            "required": True,
+        },
+        {
+            "script": "00_clone_merge_and_create_branch.py",
+            "description": "Merge PRs in every merge order (concurrent worktrees)",
+            "merge_orders": True,
             "required": True,
         },
         {
@@ -340,10 +468,33 @@ def main():
     success_count = 0
     total_steps = len(automation_steps)
 
+    timestamps = order_timestamps(start_time)
+    order_reports = {}
+    release_current = False
     for i, step in enumerate(automation_steps, 1):
         logging.info(f"\n📋 Step {i}/{total_steps}: {step['description']}")
 
-        if run_script(step["script"], step["description"]):
+        if step.get("merge_orders"):
+            # The setup step wrote this run's conflict graph; it decides which
+            # companion orders are worth merging alongside the ascending one.
+            graph = conflict_graph.load_graph(REPORTS_DIR, since=start_time.timestamp())
+            order_reports = run_merge_orders(select_merge_orders(graph), timestamps)
+            step_ok = order_reports.get("asc") is not None
+            if step_ok:
+                release_current = release_is_current(order_reports["asc"], "asc")
+        elif release_current and step["script"] in BUILD_SCRIPTS:
+            logging.info("⏭️  Skipped: the last ascending release is already current")
+            step_ok = True
+        elif step["script"] in BUILD_SCRIPTS:
+            step_ok = run_script(
+                step["script"],
+                step["description"],
+                env=order_env("asc", order_reports.get("asc")),
+            )
+        else:
+            step_ok = run_script(step["script"], step["description"], step.get("args"))
+
+        if step_ok:
             success_count += 1
         elif step["required"]:
             logging.error(f"💔 Required step failed, stopping automation")
@@ -351,14 +502,15 @@ def main():
         else:
             logging.warning(f"⚠️ Optional step failed, continuing")
 
-    # Check if we should retry with reversed PR order
+    # Companion orders were merged alongside the ascending one; release those
+    # that include PRs the ascending build had to skip.
     if success_count == total_steps:
-        report_path = get_latest_report_path()
+        report_path = order_reports.get("asc")
         if report_path and check_for_skipped_conflict_prs(report_path):
             logging.info("\n" + "=" * 60)
-            logging.info("🔄 RETRY WITH REVERSED PR ORDER")
+            logging.info("🔄 COMPANION MERGE ORDERS")
             logging.info("Found PRs skipped due to conflicts with other PRs.")
-            logging.info("Retrying with newer PRs first to maximize inclusion.")
+            logging.info("Checking whether the reversed and by-updated merges included them.")
             logging.info("=" * 60)
 
             # Get the PRs that were skipped in the first build
@@ -367,195 +519,192 @@ def main():
             logging.info(
                 f"📋 First build had {len(skipped_prs_first_build)} PR(s) skipped due to conflicts: {sorted(skipped_prs_first_build)}"
             )
-
-            # Step 1: Run merge with reversed order
-            logging.info(
-                f"\n📋 Retry Step 1/3: Clone repository and merge PRs (REVERSED ORDER)"
-            )
-            if run_script(
-                "00_clone_merge_and_create_branch.py",
-                "Clone repository and merge PRs (REVERSED ORDER)",
-                ["--reverse"],
+            # The merge step caches every pairwise probe (logs/conflict_pairs.json);
+            # name the PRs each skipped one collides with.
+            pair_cache = conflict_graph.load_pair_cache(since=start_time.timestamp())
+            for pr_num, partners in sorted(
+                conflict_graph.cached_partners(pair_cache, skipped_prs_first_build).items()
             ):
+                logging.info(
+                    f"   • PR #{pr_num} conflicts with {', '.join(f'#{n}' for n in partners)}"
+                )
 
-                # Get the new report and check if any previously skipped PRs are now merged
-                retry_report_path = get_latest_report_path()
-                if retry_report_path:
-                    merged_prs_retry = get_successfully_merged_prs(retry_report_path)
-
-                    # Find PRs that were skipped in first build but merged in retry
-                    newly_merged_prs = skipped_prs_first_build.intersection(
-                        merged_prs_retry
-                    )
-
-                    if newly_merged_prs:
-                        logging.info(
-                            f"\n✨ SUCCESS! Retry merged {len(newly_merged_prs)} PR(s) that were previously skipped:"
-                        )
-                        for pr_num in sorted(newly_merged_prs):
-                            logging.info(f"   • PR #{pr_num}")
-                        # Log these as 'rescued' events on the desc lineage: the
-                        # ascending build conflict-skipped them, descending merged them.
-                        pr_state.append_events(
-                            _events_path("desc"),
-                            pr_state.rescue_events(
-                                newly_merged_prs,
-                                rescued_by_order="desc",
-                                baseline_order="asc",
-                            ),
-                        )
-                        logging.info(
-                            "\n🚀 Continuing with build and release for retry..."
-                        )
-
-                        # Continue with build and upload since we have newly merged PRs
-                        retry_success_count = 1  # Already completed step 1
-                        retry_steps = [
-                            {
-                                "script": "01_build_bonsaiPR_addons.py",
-                                "description": "Build BonsaiPR addons for multiple platforms (RETRY)",
-                                "args": None,
-                                "required": True,
-                            },
-                            {
-                                "script": "02_upload_to_falken10vdl.py",
-                                "description": "Create GitHub release (RETRY)",
-                                "args": None,
-                                "required": True,
-                            },
-                        ]
-
-                        for i, step in enumerate(
-                            retry_steps, 2
-                        ):  # Start at 2 since step 1 is done
-                            logging.info(
-                                f"\n📋 Retry Step {i}/3: {step['description']}"
-                            )
+            # --- Second build: descending order ---
+            logging.info(f"\n📋 Retry Step 1/3: Merge PRs (REVERSED ORDER)")
+            retry_report_path = order_reports.get("desc")
+            if "desc" not in order_reports:
+                logging.info(
+                    "\n⏭️  RETRY SKIPPED: The conflict graph predicted the reversed order merges none of them."
+                )
+            elif retry_report_path:
+                merged_prs_retry = get_successfully_merged_prs(retry_report_path)
 
-                            if run_script(
-                                step["script"], step["description"], step.get("args")
-                            ):
-                                retry_success_count += 1
-                            elif step["required"]:
-                                logging.error(
-                                    f"💔 Required retry step failed, stopping retry"
-                                )
-                                break
-                            else:
-                                logging.warning(
-                                    f"⚠️ Optional retry step failed, continuing"
-                                )
+                # Find PRs that were skipped in first build but merged in retry
+                newly_merged_prs = skipped_prs_first_build.intersection(merged_prs_retry)
 
-                        if retry_success_count == 3:
-                            logging.info(
-                                "\n🎉 Retry completed successfully! Generated additional release."
-                            )
+                if newly_merged_prs:
+                    logging.info(
+                        f"\n✨ SUCCESS! Retry merged {len(newly_merged_prs)} PR(s) that were previously skipped:"
+                    )
+                    for pr_num in sorted(newly_merged_prs):
+                        logging.info(f"   • PR #{pr_num}")
+                    # Log these as 'rescued' events on the desc lineage: the
+                    # ascending build conflict-skipped them, descending merged them.
+                    pr_state.append_events(
+                        _events_path("desc"),
+                        pr_state.rescue_events(
+                            newly_merged_prs,
+                            rescued_by_order="desc",
+                            baseline_order="asc",
+                        ),
+                    )
+                    logging.info("\n🚀 Continuing with build and release for retry...")
+
+                    # Continue with build and upload since we have newly merged PRs
+                    desc_current = release_is_current(retry_report_path, "desc")
+                    retry_success_count = 1  # Already completed step 1
+                    retry_steps = [
+                        {
+                            "script": "01_build_bonsaiPR_addons.py",
+                            "description": "Build BonsaiPR addons for multiple platforms (RETRY)",
+                            "required": True,
+                        },
+                        {
+                            "script": "02_upload_to_falken10vdl.py",
+                            "description": "Create GitHub release (RETRY)",
+                            "required": True,
+                        },
+                    ]
+
+                    for i, step in enumerate(retry_steps, 2):  # Start at 2 since step 1 is done
+                        logging.info(f"\n📋 Retry Step {i}/3: {step['description']}")
+
+                        if desc_current:
                             logging.info(
-                                f"   New PRs included: {sorted(newly_merged_prs)}"
+                                "⏭️  Skipped: the last descending release is already current"
                             )
+                            retry_success_count += 1
+                        elif run_script(
+                            step["script"],
+                            step["description"],
+                            env=order_env("desc", retry_report_path),
+                        ):
+                            retry_success_count += 1
+                        elif step["required"]:
+                            logging.error(f"💔 Required retry step failed, stopping retry")
+                            break
                         else:
-                            logging.warning("\n⚠️ Retry partially completed")
-                    else:
-                        logging.info(
-                            f"\n⏭️  RETRY SKIPPED: No previously skipped PRs were merged in retry."
-                        )
+                            logging.warning(f"⚠️ Optional retry step failed, continuing")
+
+                    if retry_success_count == 3 and desc_current:
                         logging.info(
-                            "   The reversed order didn't help include more PRs."
+                            "\n🎉 Retry completed: the existing descending release already includes them."
                         )
+                    elif retry_success_count == 3:
                         logging.info(
-                            "   Second release not needed - would be identical or worse."
+                            "\n🎉 Retry completed successfully! Generated additional release."
                         )
+                        logging.info(f"   New PRs included: {sorted(newly_merged_prs)}")
+                    else:
+                        logging.warning("\n⚠️ Retry partially completed")
                 else:
-                    logging.error("❌ Could not find retry report path")
+                    logging.info(
+                        f"\n⏭️  RETRY SKIPPED: No previously skipped PRs were merged in retry."
+                    )
+                    logging.info("   The reversed order didn't help include more PRs.")
+                    logging.info(
+                        "   Second release not needed - would be identical or worse."
+                    )
             else:
                 logging.error("❌ Retry merge step failed")
 
             # --- Third build: by-updated order ---
-            # Only runs when conflict-skipped PRs existed in the first build AND
-            # the descending build did not already capture all of them.
-            still_skipped = skipped_prs_first_build - (
-                newly_merged_prs if newly_merged_prs else set()
-            )
+            # Only released when the descending build did not already capture
+            # every conflict-skipped PR of the first build.
+            still_skipped = skipped_prs_first_build - newly_merged_prs
             if still_skipped:
                 logging.info("\n" + "=" * 60)
                 logging.info("🕒 THIRD BUILD: BY-UPDATED ORDER")
                 logging.info(
                     f"Descending build left {len(still_skipped)} PR(s) still unresolved: {sorted(still_skipped)}"
                 )
-                logging.info("Retrying with most-recently-updated PRs first.")
+                logging.info("Checking the most-recently-updated-first merge.")
                 logging.info("=" * 60)
 
-                logging.info(
-                    f"\n📋 By-Updated Step 1/3: Clone repository and merge PRs (BY-UPDATED ORDER)"
-                )
-                if run_script(
-                    "00_clone_merge_and_create_branch.py",
-                    "Clone repository and merge PRs (BY-UPDATED ORDER)",
-                    ["--by-updated"],
-                ):
-                    upd_report_path = get_latest_report_path()
-                    if upd_report_path:
-                        merged_prs_upd = get_successfully_merged_prs(upd_report_path)
-                        newly_merged_upd = still_skipped.intersection(merged_prs_upd)
-
-                        if newly_merged_upd:
-                            logging.info(
-                                f"\n✨ By-updated build merged {len(newly_merged_upd)} PR(s) that were still skipped:"
-                            )
-                            for pr_num in sorted(newly_merged_upd):
-                                logging.info(f"   • PR #{pr_num}")
-                            # Rescued by the by-updated order (still-skipped after asc+desc).
-                            pr_state.append_events(
-                                _events_path("upd"),
-                                pr_state.rescue_events(
-                                    newly_merged_upd,
-                                    rescued_by_order="upd",
-                                    baseline_order="asc",
-                                ),
-                            )
-                            logging.info(
-                                "\n🚀 Continuing with build and release for by-updated..."
-                            )
+                logging.info(f"\n📋 By-Updated Step 1/3: Merge PRs (BY-UPDATED ORDER)")
+                upd_report_path = order_reports.get("upd")
+                if "upd" not in order_reports:
+                    logging.info(
+                        "\n⏭️  BY-UPDATED SKIPPED: The conflict graph predicted the by-updated order merges none of them."
+                    )
+                elif upd_report_path:
+                    merged_prs_upd = get_successfully_merged_prs(upd_report_path)
+                    newly_merged_upd = still_skipped.intersection(merged_prs_upd)
+
+                    if newly_merged_upd:
+                        logging.info(
+                            f"\n✨ By-updated build merged {len(newly_merged_upd)} PR(s) that were still skipped:"
+                        )
+                        for pr_num in sorted(newly_merged_upd):
+                            logging.info(f"   • PR #{pr_num}")
+                        # Rescued by the by-updated order (still-skipped after asc+desc).
+                        pr_state.append_events(
+                            _events_path("upd"),
+                            pr_state.rescue_events(
+                                newly_merged_upd,
+                                rescued_by_order="upd",
+                                baseline_order="asc",
+                            ),
+                        )
+                        logging.info(
+                            "\n🚀 Continuing with build and release for by-updated..."
+                        )
 
-                            upd_success_count = 1
-                            for i, step_desc, script in [
-                                (
-                                    2,
-                                    "Build BonsaiPR addons (BY-UPDATED)",
-                                    "01_build_bonsaiPR_addons.py",
-                                ),
-                                (
-                                    3,
-                                    "Create GitHub release (BY-UPDATED)",
-                                    "02_upload_to_falken10vdl.py",
-                                ),
-                            ]:
-                                logging.info(f"\n📋 By-Updated Step {i}/3: {step_desc}")
-                                if run_script(script, step_desc):
-                                    upd_success_count += 1
-                                else:
-                                    logging.error(
-                                        f"💔 By-updated step {i} failed, stopping"
-                                    )
-                                    break
-
-                            if upd_success_count == 3:
+                        upd_current = release_is_current(upd_report_path, "upd")
+                        upd_success_count = 1
+                        for i, step_desc, script in [
+                            (
+                                2,
+                                "Build BonsaiPR addons (BY-UPDATED)",
+                                "01_build_bonsaiPR_addons.py",
+                            ),
+                            (
+                                3,
+                                "Create GitHub release (BY-UPDATED)",
+                                "02_upload_to_falken10vdl.py",
+                            ),
+                        ]:
+                            logging.info(f"\n📋 By-Updated Step {i}/3: {step_desc}")
+                            if upd_current:
                                 logging.info(
-                                    "\n🎉 By-updated build completed! Generated additional release."
+                                    "⏭️  Skipped: the last by-updated release is already current"
                                 )
+                                upd_success_count += 1
+                            elif run_script(
+                                script, step_desc, env=order_env("upd", upd_report_path)
+                            ):
+                                upd_success_count += 1
                             else:
-                                logging.warning(
-                                    "\n⚠️ By-updated build partially completed"
-                                )
-                        else:
+                                logging.error(f"💔 By-updated step {i} failed, stopping")
+                                break
+
+                        if upd_success_count == 3 and upd_current:
                             logging.info(
-                                f"\n⏭️  BY-UPDATED SKIPPED: No remaining skipped PRs were merged."
+                                "\n🎉 By-updated build completed: the existing release already includes them."
                             )
+                        elif upd_success_count == 3:
                             logging.info(
-                                "   The by-updated order didn't help include more PRs."
+                                "\n🎉 By-updated build completed! Generated additional release."
                             )
+                        else:
+                            logging.warning("\n⚠️ By-updated build partially completed")
                     else:
-                        logging.error("❌ Could not find by-updated report path")
+                        logging.info(
+                            f"\n⏭️  BY-UPDATED SKIPPED: No remaining skipped PRs were merged."
+                        )
+                        logging.info(
+                            "   The by-updated order didn't help include more PRs."
+                        )
                 else:
                     logging.error("❌ By-updated merge step failed")
             else:
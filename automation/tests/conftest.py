@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the tests that drive a temporary git repository.
+
+pytest puts this directory on sys.path, so test modules import the helpers
+with `from conftest import git, write, init_repo`.
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+def git(repo, *args):
+    """Run git in `repo`; returns its stripped stdout, raises if it fails."""
+    return subprocess.run(
+        ["git", "-C", repo] + list(args),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+
+def write(root, rel, content):
+    """Write `content` (str or bytes) to root/rel, creating parent dirs."""
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb" if isinstance(content, bytes) else "w") as f:
+        f.write(content)
+
+
+def init_repo(repo, branch="main"):
+    """An empty repository at `repo` with a committer identity configured."""
+    os.makedirs(repo, exist_ok=True)
+    git(repo, "init", "-q", "-b", branch)
+    git(repo, "config", "user.email", "test@example.com")
+    git(repo, "config", "user.name", "Test")
+    return repo
+
+
+def load_script(filename):
+    """Import a numbered pipeline script (e.g. 00_clone_...py) from scripts/.
+
+    Their names are not valid module names, so they are loaded by path, with
+    scripts/ on sys.path for the helper modules they import.
+    """
+    scripts_dir = os.path.join(os.path.dirname(__file__), "..", "scripts")
+    if scripts_dir not in sys.path:
+        sys.path.insert(0, scripts_dir)
+    spec = importlib.util.spec_from_file_location(
+        "script_" + filename.split("_", 1)[0], os.path.join(scripts_dir, filename)
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    """Path (str) of a fresh repository on branch main."""
+    return init_repo(str(tmp_path / "repo"))
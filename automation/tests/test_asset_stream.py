@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests for hashing release assets while uploading them (scripts/asset_stream.py),
+against a local stand-in upload server.
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import asset_stream
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    received = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        _StandIn.received = self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def test_upload_body_is_digested_while_streaming():
+    payload = os.urandom(3 * 1024 + 17)
+    expected = {"size": len(payload), "sha256": hashlib.sha256(payload).hexdigest()}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "asset.zip")
+        with open(path, "wb") as f:
+            f.write(payload)
+        try:
+            with asset_stream.HashingReader(path, chunk_size=1024) as reader:
+                assert reader.digest() is None
+                response = requests.post(
+                    f"http://127.0.0.1:{server.server_port}/upload", data=reader
+                )
+                digest = reader.digest()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert response.status_code == 201
+        assert _StandIn.received == payload
+        assert digest == expected
+        assert asset_stream.file_digest(path, chunk_size=1000) == expected
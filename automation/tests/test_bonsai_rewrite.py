@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for the process-pool bonsai -> bonsaiPR content rewrite
+(scripts/bonsai_rewrite.py), on a temporary tree.
+"""
+
+import os
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import bonsai_rewrite
+
+SAMPLE = (
+    "import bonsai.tool\n"
+    "class BonsaiPanel:  # BONSAI addon, see bonsai_utils and bonsaiPR\n"
+    "name = 'Bonsai'\n"
+)
+
+
+def _three_passes(text):
+    """What 01 used to do: one re.sub per spelling."""
+    for pattern, replacement in (
+        (r"\bbonsai\b", "bonsaiPR"),
+        (r"\bBonsai\b", "BonsaiPR"),
+        (r"\bBONSAI\b", "BONSAIPR"),
+    ):
+        text = re.sub(pattern, replacement, text)
+    return text
+
+
+def test_single_pass_matches_the_three_sequential_passes():
+    assert bonsai_rewrite.rewrite_text(SAMPLE) == _three_passes(SAMPLE)
+    assert "bonsaiPRPR" not in bonsai_rewrite.rewrite_text(SAMPLE)
+
+
+def test_rewrite_tree_on_a_pool_sums_worker_counts():
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(9):
+            os.makedirs(os.path.join(tmp, f"d{i % 3}"), exist_ok=True)
+            with open(os.path.join(tmp, f"d{i % 3}", f"f{i}.py"), "w") as f:
+                f.write(SAMPLE if i % 2 else "nothing to see\n")
+        with open(os.path.join(tmp, "icon.png"), "wb") as f:
+            f.write(b"\x89PNG\x00bonsai")
+
+        seen = []
+        totals = bonsai_rewrite.rewrite_tree(
+            tmp, workers=2, progress=lambda done, total: seen.append((done, total))
+        )
+
+        assert totals == {
+            "processed": 9,
+            "modified": 4,
+            "prefiltered": 5,
+            "binary": 1,
+            "cache_hits": 0,
+            "errors": [],
+        }
+        assert seen[-1] == (10, 10)
+        with open(os.path.join(tmp, "d1", "f1.py")) as f:
+            assert f.read() == _three_passes(SAMPLE)
+        with open(os.path.join(tmp, "icon.png"), "rb") as f:
+            assert f.read() == b"\x89PNG\x00bonsai"
+
+
+def test_prefilter_rejects_files_without_the_token_undecoded():
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = {
+            "empty.txt": b"",
+            "plain.cpp": b"int main() { return 0; }\n",
+            "upper.txt": b"see BoNsAi docs\n",
+            "blob.bin": b"bonsai\x00\xff",
+            "latin1.txt": b"caf\xe9 bonsai\n",
+        }
+        for name, data in cases.items():
+            with open(os.path.join(tmp, name), "wb") as f:
+                f.write(data)
+        verdict = {
+            name: bonsai_rewrite.prefilter(os.path.join(tmp, name)) for name in cases
+        }
+
+    assert verdict == {
+        "empty.txt": bonsai_rewrite.NO_MATCH,
+        "plain.cpp": bonsai_rewrite.NO_MATCH,
+        "upper.txt": bonsai_rewrite.MATCH,
+        "blob.bin": bonsai_rewrite.BINARY,
+        "latin1.txt": bonsai_rewrite.MATCH,
+    }
+
+
+def test_warm_cache_rewrites_without_the_regex_and_evicts_by_size():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, "cache")
+        paths = []
+        for name, content in (("a.py", SAMPLE), ("b.py", "bonsai_utils\n")):
+            path = os.path.join(tmp, name)
+            with open(path, "w") as f:
+                f.write(content)
+            paths.append(path)
+
+        cold = bonsai_rewrite.rewrite_paths(paths, workers=1, cache_dir=cache_dir)
+        assert (cold["modified"], cold["cache_hits"]) == (1, 0)
+
+        with open(paths[0], "w") as f:
+            f.write(SAMPLE)
+        original = bonsai_rewrite.rewrite_text
+        bonsai_rewrite.rewrite_text = None  # a hit must not need it
+        try:
+            warm = bonsai_rewrite.rewrite_paths(paths, workers=1, cache_dir=cache_dir)
+        finally:
+            bonsai_rewrite.rewrite_text = original
+        assert (warm["modified"], warm["cache_hits"], warm["errors"]) == (1, 2, [])
+        with open(paths[0]) as f:
+            assert f.read() == _three_passes(SAMPLE)
+
+        assert bonsai_rewrite.evict_cache(cache_dir, 10**9) == 0
+        assert bonsai_rewrite.evict_cache(cache_dir, 0) == 2
+
+
+def test_rewritten_files_get_text_mode_newlines_like_the_old_passes():
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = {
+            "crlf.py": b"import bonsai\r\nx = 1\r\n",
+            "cr.txt": b"Bonsai\rend\r",
+            "untouched.txt": b"bonsai_utils\r\n",
+        }
+        for name, data in cases.items():
+            with open(os.path.join(tmp, name), "wb") as f:
+                f.write(data)
+        bonsai_rewrite.rewrite_tree(tmp, workers=1)
+
+        # What 01 used to write: read in text mode, three passes, write back.
+        for name, data in cases.items():
+            with open(os.path.join(tmp, name), "rb") as f:
+                rewritten = f.read()
+            text = data.decode().replace("\r\n", "\n").replace("\r", "\n")
+            expected = _three_passes(text)
+            assert rewritten == (expected.encode() if expected != text else data)
+
+        assert bonsai_rewrite.rewrite_bytes(b"import bonsai\r\n") == b"import bonsaiPR\n"
+        assert bonsai_rewrite.rewrite_bytes(b"bonsai_utils\r\n") is None
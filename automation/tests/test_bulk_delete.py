@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for bulk release/tag/branch deletion (scripts/bulk_delete.py), against a
+local stand-in server.
+"""
+
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import bulk_delete
+import github_client
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    existing = set()
+    flaky = {}
+    deleted = []
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_DELETE(self):
+        with self.lock:
+            if self.flaky.get(self.path, 0) > 0:
+                self.flaky[self.path] -= 1
+                status = 409
+            elif self.path in self.existing:
+                self.existing.discard(self.path)
+                self.deleted.append(self.path)
+                status = 204
+            else:
+                status = 422 if "/git/refs/" in self.path else 404
+        body = b"" if status == 204 else json.dumps({"message": "x"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_delete_all_is_idempotent_retries_and_keeps_item_order():
+    _StandIn.existing = {
+        "/repos/o/r/releases/1",
+        "/repos/o/r/git/refs/tags/t1",
+        "/repos/o/r/releases/2",
+        "/repos/o/r/git/refs/heads/b3",
+    }
+    _StandIn.flaky = {"/repos/o/r/git/refs/heads/b3": 1}
+    items = [
+        ("t1", ["repos/o/r/releases/1", "repos/o/r/git/refs/tags/t1"]),
+        ("t2", ["repos/o/r/releases/2", "repos/o/r/git/refs/tags/t2"]),
+        ("b3", ["repos/o/r/git/refs/heads/b3"]),
+        ("gone", ["repos/o/r/releases/9"]),
+    ]
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = github_client.GitHubClient(
+            token="t", api_url=f"http://127.0.0.1:{server.server_port}"
+        )
+        dry = bulk_delete.delete_all(client, items, workers=4, dry_run=True)
+        assert {r["result"] for r in dry} == {bulk_delete.WOULD_DELETE}
+        assert _StandIn.deleted == []
+
+        results = bulk_delete.delete_all(client, items, workers=4, dry_run=False)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert [r["name"] for r in results] == ["t1", "t2", "b3", "gone"]
+    assert [r["result"] for r in results] == [
+        bulk_delete.DELETED,
+        bulk_delete.DELETED,
+        bulk_delete.DELETED,
+        bulk_delete.GONE,
+    ]
+    assert bulk_delete.succeeded(results) == 4
+    # A release always goes before its tag.
+    assert _StandIn.deleted.index("/repos/o/r/releases/1") < _StandIn.deleted.index(
+        "/repos/o/r/git/refs/tags/t1"
+    )
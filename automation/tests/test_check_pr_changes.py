@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for conditional /pulls polling in scripts/check_pr_changes.py, against a
+local stand-in server.
+"""
+
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import check_pr_changes
+import github_client
+
+
+def _pr(number, updated_at):
+    return {
+        "number": number,
+        "updated_at": updated_at,
+        "draft": False,
+        "state": "open",
+        "head": {"sha": f"{number:040x}", "repo": {"clone_url": "x"}},
+        "user": {"login": "someone"},
+    }
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    pulls = [_pr(1, "2026-01-01T00:00:00Z"), _pr(2, "2026-01-01T00:00:00Z")]
+    statuses = []
+    failing = False
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.failing:
+            self.statuses.append(404)
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps(self.pulls).encode("utf-8")
+        etag = f'"{hash(body) & 0xFFFFFFFF:x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.statuses.append(304)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.statuses.append(200)
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_unchanged_pages_are_served_from_cache_via_304():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    original_client = github_client._default_client
+    github_client._default_client = github_client.GitHubClient(
+        token="t", api_url=f"http://127.0.0.1:{server.server_port}"
+    )
+    try:
+        infos, cache, unchanged = check_pr_changes.get_open_pr_infos({})
+        first_hash = check_pr_changes.calculate_pr_state_hash(infos)
+        assert [i["number"] for i in infos] == [1, 2] and unchanged == 0
+
+        infos, cache, unchanged = check_pr_changes.get_open_pr_infos(cache)
+        assert unchanged == 1 and _StandIn.statuses == [200, 304]
+        assert check_pr_changes.calculate_pr_state_hash(infos) == first_hash
+
+        _StandIn.pulls = [_StandIn.pulls[0], _pr(2, "2026-02-01T00:00:00Z")]
+        infos, cache, unchanged = check_pr_changes.get_open_pr_infos(cache)
+        assert unchanged == 0
+        assert check_pr_changes.calculate_pr_state_hash(infos) != first_hash
+
+        # A failed fetch does not read as "nothing changed": the short list
+        # hashes differently, and the page cache is kept for the next check.
+        _StandIn.failing = True
+        infos, failed_cache, unchanged = check_pr_changes.get_open_pr_infos(cache)
+        assert infos == [] and failed_cache is cache
+        assert check_pr_changes.calculate_pr_state_hash(infos) != first_hash
+    finally:
+        _StandIn.failing = False
+        github_client._default_client = original_client
+        server.shutdown()
+        server.server_close()
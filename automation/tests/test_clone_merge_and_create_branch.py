@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Tests for testing failed PRs individually on a thread pool
+(test_failed_prs_individually in scripts/00_clone_merge_and_create_branch.py),
+with a temporary repository standing in for the IfcOpenShell clone.
+"""
+
+import os
+import threading
+import time
+
+from conftest import git, load_script, write
+
+clone_merge = load_script("00_clone_merge_and_create_branch.py")
+
+
+def _failed_pr_repo(repo):
+    """Base, three PRs forked from it, then upstream commits two PRs conflict with."""
+    write(repo, "shared.txt", "base\n")
+    write(repo, "other.txt", "base\n")
+    git(repo, "add", ".")
+    git(repo, "commit", "-q", "-m", "base")
+    fork = git(repo, "rev-parse", "HEAD")
+    prs = []
+    for number, name in ((31, "shared.txt"), (32, "new.txt"), (33, "other.txt")):
+        git(repo, "checkout", "-q", "-b", f"pr{number}", fork)
+        write(repo, name, f"pr {number}\n")
+        git(repo, "add", name)
+        git(repo, "commit", "-q", "-m", f"pr {number}")
+        sha = git(repo, "rev-parse", "HEAD")
+        git(repo, "update-ref", clone_merge.pr_refs.pr_ref(number), sha)
+        prs.append(
+            {
+                "number": number,
+                "title": f"PR {number}",
+                "head": {
+                    "ref": f"pr{number}",
+                    "sha": sha,
+                    "repo": {"clone_url": "https://example.invalid/fork.git"},
+                },
+            }
+        )
+    git(repo, "checkout", "-q", "main")
+    for name in ("shared.txt", "other.txt"):
+        write(repo, name, "upstream\n")
+        git(repo, "commit", "-q", "-am", f"upstream {name}")
+    return prs
+
+
+def _lock_in(tmp_path, monkeypatch):
+    lock = str(tmp_path / "logs" / "shared_state.lock")
+    monkeypatch.setattr(clone_merge, "SHARED_STATE_LOCK", lock)
+    return lock
+
+
+def test_pooled_failed_pr_tests_match_the_sequential_path(
+    git_repo, tmp_path, monkeypatch
+):
+    prs = _failed_pr_repo(git_repo)
+    _lock_in(tmp_path, monkeypatch)
+    monkeypatch.setattr(clone_merge, "work_dir", git_repo)
+    monkeypatch.setattr(clone_merge, "SOURCE_BASE_BRANCH", "main")
+    head_before = git(git_repo, "rev-parse", "HEAD")
+
+    # The first PR finishes last, so results arrive out of input order.
+    test_one = clone_merge._test_failed_pr
+
+    def slow_first(pr, since_commit, use_merge_tree):
+        if pr["number"] == 31:
+            time.sleep(0.3)
+        return test_one(pr, since_commit, use_merge_tree)
+
+    hints = clone_merge.find_breaking_commit_hints
+    hint_calls = []
+
+    def recording_hints(files, *args, **kwargs):
+        hint_calls.append((tuple(files), threading.current_thread().name))
+        return hints(files, *args, **kwargs)
+
+    monkeypatch.setattr(clone_merge, "_test_failed_pr", slow_first)
+    monkeypatch.setattr(clone_merge, "find_breaking_commit_hints", recording_hints)
+    monkeypatch.setattr(clone_merge, "FAILED_PR_TEST_WORKERS", 3)
+    pooled = clone_merge.test_failed_prs_individually(prs)
+
+    monkeypatch.setattr(clone_merge, "FAILED_PR_TEST_WORKERS", 1)
+    sequential = clone_merge.test_failed_prs_individually(prs)
+
+    results, conflicts = pooled
+    assert list(results) == [31, 32, 33]
+    assert results == {31: False, 32: True, 33: False}
+    assert pooled == sequential
+
+    # Each conflicting PR got hints for its own files only, from a worker thread.
+    assert sorted(files for files, _thread in hint_calls) == [
+        ("other.txt",),
+        ("other.txt",),
+        ("shared.txt",),
+        ("shared.txt",),
+    ]
+    assert all(thread != threading.main_thread().name for _files, thread in hint_calls)
+    assert conflicts[31]["files"] == ["shared.txt"]
+    assert "upstream shared.txt" in conflicts[31]["breaking_commits"][0]
+    assert conflicts[33]["files"] == ["other.txt"]
+    assert "upstream other.txt" in conflicts[33]["breaking_commits"][0]
+
+    # The probes never touched the checkout.
+    assert git(git_repo, "rev-parse", "HEAD") == head_before
+    assert git(git_repo, "status", "--porcelain") == ""
+
+
+def test_worktree_fallback_reports_the_same_results(git_repo, tmp_path, monkeypatch):
+    prs = _failed_pr_repo(git_repo)
+    _lock_in(tmp_path, monkeypatch)
+    monkeypatch.setattr(clone_merge, "work_dir", git_repo)
+    monkeypatch.setattr(clone_merge, "SOURCE_BASE_BRANCH", "main")
+    monkeypatch.setattr(clone_merge, "FAILED_PR_TEST_WORKERS", 3)
+    pooled = clone_merge.test_failed_prs_individually(prs)
+
+    monkeypatch.setattr(
+        clone_merge.merge_probe, "merge_tree_supported", lambda *args: False
+    )
+    assert clone_merge.test_failed_prs_individually(prs) == pooled
+
+
+def _overlap_repo(repo):
+    """PRs 41 and 44 touch their own files, 42 and 43 both edit shared.txt."""
+    write(repo, "shared.txt", "base\n")
+    git(repo, "add", ".")
+    git(repo, "commit", "-q", "-m", "base")
+    prs = []
+    for number, name in ((41, "a.txt"), (42, "shared.txt"), (43, "shared.txt"), (44, "b.txt")):
+        git(repo, "checkout", "-q", "-b", f"pr{number}", "main")
+        write(repo, name, f"pr {number}\n")
+        git(repo, "add", name)
+        git(repo, "commit", "-q", "-m", f"pr {number}")
+        sha = git(repo, "rev-parse", "HEAD")
+        git(repo, "update-ref", clone_merge.pr_refs.pr_ref(number), sha)
+        prs.append(
+            {
+                "number": number,
+                "title": f"PR {number}",
+                "draft": False,
+                "files": [name],
+                "head": {
+                    "ref": f"pr{number}",
+                    "sha": sha,
+                    "repo": {"clone_url": "https://example.invalid/fork.git"},
+                },
+            }
+        )
+    git(repo, "checkout", "-q", "main")
+    return prs
+
+
+def _apply(repo, prs, branch):
+    git(repo, "checkout", "-q", "main")
+    applied, failed, _skipped, stats = clone_merge.apply_prs_to_branch(branch, prs)
+    return (
+        [pr["number"] for pr in applied],
+        [pr["number"] for pr in failed],
+        stats,
+        git(repo, "rev-parse", f"{branch}^{{tree}}"),
+    )
+
+
+def test_fast_path_merges_disjoint_prs_and_falls_back_on_predicted_conflicts(
+    git_repo, tmp_path, monkeypatch
+):
+    prs = _overlap_repo(git_repo)
+    lock = _lock_in(tmp_path, monkeypatch)
+    monkeypatch.setattr(clone_merge, "work_dir", git_repo)
+    monkeypatch.setattr(clone_merge, "REPORTS_DIR", str(tmp_path / "reports"))
+    monkeypatch.setattr(clone_merge, "MERGE_CHECKPOINTS", False)
+    monkeypatch.setattr(clone_merge, "CONFLICT_PLANNER", True)
+    pairs = str(tmp_path / "conflict_pairs.json")
+    load_pairs = clone_merge.conflict_graph.load_pair_cache
+    save_pairs = clone_merge.conflict_graph.save_pair_cache
+    monkeypatch.setattr(
+        clone_merge.conflict_graph, "load_pair_cache", lambda *a, **k: load_pairs(pairs)
+    )
+    monkeypatch.setattr(
+        clone_merge.conflict_graph,
+        "save_pair_cache",
+        lambda cache, *a, **k: save_pairs(cache, pairs),
+    )
+
+    monkeypatch.setattr(clone_merge, "MERGE_FAST_PATH", True)
+    applied, failed, stats, fast_tree = _apply(git_repo, prs, "fast")
+    # 43 is predicted to conflict with 42, so it takes (and fails) `git merge`.
+    assert (applied, failed) == ([41, 42, 44], [43])
+    assert stats == {
+        "fast_path": 3,
+        "batches": 1,
+        "sequential": 1,
+        "predicted": 0,
+        "predicted_prs": [],
+    }
+    assert clone_merge.merge_paths_line(stats) == (
+        "Merge Paths: 3 fast-path (no files shared with merged PRs, 1 batch(es)), "
+        "1 merged sequentially"
+    )
+    assert git(git_repo, "status", "--porcelain") == ""
+    assert os.path.exists(lock)
+
+    monkeypatch.setattr(clone_merge, "MERGE_FAST_PATH", False)
+    applied, failed, stats, slow_tree = _apply(git_repo, prs, "slow")
+    assert (applied, failed, stats) == ([41, 42, 44], [43], None)
+    assert slow_tree == fast_tree
+
+    monkeypatch.setattr(clone_merge, "MERGE_FAST_PATH", True)
+    monkeypatch.setattr(clone_merge, "MERGE_SKIP_PREDICTED", True)
+    applied, failed, stats, _tree = _apply(git_repo, prs, "skip")
+    assert (failed, stats["sequential"], stats["predicted_prs"]) == ([43], 0, [43])
+    assert "1 not attempted as predicted conflicts" in clone_merge.merge_paths_line(stats)
+
+
+def test_merge_orders_take_turns_on_the_shared_state(tmp_path, monkeypatch):
+    _lock_in(tmp_path, monkeypatch)
+    events = []
+
+    def order(name, hold):
+        with clone_merge.shared_state_lock():
+            events.append(f"{name} in")
+            time.sleep(hold)
+            events.append(f"{name} out")
+
+    first = threading.Thread(target=order, args=("asc", 0.3))
+    first.start()
+    time.sleep(0.1)
+    order("desc", 0)
+    first.join()
+    assert events == ["asc in", "asc out", "desc in", "desc out"]
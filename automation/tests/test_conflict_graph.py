@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Tests for the pairwise conflict graph and merge-order planner
+(scripts/conflict_graph.py).
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import conflict_graph
+import merge_probe
+import pr_refs
+
+from conftest import git, write
+
+
+def _graph(clean, conflicts, base_conflicts=()):
+    prs = {str(n): {"head_sha": str(n), "base": "clean", "files": []} for n in clean}
+    for n in base_conflicts:
+        prs[str(n)] = {"head_sha": str(n), "base": "conflict", "files": ["x"]}
+    return {
+        "prs": prs,
+        "conflicts": [
+            {"prs": list(pair), "files": ["f"], "resolved_by": resolver}
+            for pair, resolver in conflicts
+        ],
+    }
+
+
+def test_plan_order_maximizes_inclusion_and_honours_resolutions():
+    # 1 conflicts with both 2 and 3: first-come would merge 1 alone.
+    graph = _graph([1, 2, 3, 4], [((1, 2), None), ((1, 3), None)], base_conflicts=[5])
+    plan = conflict_graph.plan_order([1, 2, 3, 4, 5], graph)
+    assert plan["merged"] == [2, 3, 4]
+    assert plan["blocked"] == [1, 5]
+    assert plan["order"] == [2, 3, 4, 1, 5]
+
+    # Equal-size choices go to the PRs the order reaches first.
+    graph = _graph([1, 2], [((1, 2), None)])
+    assert conflict_graph.plan_order([1, 2], graph)["merged"] == [1]
+    assert conflict_graph.plan_order([2, 1], graph)["merged"] == [2]
+
+    # A resolvable pair keeps both, with the resolving PR merged second.
+    graph = _graph([7003, 7802], [((7003, 7802), 7003)])
+    plan = conflict_graph.plan_order([7003, 7802], graph)
+    assert plan["merged"] == [7003, 7802]
+    assert plan["order"] == [7802, 7003]
+
+
+def test_exact_planner_is_bounded_on_a_dense_component():
+    # 24 PRs, each conflicting with about half the others, all one component.
+    rng = random.Random(24)
+    nodes = list(range(1, 25))
+    adjacency = {n: set() for n in nodes}
+    for a in nodes:
+        for b in nodes[a:]:
+            if rng.random() < 0.5:
+                adjacency[a].add(b)
+                adjacency[b].add(a)
+    assert len(list(conflict_graph._components(nodes, adjacency))) == 1
+
+    start = time.monotonic()
+    chosen = conflict_graph._max_independent(nodes, adjacency)
+    assert time.monotonic() - start < 1.0
+    assert all(not adjacency[n] & chosen for n in chosen)
+    greedy = conflict_graph._first_come(nodes, adjacency)
+    assert len(chosen) >= len(greedy)
+
+    # Out of budget, the search keeps the first-come-first-served set.
+    assert conflict_graph._max_independent(nodes, adjacency, max_visits=0) == greedy
+
+
+def test_build_graph_finds_pairwise_conflicts(git_repo):
+    if not merge_probe.merge_tree_supported():
+        return
+    with open(os.path.join(git_repo, "shared.txt"), "w") as f:
+        f.write("base\n")
+    git(git_repo, "add", "shared.txt")
+    git(git_repo, "commit", "-q", "-m", "base")
+    base = git(git_repo, "rev-parse", "HEAD")
+    heads = {}
+    for n, (name, content) in {
+        1: ("shared.txt", "one\n"),
+        2: ("shared.txt", "two\n"),
+        3: ("other.txt", "three\n"),
+    }.items():
+        git(git_repo, "checkout", "-q", "-b", f"pr{n}", base)
+        with open(os.path.join(git_repo, name), "w") as f:
+            f.write(content)
+        git(git_repo, "add", name)
+        git(git_repo, "commit", "-q", "-m", f"pr {n}")
+        heads[n] = git(git_repo, "rev-parse", "HEAD")
+        git(git_repo, "update-ref", pr_refs.pr_ref(n), heads[n])
+    git(git_repo, "checkout", "-q", "main")
+
+    graph = conflict_graph.build_graph(git_repo, base, heads)
+
+    assert {n: p["base"] for n, p in graph["prs"].items()} == {
+        "1": "clean",
+        "2": "clean",
+        "3": "clean",
+    }
+    assert graph["conflicts"] == [
+        {"prs": [1, 2], "files": ["shared.txt"], "resolved_by": None}
+    ]
+    assert conflict_graph.graph_matches(graph, base, heads)
+    assert not conflict_graph.graph_matches(graph, base, {**heads, 3: base})
+    assert git(git_repo, "status", "--porcelain") == ""
+
+    # With changed paths known, only the pair sharing a path is probed.
+    cache = conflict_graph.load_pair_cache(os.path.join(git_repo, "missing.json"))
+    files = {1: ["shared.txt"], 2: ["shared.txt"], 3: ["other.txt"]}
+    graph = conflict_graph.build_graph(
+        git_repo, base, heads, cache=cache, changed_files=files
+    )
+    assert [c["prs"] for c in graph["conflicts"]] == [[1, 2]]
+    assert len(cache["pairs"]) == 1
+
+
+def test_build_graph_reprobes_only_pairs_of_a_moved_pr(git_repo):
+    if not merge_probe.merge_tree_supported():
+        return
+    with open(os.path.join(git_repo, "base.txt"), "w") as f:
+        f.write("base\n")
+    git(git_repo, "add", "base.txt")
+    git(git_repo, "commit", "-q", "-m", "base")
+    base = git(git_repo, "rev-parse", "HEAD")
+
+    def _pr(n, content):
+        git(git_repo, "checkout", "-q", "-B", f"pr{n}", base)
+        with open(os.path.join(git_repo, f"pr{n}.txt"), "w") as f:
+            f.write(content)
+        git(git_repo, "add", f"pr{n}.txt")
+        git(git_repo, "commit", "-q", "-m", f"pr {n}")
+        sha = git(git_repo, "rev-parse", "HEAD")
+        git(git_repo, "update-ref", pr_refs.pr_ref(n), sha)
+        return sha
+
+    heads = {n: _pr(n, "v1\n") for n in (1, 2, 3, 4)}
+    cache = conflict_graph.load_pair_cache(os.path.join(git_repo, "missing.json"))
+    conflict_graph.build_graph(git_repo, base, heads, cache=cache)
+    assert len(cache["bases"]) == 4 and len(cache["pairs"]) == 6
+
+    calls = []
+    original = merge_probe.probe_merge
+
+    def _counting(*args):
+        calls.append(args)
+        return original(*args)
+
+    heads[4] = _pr(4, "v2\n")
+    merge_probe.probe_merge = _counting
+    try:
+        conflict_graph.build_graph(git_repo, base, heads, cache=cache)
+    finally:
+        merge_probe.probe_merge = original
+
+    # PR 4 against the base, then against each of the other three.
+    assert len(calls) == 4
+    assert len(cache["bases"]) == 4 and len(cache["pairs"]) == 6
+    assert all(
+        heads[n] == sha
+        for entry in cache["pairs"].values()
+        for n, sha in zip(entry["prs"], entry["shas"])
+    )
+
+
+def test_probe_cache_tells_apart_bases_with_the_same_tree(git_repo):
+    if not merge_probe.merge_tree_supported():
+        return
+    # Two bases with identical trees: `first` is the root, `second` changes
+    # f.txt and changes it back. A PR forked from the intermediate commit
+    # merges cleanly onto `first` but conflicts with the revert in `second`.
+    write(git_repo, "f.txt", "a\n")
+    git(git_repo, "add", "f.txt")
+    git(git_repo, "commit", "-q", "-m", "root")
+    first = git(git_repo, "rev-parse", "HEAD")
+    write(git_repo, "f.txt", "b\n")
+    git(git_repo, "commit", "-q", "-am", "b")
+    fork = git(git_repo, "rev-parse", "HEAD")
+    write(git_repo, "f.txt", "a\n")
+    git(git_repo, "commit", "-q", "-am", "back to a")
+    second = git(git_repo, "rev-parse", "HEAD")
+    assert git(git_repo, "rev-parse", f"{first}^{{tree}}") == git(
+        git_repo, "rev-parse", f"{second}^{{tree}}"
+    )
+    git(git_repo, "checkout", "-q", "-b", "pr1", fork)
+    write(git_repo, "f.txt", "c\n")
+    git(git_repo, "commit", "-q", "-am", "pr 1")
+    heads = {1: git(git_repo, "rev-parse", "HEAD")}
+    git(git_repo, "update-ref", pr_refs.pr_ref(1), heads[1])
+
+    cache = conflict_graph.load_pair_cache(os.path.join(git_repo, "missing.json"))
+    graph = conflict_graph.build_graph(git_repo, first, heads, cache=cache)
+    assert graph["prs"]["1"]["base"] == "clean"
+    graph = conflict_graph.build_graph(git_repo, second, heads, cache=cache)
+    assert graph["prs"]["1"]["base"] == "conflict"
+    assert list(cache["bases"]) == [f"{second}:{heads[1]}"]
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared GitHub API client (scripts/github_client.py), against a
+local stand-in server.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import github_client
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    pulls = [{"number": n} for n in range(1, 6)]
+    failures_left = 0
+    release_pages = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        page = int(query.get("page", ["1"])[0])
+        per_page = int(query.get("per_page", ["30"])[0])
+        if url.path == "/repos/o/r/pulls":
+            # No Link header: the client pages until a short page.
+            start = (page - 1) * per_page
+            self._send(200, self.pulls[start : start + per_page])
+        elif url.path == "/repos/o/r/tags":
+            headers = {}
+            if page == 1:
+                headers["Link"] = (
+                    f'<http://{self.headers["Host"]}/repos/o/r/tags?page=2>; rel="next"'
+                )
+            self._send(200, [{"name": f"t{page}"}], headers)
+        elif url.path == "/repos/o/r/releases":
+            # Five one-item pages with next/last links, like api.github.com.
+            _StandIn.release_pages.append(page)
+            base = f'http://{self.headers["Host"]}/repos/o/r/releases?per_page=1'
+            links = [f'<{base}&page=5>; rel="last"']
+            if page < 5:
+                links.append(f'<{base}&page={page + 1}>; rel="next"')
+            self._send(200, [{"id": page}], {"Link": ", ".join(links)})
+        elif url.path == "/rate_limited":
+            reset = str(int(time.time()) + 100)
+            self._send(
+                200,
+                {},
+                {
+                    "X-RateLimit-Limit": "5000",
+                    "X-RateLimit-Remaining": "50",
+                    "X-RateLimit-Reset": reset,
+                    "X-RateLimit-Resource": "core",
+                },
+            )
+        elif url.path == "/repos/o/r/flaky":
+            if _StandIn.failures_left:
+                _StandIn.failures_left -= 1
+                self._send(502, {"message": "bad gateway"})
+            else:
+                self._send(200, {"ok": True})
+        else:
+            self._send(404, {"message": "Not Found"})
+
+
+def test_client_paginates_retries_and_counts():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    original_backoff = github_client.MAX_BACKOFF
+    github_client.MAX_BACKOFF = 0
+    try:
+        client = github_client.GitHubClient(
+            token="t", api_url=f"http://127.0.0.1:{server.server_port}"
+        )
+
+        numbers = [pr["number"] for pr in client.paginate("repos/o/r/pulls", per_page=2)]
+        assert numbers == [1, 2, 3, 4, 5]
+
+        tags = [t["name"] for t in client.paginate("repos/o/r/tags", per_page=1)]
+        assert tags == ["t1", "t2"]
+
+        _StandIn.failures_left = 2
+        assert client.get("repos/o/r/flaky").status_code == 200
+
+        stats = client.stats()
+        assert stats["GET /repos/o/r/pulls"]["calls"] == 3
+        assert stats["GET /repos/o/r/flaky"]["calls"] == 3
+        assert client.get("repos/o/r/missing").status_code == 404
+    finally:
+        github_client.MAX_BACKOFF = original_backoff
+        server.shutdown()
+        server.server_close()
+
+
+def test_token_bucket_paces_and_follows_rate_limit_headers():
+    bucket = github_client.TokenBucket(rate=20.0, burst=1)
+    start = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+    assert bucket.waited > 0
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = github_client.GitHubClient(
+            token="t", api_url=f"http://127.0.0.1:{server.server_port}"
+        )
+        client.get("rate_limited")
+        # 50 of 5000 left for ~100s (below 10%): the core bucket slows to ~0.5/s.
+        assert client.budget()["core"]["remaining"] == 50
+        assert client._buckets["core"].rate <= 0.51
+        assert client._buckets["search"].rate == github_client.RATE_LIMITS["search"][0]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_paginate_fans_out_to_last_page_in_order():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = github_client.GitHubClient(
+            token="t", api_url=f"http://127.0.0.1:{server.server_port}"
+        )
+        ids = [r["id"] for r in client.paginate("repos/o/r/releases", per_page=1)]
+        assert ids == [1, 2, 3, 4, 5]
+        assert sorted(_StandIn.release_pages) == [1, 2, 3, 4, 5]
+
+        _StandIn.release_pages.clear()
+        ids = [
+            r["id"]
+            for r in client.paginate("repos/o/r/releases", per_page=1, max_items=3)
+        ]
+        assert ids == [1, 2, 3] and sorted(_StandIn.release_pages) == [1, 2, 3]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for updating the renamed build tree from a git diff
+(scripts/incremental_rewrite.py), with a temporary source repository.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import bonsai_rewrite
+import incremental_rewrite
+
+from conftest import git, write, init_repo
+
+
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
+
+def _read(root, rel):
+    with open(os.path.join(root, rel)) as f:
+        return f.read()
+
+
+def _sync(source, build):
+    sync_plan, reason = incremental_rewrite.plan(source, build, "rules")
+    assert reason is None
+    result = incremental_rewrite.apply(source, build, sync_plan)
+    bonsai_rewrite.rewrite_paths(result["copied"], workers=1)
+    incremental_rewrite.save_record(build, sync_plan["tree"], "rules")
+    return sync_plan, result
+
+
+def test_only_changed_files_are_copied_and_lost_files_removed():
+    with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as build:
+        init_repo(source)
+        write(source, "src/bonsai/__init__.py", "import bonsai\n")
+        write(source, "src/bonsai/Makefile", "dist:\n\tzip bonsai\n")
+        write(source, "README.md", "Bonsai\n")
+        write(source, "old.txt", "gone soon\n")
+        git(source, "add", ".")
+        git(source, "commit", "-q", "-m", "one")
+
+        # A record of the empty tree makes the first sync copy everything.
+        incremental_rewrite.save_record(build, EMPTY_TREE, "rules")
+        _sync(source, build)
+        assert _read(build, "src/bonsaiPR/__init__.py") == "import bonsaiPR\n"
+        assert _read(build, "README.md") == "BonsaiPR\n"
+
+        # Build outputs and a Makefile fix from the previous run.
+        write(build, "src/bonsaiPR/dist/bonsaiPR_old.zip", "zip")
+        write(build, "src/bonsaiPR/Makefile", "fixed twice?\n")
+        write(source, "README.md", "Bonsai docs\n")
+        os.remove(os.path.join(source, "old.txt"))
+        git(source, "add", "-A")
+        git(source, "commit", "-q", "-m", "two")
+
+        sync_plan, result = _sync(source, build)
+
+        assert sync_plan["changed"] == ["README.md"]
+        assert sorted(os.path.relpath(p, build) for p in result["copied"]) == [
+            "README.md",
+            os.path.join("src", "bonsaiPR", "Makefile"),
+        ]
+        assert _read(build, "README.md") == "BonsaiPR docs\n"
+        assert _read(build, "src/bonsaiPR/Makefile") == "dist:\n\tzip bonsaiPR\n"
+        assert not os.path.exists(os.path.join(build, "old.txt"))
+        assert not os.path.exists(os.path.join(build, "src", "bonsaiPR", "dist"))
+        assert os.path.exists(os.path.join(build, incremental_rewrite.RECORD_NAME))
+
+
+def test_sync_replaces_build_symlinks_instead_of_writing_through():
+    with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as build, \
+            tempfile.TemporaryDirectory() as outside:
+        init_repo(source)
+        write(source, "README.md", "Bonsai\n")
+        git(source, "add", ".")
+        git(source, "commit", "-q", "-m", "one")
+
+        write(outside, "victim.txt", "bonsai\n")
+        os.symlink(os.path.join(outside, "victim.txt"), os.path.join(build, "README.md"))
+        os.makedirs(os.path.join(build, ".git", "refs", "empty"))
+        incremental_rewrite.save_record(build, EMPTY_TREE, "rules")
+        _sync(source, build)
+
+        assert not os.path.islink(os.path.join(build, "README.md"))
+        assert _read(build, "README.md") == "BonsaiPR\n"
+        assert _read(outside, "victim.txt") == "bonsai\n"
+        # KEEP entries are left alone, empty dirs included.
+        assert os.path.isdir(os.path.join(build, ".git", "refs", "empty"))
+
+
+def test_full_pass_when_rules_change_or_no_record():
+    with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as build:
+        assert incremental_rewrite.plan(source, build, "rules")[0] is None
+        incremental_rewrite.save_record(build, EMPTY_TREE, "old rules")
+        sync_plan, reason = incremental_rewrite.plan(source, build, "rules")
+        assert sync_plan is None and "rules changed" in reason
+
+
+def test_renamed_paths_follow_the_rename_passes():
+    assert bonsai_rewrite.build_path("src/bonsai/bonsai.py") == "src/bonsaiPR/bonsaiPR.py"
+    assert bonsai_rewrite.build_path("docs/Bonsai/BONSAI-logo.png") == (
+        "docs/bonsaiPR/bonsaiPR-logo.png"
+    )
+    assert bonsai_rewrite.build_path("src/bonsai_utils/x.py") == "src/bonsai_utils/x.py"
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for merge-prefix checkpoints (scripts/merge_checkpoints.py).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import merge_checkpoints
+
+from conftest import git
+
+
+def test_prefix_keys_identify_base_and_ordered_prefix():
+    keys = merge_checkpoints.prefix_keys("base", "salt", [(1, "a"), (2, "b"), (3, "c")])
+    moved = merge_checkpoints.prefix_keys("base", "salt", [(1, "a"), (2, "B"), (3, "c")])
+    assert keys[0] == moved[0]
+    assert keys[1:] != moved[1:] and keys[2] != moved[2]
+    assert merge_checkpoints.prefix_keys("other", "salt", [(1, "a")])[0] != keys[0]
+    assert merge_checkpoints.prefix_keys("base", "salt", [(2, "b"), (1, "a")])[1] != keys[1]
+
+
+def test_resume_point_is_longest_recorded_chain_and_prune_drops_the_rest(git_repo):
+    git(git_repo, "commit", "-q", "--allow-empty", "-m", "base")
+    base = git(git_repo, "rev-parse", "HEAD")
+
+    index = {}
+    keys = merge_checkpoints.prefix_keys(base, "", [(1, "a"), (2, "b"), (3, "c")])
+    for key, pr_number in zip(keys[:2], (1, 2)):
+        git(git_repo, "commit", "-q", "--allow-empty", "-m", f"merge {pr_number}")
+        merge_checkpoints.record(
+            git_repo, index, key, pr_number, merge_checkpoints.OUTCOME_APPLIED, "asc", base
+        )
+
+    length, entries = merge_checkpoints.find_resume_point(git_repo, index, keys, "asc")
+    assert length == 2
+    assert [e["pr"] for e in entries] == [1, 2]
+    assert entries[-1]["commit"] == git(git_repo, "rev-parse", "HEAD")
+    # Another order never sees this order's checkpoints.
+    assert merge_checkpoints.find_resume_point(git_repo, index, keys, "desc") == (0, [])
+
+    # PR 2 moved: only PR 1's checkpoint is still on the chain.
+    moved = merge_checkpoints.prefix_keys(base, "", [(1, "a"), (2, "B")])
+    assert merge_checkpoints.prune(git_repo, index, moved, "asc") == 1
+    assert list(index) == [keys[0]]
+    assert git(
+        git_repo, "for-each-ref", "--format=%(refname)", merge_checkpoints.CHECKPOINT_NAMESPACE
+    ) == merge_checkpoints.checkpoint_ref("asc", keys[0])
+
+
+def test_interrupted_save_keeps_the_previous_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(merge_checkpoints, "LOGS_DIR", str(tmp_path))
+    merge_checkpoints.save_index({"k1": {"pr": 1}}, "asc")
+
+    def interrupted(obj, f, **kwargs):
+        f.write('{"k1": ')
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(merge_checkpoints.json, "dump", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        merge_checkpoints.save_index({"k1": {"pr": 1}, "k2": {"pr": 2}}, "asc")
+    assert merge_checkpoints.load_index("asc") == {"k1": {"pr": 1}}
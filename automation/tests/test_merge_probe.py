@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for in-memory conflict probing (scripts/merge_probe.py).
+"""
+
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import merge_probe
+
+from conftest import git
+
+
+def _commit(repo, name, content, message):
+    with open(os.path.join(repo, name), "w") as f:
+        f.write(content)
+    git(repo, "add", name)
+    git(repo, "commit", "-q", "-m", message)
+
+
+def test_probe_merge_classifies_without_touching_worktree(git_repo):
+    if not merge_probe.merge_tree_supported():
+        return
+    _commit(git_repo, "shared.txt", "base\n", "base")
+    git(git_repo, "checkout", "-q", "-b", "clean")
+    _commit(git_repo, "new.txt", "new\n", "clean pr")
+    git(git_repo, "checkout", "-q", "-b", "conflict", "main")
+    _commit(git_repo, "shared.txt", "pr\n", "conflicting pr")
+    git(git_repo, "checkout", "-q", "main")
+    _commit(git_repo, "shared.txt", "upstream\n", "upstream change")
+    head_before = git(git_repo, "rev-parse", "HEAD")
+
+    clean = merge_probe.probe_merge(git_repo, "main", "clean")
+    assert clean["clean"] is True and clean["files"] == []
+
+    conflict = merge_probe.probe_merge(git_repo, "main", "conflict")
+    assert conflict["clean"] is False
+    assert conflict["files"] == ["shared.txt"]
+
+    missing = merge_probe.probe_merge(git_repo, "main", "no-such-branch")
+    assert missing["clean"] is None and missing["error"]
+
+    assert git(git_repo, "rev-parse", "HEAD") == head_before
+    assert git(git_repo, "status", "--porcelain") == ""
+
+    merged = merge_probe.merge_commit(git_repo, head_before, "clean", "Merge clean")
+    assert git(git_repo, "rev-parse", f"{merged}^1", f"{merged}^2").split() == [
+        head_before,
+        git(git_repo, "rev-parse", "clean"),
+    ]
+    assert git(git_repo, "ls-tree", "--name-only", merged).split() == [
+        "new.txt",
+        "shared.txt",
+    ]
+    assert merge_probe.merge_commit(git_repo, head_before, "conflict", "x") is None
+    assert git(git_repo, "rev-parse", "HEAD") == head_before
+
+
+def test_fast_path_commits_disjoint_prs_and_defers_overlapping_ones(git_repo):
+    if not merge_probe.merge_tree_supported():
+        return
+    _commit(git_repo, "shared.txt", "base\n", "base")
+    for branch, name, content in (
+        ("a", "a.txt", "a\n"),
+        ("b", "shared.txt", "b\n"),
+        ("c", "shared.txt", "c\n"),
+    ):
+        git(git_repo, "checkout", "-q", "-b", branch, "main")
+        _commit(git_repo, name, content, f"pr {branch}")
+    git(git_repo, "checkout", "-q", "main")
+    tip = git(git_repo, "rev-parse", "HEAD")
+
+    merged = merge_probe.MergedPaths()
+    for branch, files in (("a", ["a.txt"]), ("b", ["shared.txt"])):
+        commit = merge_probe.fast_path_commit(
+            git_repo, tip, branch, f"Merge {branch}", files, merged
+        )
+        assert git(git_repo, "rev-parse", f"{commit}^1") == tip
+        merged.add(branch, files)
+        tip = commit
+    assert git(git_repo, "ls-tree", "--name-only", tip).split() == ["a.txt", "shared.txt"]
+    assert git(git_repo, "rev-parse", "HEAD") != tip  # the checkout is not moved
+
+    # c shares shared.txt with b, so it is left to a real merge, which conflicts.
+    assert merge_probe.fast_path_commit(
+        git_repo, tip, "c", "Merge c", ["shared.txt"], merged
+    ) is None
+    git(git_repo, "reset", "-q", "--hard", tip)
+    merge = subprocess.run(
+        ["git", "-C", git_repo, "merge", "--no-ff", "--no-edit", "c"],
+        capture_output=True,
+    )
+    assert merge.returncode != 0
+    git(git_repo, "merge", "--abort")
+
+    # Unknown files, predicted blockers or an incomplete index never fast-path.
+    assert merge_probe.fast_path_commit(git_repo, tip, "a", "m", None, merged) is None
+    assert merge_probe.fast_path_commit(
+        git_repo, tip, "a", "m", ["new.txt"], merged, blockers=["PR #1"]
+    ) is None
+    merged.add("d", None)
+    assert merged.overlaps(["new.txt"])
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-merge-order worktrees (scripts/order_worktrees.py).
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import order_worktrees
+
+from conftest import git, init_repo
+
+
+def test_prepare_worktree_creates_and_resets_detached_at_base():
+    with tempfile.TemporaryDirectory() as tmp:
+        clone = os.path.join(tmp, "IfcOpenShell")
+        init_repo(clone, "v0.8.0")
+        with open(os.path.join(clone, "a.txt"), "w") as f:
+            f.write("base\n")
+        git(clone, "add", "a.txt")
+        git(clone, "commit", "-q", "-m", "base")
+        base = git(clone, "rev-parse", "HEAD")
+
+        path = order_worktrees.prepare_worktree(clone, "desc", "v0.8.0")
+        assert path == os.path.join(tmp, "IfcOpenShell-desc")
+        assert git(path, "rev-parse", "HEAD") == base
+
+        # A build branch and leftovers from the previous run are discarded.
+        git(path, "checkout", "-q", "-b", "build-0.8.0-alpha2601010000")
+        with open(os.path.join(path, "a.txt"), "w") as f:
+            f.write("merged\n")
+        with open(os.path.join(path, "stray.txt"), "w") as f:
+            f.write("x\n")
+        git(path, "commit", "-q", "-am", "merge")
+
+        assert order_worktrees.prepare_worktree(clone, "desc", "v0.8.0") == path
+        assert git(path, "rev-parse", "HEAD") == base
+        assert git(path, "branch", "--show-current") == ""
+        assert not os.path.exists(os.path.join(path, "stray.txt"))
+        # The build branch lives in the shared ref store.
+        assert git(clone, "branch", "--list", "build-*")
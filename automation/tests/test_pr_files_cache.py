@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Tests for the PR changed-files cache (scripts/pr_files_cache.py).
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import pr_files_cache
+
+
+def _pr(number, head, base="b"):
+    return {"number": number, "head": {"sha": head}, "base": {"sha": base}}
+
+
+def test_lookup_is_keyed_by_head_and_base_and_prune_evicts():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "pr_files_cache.json")
+        cache = pr_files_cache.load_cache(path)
+        pr_files_cache.store(cache, _pr(1, "h1"), ["a.py"])
+        pr_files_cache.store(cache, _pr(2, "h2"), ["b.py"])
+        pr_files_cache.save_cache(cache, path)
+
+        cache = pr_files_cache.load_cache(path)
+        assert pr_files_cache.lookup(cache, _pr(1, "h1")) == ["a.py"]
+        assert pr_files_cache.lookup(cache, _pr(1, "h1-moved")) is None
+        assert pr_files_cache.lookup(cache, _pr(1, "h1", base="b2")) is None
+        assert pr_files_cache.lookup(cache, _pr(2, "h2")) == ["b.py"]
+
+        # PR 2 closed; of PR 1's two heads only the most recently used stays.
+        pr_files_cache.store(cache, _pr(1, "h1-moved"), ["a.py", "c.py"])
+        assert pr_files_cache.prune(cache, [1], max_entries=1) == 2
+        assert pr_files_cache.lookup(cache, _pr(1, "h1-moved")) == ["a.py", "c.py"]
+        assert pr_files_cache.lookup(cache, _pr(1, "h1")) is None
+        assert pr_files_cache.lookup(cache, _pr(2, "h2")) is None
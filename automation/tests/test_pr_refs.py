@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for the local PR head store (scripts/pr_refs.py).
+
+Builds a throwaway "upstream" repository that publishes refs/pull/<N>/head the
+way GitHub does, clones it, and checks the batched fetch against the clone.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import pr_refs
+
+from conftest import git, init_repo
+
+
+def _make_upstream(root, pr_numbers):
+    """Upstream repo with one commit per PR published as refs/pull/<N>/head."""
+    upstream = os.path.join(root, "upstream")
+    init_repo(upstream)
+    with open(os.path.join(upstream, "base.txt"), "w") as f:
+        f.write("base\n")
+    git(upstream, "add", "base.txt")
+    git(upstream, "commit", "-q", "-m", "base")
+    heads = {}
+    for n in pr_numbers:
+        git(upstream, "checkout", "-q", "-b", f"pr{n}", "main")
+        with open(os.path.join(upstream, f"pr{n}.txt"), "w") as f:
+            f.write(f"{n}\n")
+        git(upstream, "add", f"pr{n}.txt")
+        git(upstream, "commit", "-q", "-m", f"pr {n}")
+        heads[n] = git(upstream, "rev-parse", "HEAD")
+        git(upstream, "update-ref", f"refs/pull/{n}/head", heads[n])
+    git(upstream, "checkout", "-q", "main")
+    clone = os.path.join(root, "clone")
+    subprocess.run(["git", "clone", "-q", upstream, clone], check=True)
+    git(clone, "remote", "rename", "origin", "upstream")
+    return clone, heads
+
+
+def test_fetch_pr_heads_batches_and_attributes_failures():
+    with tempfile.TemporaryDirectory() as root:
+        clone, heads = _make_upstream(root, [101, 102, 103])
+
+        # 999 has no refs/pull head upstream: its batch fails and is retried
+        # one PR at a time, so only 999 is reported as failed.
+        results = pr_refs.fetch_pr_heads(
+            clone, {101: None, 102: None, 999: None, 103: None}, batch_size=10
+        )
+
+        assert [n for n, r in results.items() if not r["ok"]] == [999]
+        for n, sha in heads.items():
+            assert results[n]["ok"]
+            assert git(clone, "rev-parse", pr_refs.pr_ref(n)) == sha
+
+
+def test_known_heads_are_served_from_the_store_and_pruned():
+    with tempfile.TemporaryDirectory() as root:
+        clone, heads = _make_upstream(root, [201, 202])
+        pr_refs.fetch_pr_heads(clone, heads)
+
+        # Unreachable remote: anything not served from the store would fail.
+        results = pr_refs.fetch_pr_heads(clone, heads, remote="no-such-remote")
+        assert all(r["ok"] and r["cached"] for r in results.values())
+
+        # A ref deleted locally is re-pointed at the commit still in the odb.
+        git(clone, "update-ref", "-d", pr_refs.pr_ref(202))
+        results = pr_refs.fetch_pr_heads(clone, {202: heads[202]}, remote="no-such-remote")
+        assert results[202]["cached"]
+        assert git(clone, "rev-parse", pr_refs.pr_ref(202)) == heads[202]
+
+        assert pr_refs.prune_pr_refs(clone, [202]) == 1
+        assert set(pr_refs.local_pr_refs(clone)) == {202}
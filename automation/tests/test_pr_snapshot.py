@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for the GraphQL open-PR snapshot (scripts/pr_snapshot.py), against a
+local stand-in server.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import github_client
+import pr_snapshot
+
+
+def _node(number, repo=True, files=(), more_files=False):
+    return {
+        "number": number,
+        "title": f"PR {number}",
+        "url": f"https://github.com/o/r/pull/{number}",
+        "isDraft": number == 2,
+        "createdAt": "2026-01-01T00:00:00Z",
+        "updatedAt": "2026-01-02T00:00:00Z",
+        "author": {"login": "dev"},
+        "headRefName": "feature",
+        "headRefOid": f"{number:040x}",
+        "headRepositoryOwner": {"login": "dev"},
+        "headRepository": (
+            {"nameWithOwner": "dev/r", "url": "https://github.com/dev/r"} if repo else None
+        ),
+        "files": {
+            "pageInfo": {"hasNextPage": more_files, "endCursor": "f1"},
+            "nodes": [{"path": p} for p in files],
+        },
+    }
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        variables = request["variables"]
+        if "pullRequest(number" in request["query"]:
+            data = {
+                "repository": {
+                    "pullRequest": {
+                        "files": {
+                            "pageInfo": {"hasNextPage": False, "endCursor": None},
+                            "nodes": [{"path": "src/ifcopenshell-python/x.cpp"}],
+                        }
+                    }
+                }
+            }
+        elif variables["cursor"] is None:
+            data = {
+                "repository": {
+                    "pullRequests": {
+                        "pageInfo": {"hasNextPage": True, "endCursor": "p1"},
+                        "nodes": [_node(3, files=["a.py"], more_files=True)],
+                    }
+                }
+            }
+        else:
+            data = {
+                "repository": {
+                    "pullRequests": {
+                        "pageInfo": {"hasNextPage": False, "endCursor": None},
+                        "nodes": [_node(2, repo=False)],
+                    }
+                }
+            }
+        body = json.dumps({"data": data}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_fetch_open_prs_returns_rest_shape_with_all_files():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = github_client.GitHubClient(
+            token="t", api_url=f"http://127.0.0.1:{server.server_port}"
+        )
+        prs = pr_snapshot.fetch_open_prs(client, "o", "r", with_files=True)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert [pr["number"] for pr in prs] == [3, 2]
+    first, deleted_fork = prs
+    assert first["files"] == ["a.py", "src/ifcopenshell-python/x.cpp"]
+    assert first["head"] == {
+        "ref": "feature",
+        "sha": f"{3:040x}",
+        "label": "dev:feature",
+        "repo": {"full_name": "dev/r", "clone_url": "https://github.com/dev/r.git"},
+    }
+    assert first["user"]["login"] == "dev" and first["draft"] is False
+    assert first["html_url"] == "https://github.com/o/r/pull/3"
+    assert deleted_fork["head"]["repo"] is None and deleted_fork["draft"] is True
+
+
+def test_snapshot_round_trip_and_expiry():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "pr_snapshot.json")
+        assert pr_snapshot.load_snapshot(path) is None
+        pr_snapshot.save_snapshot([{"number": 1}], path)
+        assert pr_snapshot.load_snapshot(path) == [{"number": 1}]
+        assert pr_snapshot.load_snapshot(path, max_age=-1) is None
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for release identity in the per-order snapshots (scripts/pr_state.py).
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import pr_state
+
+
+def _state(tree, tag="v1"):
+    return pr_state.build_state(
+        applied_prs=[],
+        failed_prs=[],
+        skipped_conflict_prs=[],
+        skipped_draft_prs=[],
+        merge_order="ascending",
+        generated_at="2026-01-01T00:00:00Z",
+        release_tag=tag,
+        tree=tree,
+    )
+
+
+def test_release_is_current_only_for_same_tree_and_transform():
+    identity = pr_state.build_identity("a" * 40)
+    assert identity["merged"] == "a" * 40 and identity["transform"]
+
+    assert pr_state.release_is_current(_state(identity), identity)
+    assert not pr_state.release_is_current(_state(identity), pr_state.build_identity("b" * 40))
+    assert not pr_state.release_is_current(
+        _state({**identity, "transform": "changed"}), identity
+    )
+    # No release recorded (e.g. the upload failed) or an older snapshot.
+    assert not pr_state.release_is_current(_state(identity, tag=None), identity)
+    assert not pr_state.release_is_current(_state(None), identity)
+    assert pr_state.build_identity(None) is None
+
+
+def test_editing_a_rewrite_module_changes_the_identity():
+    scripts_dir = os.path.join(os.path.dirname(__file__), "..", "scripts")
+    with tempfile.TemporaryDirectory() as copy:
+        for path in pr_state.transform_paths(scripts_dir):
+            shutil.copy(path, copy)
+        before = pr_state.build_identity("a" * 40, scripts_dir=copy)
+        assert before == pr_state.build_identity("a" * 40, scripts_dir=scripts_dir)
+
+        with open(os.path.join(copy, "bonsai_rewrite.py"), "a") as f:
+            f.write("# new rule\n")
+        after = pr_state.build_identity("a" * 40, scripts_dir=copy)
+
+    assert after["transform"] != before["transform"]
+    assert not pr_state.release_is_current(_state(before), after)
+
+
+def test_restamp_state_only_bumps_generated_at():
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "state.asc.json")
+        assert not pr_state.restamp_state(path)
+        original = _state(pr_state.build_identity("a" * 40))
+        pr_state.write_state(original, path)
+
+        assert pr_state.restamp_state(path, generated_at="2026-02-02T00:00:00Z")
+        restamped = pr_state.load_state(path)
+        assert restamped["generated_at"] == "2026-02-02T00:00:00Z"
+        assert {k: v for k, v in restamped.items() if k != "generated_at"} == {
+            k: v for k, v in original.items() if k != "generated_at"
+        }
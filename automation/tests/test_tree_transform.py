@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for building the renamed bonsaiPR tree with git plumbing
+(scripts/tree_transform.py), with a temporary source repository.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import tree_transform
+
+from conftest import git, write, init_repo
+
+
+def test_transformed_tree_is_checked_out_once_without_git_dir():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source")
+        build = os.path.join(tmp, "build")
+        cache_dir = os.path.join(tmp, "cache")
+        init_repo(source)
+        write(source, "src/bonsai/__init__.py", b"import bonsai\n")
+        write(source, "src/bonsai/Bonsai.txt", b"Bonsai BONSAI bonsai_utils\n")
+        write(source, "src/ifcopenshell/x.cpp", b"int x;\n")
+        write(source, "docs/icon.png", b"\x89PNG\x00bonsai")
+        git(source, "add", ".")
+        git(source, "commit", "-q", "-m", "one")
+        tree = git(source, "rev-parse", "HEAD^{tree}")
+
+        cold = tree_transform.transform_tree(source, tree, cache_dir=cache_dir, workers=1)
+        tree_transform.materialize(source, cold["tree"], build)
+
+        with open(os.path.join(build, "src", "bonsaiPR", "__init__.py")) as f:
+            assert f.read() == "import bonsaiPR\n"
+        with open(os.path.join(build, "src", "bonsaiPR", "bonsaiPR.txt")) as f:
+            assert f.read() == "BonsaiPR BONSAIPR bonsai_utils\n"
+        with open(os.path.join(build, "docs", "icon.png"), "rb") as f:
+            assert f.read() == b"\x89PNG\x00bonsai"
+        assert not os.path.exists(os.path.join(build, ".git"))
+        assert (cold["files"], cold["modified"], cold["prefiltered"], cold["binary"]) == (
+            4,
+            2,
+            1,
+            1,
+        )
+        assert cold["renamed"] == 2 and cold["cache_hits"] == 0
+
+        # Deterministic, and a warm cache does not read the rewritten blobs again.
+        warm = tree_transform.transform_tree(source, tree, cache_dir=cache_dir, workers=2)
+        assert warm["tree"] == cold["tree"]
+        assert warm["cache_hits"] == 2
+
+
+def test_symlinks_stay_links_with_renamed_targets():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source")
+        build = os.path.join(tmp, "build")
+        init_repo(source)
+        write(source, "src/bonsai/__init__.py", b"import bonsai\n")
+        write(source, "src/other.txt", b"plain\n")
+        os.makedirs(os.path.join(source, "docs"))
+        os.symlink("../src/bonsai/__init__.py", os.path.join(source, "docs", "init.py"))
+        os.symlink("../src/other.txt", os.path.join(source, "docs", "other.txt"))
+        git(source, "add", ".")
+        git(source, "commit", "-q", "-m", "one")
+        tree = git(source, "rev-parse", "HEAD^{tree}")
+
+        counts = tree_transform.transform_tree(source, tree, workers=1)
+        tree_transform.materialize(source, counts["tree"], build)
+
+        # Unlike the copy fallback, links are not dereferenced; their targets
+        # are renamed like any other path so they do not dangle.
+        link = os.path.join(build, "docs", "init.py")
+        assert os.path.islink(link)
+        assert os.readlink(link) == "../src/bonsaiPR/__init__.py"
+        with open(link) as f:
+            assert f.read() == "import bonsaiPR\n"
+        assert os.readlink(os.path.join(build, "docs", "other.txt")) == "../src/other.txt"
+        assert counts["files"] == 4 and counts["processed"] == 2
+
+
+def test_stopping_the_blob_reader_early_does_not_hang():
+    with tempfile.TemporaryDirectory() as source:
+        git(source, "init", "-q", "-b", "main")
+        write(source, "big.txt", b"x" * 256 * 1024)
+        blob = git(source, "hash-object", "-w", "big.txt")
+
+        # Far more output than a pipe buffer holds, read only partly.
+        reader = tree_transform._read_blobs(source, [blob] * 2000)
+        done = threading.Event()
+
+        def consume_one():
+            assert next(reader)[0] == blob
+            reader.close()
+            done.set()
+
+        thread = threading.Thread(target=consume_one, daemon=True)
+        thread.start()
+        assert done.wait(30), "closing the reader hung"
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Tests for the release asset inventory and uploads of
+scripts/02_upload_to_falken10vdl.py, against a stubbed GitHubClient.
+"""
+
+import hashlib
+import os
+import threading
+
+import pytest
+import requests
+
+from conftest import load_script
+
+upload = load_script("02_upload_to_falken10vdl.py")
+
+RELEASE_ID = 7
+
+
+class _Response:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = str(payload)
+
+    def json(self):
+        return self._payload
+
+
+class _StubClient:
+    """The release-asset endpoints of GitHubClient, kept in memory."""
+
+    def __init__(self, assets=()):
+        self.assets = {a["name"]: dict(a) for a in assets}
+        self.listings = 0
+        self.deleted = []
+        self.posted = []
+        # {asset name: [behaviour of the next posts]}: "drop" reads one chunk
+        # and loses the connection, "reject" answers 422.
+        self.faults = {}
+        self.bodies = {}
+        self.barrier = None
+        self._next_id = 100
+        self._lock = threading.Lock()
+
+    def paginate(self, path):
+        with self._lock:
+            self.listings += 1
+            return [dict(a) for a in self.assets.values()]
+
+    def delete(self, path):
+        asset_id = int(path.rsplit("/", 1)[1])
+        with self._lock:
+            self.deleted.append(asset_id)
+            for name, asset in list(self.assets.items()):
+                if asset["id"] == asset_id:
+                    del self.assets[name]
+        return _Response(204)
+
+    def post(self, path, data=None, params=None, **kwargs):
+        name = params["name"]
+        if self.barrier:
+            self.barrier.wait()
+        with self._lock:
+            faults = self.faults.get(name) or [None]
+            fault = faults.pop(0)
+        if fault == "drop":
+            self.bodies.setdefault(name, []).append(data.read(1024))
+            raise requests.ConnectionError("connection reset")
+        if fault == "reject":
+            return _Response(422, {"message": "Validation Failed"})
+        body = b"".join(iter(lambda: data.read(1024), b""))
+        with self._lock:
+            self.bodies.setdefault(name, []).append(body)
+            self.posted.append(name)
+            self._next_id += 1
+            asset = {
+                "id": self._next_id,
+                "name": params["name"],
+                "size": len(body),
+                "state": "uploaded",
+            }
+            self.assets[asset["name"]] = asset
+        return _Response(201, dict(asset))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    stub = _StubClient()
+    monkeypatch.setattr(upload.github_client, "default_client", lambda: stub)
+    monkeypatch.setattr(upload, "_release_assets", {})
+    monkeypatch.setattr(upload, "_uploaded_digests", {})
+    return stub
+
+
+def _zip(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(os.urandom(size))
+    return str(path)
+
+
+def test_inventory_skips_complete_assets_and_replaces_mismatched_ones(client, tmp_path):
+    client.assets = {
+        "same.zip": {"id": 1, "name": "same.zip", "size": 100, "state": "uploaded"},
+        "short.zip": {"id": 2, "name": "short.zip", "size": 50, "state": "uploaded"},
+        "starter.zip": {"id": 3, "name": "starter.zip", "size": 100, "state": "starter"},
+    }
+    for name in ("same.zip", "short.zip", "starter.zip", "new.zip"):
+        assert upload.upload_asset_to_release(
+            RELEASE_ID, _zip(tmp_path, name, 100), name
+        )
+
+    # One listing serves every upload; only the mismatched assets are replaced.
+    assert client.listings == 1
+    assert sorted(client.deleted) == [2, 3]
+    assert sorted(client.posted) == ["new.zip", "short.zip", "starter.zip"]
+
+    # The inventory followed the deletes and uploads without listing again.
+    inventory = upload.get_release_assets(RELEASE_ID)
+    assert client.listings == 1
+    assert inventory == client.assets
+    assert inventory["same.zip"]["id"] == 1
+    assert all(a["size"] == 100 and a["state"] == "uploaded" for a in inventory.values())
+    assert upload.check_asset_exists(RELEASE_ID, "short.zip", 100)
+    assert not upload.check_asset_exists(RELEASE_ID, "short.zip", 50)
+
+
+def test_deleted_asset_leaves_the_inventory(client):
+    asset = {"id": 5, "name": "old.zip", "size": 1, "state": "uploaded"}
+    upload.remember_release_assets({"id": RELEASE_ID, "assets": [asset]})
+    assert upload.check_asset_exists(RELEASE_ID, "old.zip")
+
+    assert upload.delete_release_asset(RELEASE_ID, asset)
+    assert client.deleted == [5]
+    assert not upload.check_asset_exists(RELEASE_ID, "old.zip")
+    assert client.listings == 0
+
+
+def test_dropped_upload_restarts_from_the_first_byte(client, tmp_path):
+    path = _zip(tmp_path, "retry.zip", 3000)
+    with open(path, "rb") as f:
+        payload = f.read()
+    client.faults["retry.zip"] = ["drop"]
+
+    assert upload.upload_asset_to_release(RELEASE_ID, path, "retry.zip")
+
+    # A fresh reader: the second attempt sends the whole file from offset 0.
+    assert client.bodies["retry.zip"] == [payload[:1024], payload]
+    assert upload._uploaded_digests["retry.zip"] == {
+        "size": 3000,
+        "sha256": hashlib.sha256(payload).hexdigest(),
+    }
+    assert upload.get_release_assets(RELEASE_ID)["retry.zip"]["size"] == 3000
+
+
+def test_failed_upload_does_not_drop_the_other_workers_results(
+    client, tmp_path, monkeypatch
+):
+    monkeypatch.setenv("UPLOAD_WORKERS", "3")
+    # All three posts must be in flight at once to get past the barrier.
+    client.barrier = threading.Barrier(3, timeout=10)
+    client.faults["b.zip"] = ["reject"]
+    uploads = [(_zip(tmp_path, name, 2000), name) for name in ("a.zip", "b.zip", "c.zip")]
+
+    assert upload.upload_assets(RELEASE_ID, uploads) == 2
+
+    assert sorted(upload._uploaded_digests) == ["a.zip", "c.zip"]
+    for path, name in uploads:
+        if name != "b.zip":
+            with open(path, "rb") as f:
+                expected = hashlib.sha256(f.read()).hexdigest()
+            assert upload._uploaded_digests[name]["sha256"] == expected
+    assert sorted(upload.get_release_assets(RELEASE_ID)) == ["a.zip", "c.zip"]